@@ -11,6 +11,8 @@ import pandas as pd
 import numpy as np
 
 import config
+from entities import topic_mids
+from instrument import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -23,12 +25,22 @@ class KeywordMetrics:
     max_interest: float
     min_interest: float
     volatility: float
-    momentum: float  # Slope: last 6mo vs prior 6mo
+    momentum: float  # Recent half vs prior half of the date range
     breakout_queries_count: int
     related_queries_count: int
     rising_queries_count: int
-    recent_peak: bool  # Peaked in last 90 days?
+    recent_peak: bool  # Peaked in the recent window (see recent_window)?
     recent_peak_value: float
+    entity_mid: str = ""  # Knowledge Graph entity the keyword resolves to, if known
+    topic_breadth: int = 0  # Distinct related topic entities (top + rising)
+    topic_breakout_count: int = 0  # Distinct rising topic entities marked "Breakout"
+    global_interest: float = 0.0  # Avg interest on the calibrated global scale (calibration.py); 0 = uncalibrated
+    forecast_model: str = ""  # Model behind the forecast fields (forecast.py); "" = no forecast
+    forecast_interest: float = 0.0  # Projected avg interest over the next FORECAST_HORIZON_DAYS
+    forecast_low: float = 0.0  # Interval of that projection (FORECAST_INTERVAL_Z standard errors)
+    forecast_high: float = 0.0
+    forecast_change: float = 0.0  # Projection vs the last horizon's interest, on momentum's scale
+    forecast_prob_higher: float = 0.0  # Chance the next horizon's interest beats the last one's
 
 
 @dataclass
@@ -40,18 +52,120 @@ class ComparisonScore:
     momentum_gap: float  # How close is momentum to reference momentum
     breadth_gap: float  # How close is related_query count to reference count
     metrics: KeywordMetrics
+    interest_score: float = 0.0  # Component scores (0-100) before SIMILARITY_WEIGHTS
+    momentum_score: float = 0.0
+    breadth_score: float = 0.0
+    demand_ratio: float = 1.0  # Demand-ratio penalty the weighted sum was multiplied by
+    similarity_rank: int = 0  # Rank among the run's scored keywords (explain.py); 0 = not ranked
+    similarity_rank_best: int = 0  # Best and worst rank under perturbed SIMILARITY_WEIGHTS
+    similarity_rank_worst: int = 0
+
+
+def recent_window(index: pd.DatetimeIndex) -> pd.Timedelta:
+    """Length of the "recent" window for a date range.
+
+    RECENT_PEAK_DAYS, capped at RECENT_PEAK_SPAN_FRACTION of the range so short
+    timeframes ("now 7-d") get a proportionally short window.
+    """
+    span = index[-1] - index[0]
+    return min(pd.Timedelta(days=config.RECENT_PEAK_DAYS), span * config.RECENT_PEAK_SPAN_FRACTION)
+
+
+def opportunity_components(columns) -> dict[str, np.ndarray]:
+    """Opportunity score components (0-100 each), keyed like OPPORTUNITY_WEIGHTS.
+
+    columns maps KeywordMetrics field names to values: one keyword's fields or
+    whole columns of a metrics table (ranking.py). Missing fields and NaN count as 0.
+
+    Calibrated keywords (global_interest > 0) score interest by their log
+    position on the global scale, the rest by their batch-relative average.
+    Both scales are fixed, so a keyword's score never depends on the other
+    rows, but scores are only comparable within one of the two groups.
+    """
+    def column(name):
+        return np.nan_to_num(np.asarray(columns[name] if name in columns else 0.0, dtype=float))
+
+    # Avg interest: calibrated keywords by their log position on the global scale
+    global_interest = column("global_interest")
+    floor = np.log10(config.CALIBRATION_GLOBAL_FLOOR)
+    global_component = np.clip(
+        (np.log10(np.maximum(global_interest, config.CALIBRATION_GLOBAL_FLOOR)) - floor) / (np.log10(100) - floor) * 100,
+        0,
+        100,
+    )
+    avg_interest = column("avg_interest")
+    relative_component = np.where(avg_interest >= config.MIN_AVG_INTEREST, np.minimum(100, avg_interest / 80 * 100), 0)
+    interest_component = np.where(global_interest > 0, global_component, relative_component)
+
+    # Momentum: range [-1, 3] → [0, 100]
+    momentum_component = np.clip((column("momentum") + 1) * 50, 0, 100)
+
+    # Forecast: projected change over the next week, [-1, 1] → [0, 100]; no forecast = flat = 50
+    forecast_component = np.clip((column("forecast_change") + 1) * 50, 0, 100)
+
+    # Breakout queries or topic entities, whichever shows more
+    breakouts = np.maximum(column("breakout_queries_count"), column("topic_breakout_count"))
+    breakout_component = np.minimum(100, breakouts / config.MIN_BREAKOUT_QUERIES * 50)
+
+    breadth_component = np.minimum(100, column("related_queries_count") / config.MIN_RELATED_QUERIES * 50)
+    recency_component = np.where(column("recent_peak") > 0, 50.0, 0.0)
+
+    return {
+        "avg_interest": interest_component,
+        "momentum": momentum_component,
+        "breakout_queries": breakout_component,
+        "breadth": breadth_component,
+        "recency": recency_component,
+        "forecast": forecast_component,
+    }
+
+
+def opportunity_score(columns, weights: dict[str, float] | None = None) -> np.ndarray:
+    """Weighted sum of opportunity_components (weights default to OPPORTUNITY_WEIGHTS)."""
+    weights = weights or config.OPPORTUNITY_WEIGHTS
+    components = opportunity_components(columns)
+    return sum(components[name] * weight for name, weight in weights.items())
+
+
+def extract_metrics_rows(
+    values: np.ndarray,
+    keywords: list[str],
+    related: list[dict],
+    topics: list[dict | None],
+    entity_mids: list[str],
+    dates: np.ndarray,
+) -> list:
+    """KeywordMetrics of each row's series (a parallel.AnalyticsExecutor task).
+
+    dates index the columns of values; related, topics and entity_mids hold each
+    row's related-queries payload, related-topics payload (None if not fetched)
+    and entity.
+    """
+    frame = pd.DataFrame(values.T, index=pd.Index(dates), columns=keywords)
+    analyzer = KeywordAnalyzer()
+    return [
+        analyzer.extract_metrics(kw, frame, {kw: rq}, None if rt is None else {kw: rt}, entity_mid=mid)
+        for kw, rq, rt, mid in zip(keywords, related, topics, entity_mids)
+    ]
 
 
 class KeywordAnalyzer:
     """Analyzes keywords and compares them to reference benchmarks."""
 
-    def __init__(self):
+    def __init__(self, similarity_weights: dict[str, float] | None = None):
         self.reference_metrics = {}
+        self.similarity_weights = similarity_weights or config.SIMILARITY_WEIGHTS
 
+    @tracer.traced("metric_extraction")
     def extract_metrics(
-        self, keyword: str, interest_df: pd.DataFrame, related_queries: dict
+        self,
+        keyword: str,
+        interest_df: pd.DataFrame,
+        related_queries: dict,
+        related_topics: Optional[dict] = None,
+        entity_mid: str = "",
     ) -> KeywordMetrics:
-        """Extract metrics from interest_over_time and related_queries data."""
+        """Extract metrics from interest_over_time, related_queries and (optionally) related_topics data."""
 
         # Interest statistics
         avg_interest = interest_df[keyword].mean() if keyword in interest_df.columns else 0
@@ -61,7 +175,18 @@ class KeywordAnalyzer:
 
         # Momentum: compare recent half-period average to prior half-period average.
         # This is more stable than slope ratios, which can explode when denominator trends are near zero.
-        if len(interest_df) >= 26:  # At least 26 weeks for 6mo+6mo split
+        # The halves split the date range at its midpoint, so the meaning doesn't change with
+        # granularity (hourly rows for "now 7-d", weekly for "today 12-m").
+        if isinstance(interest_df.index, pd.DatetimeIndex) and len(interest_df) >= 4:
+            index = interest_df.index
+            midpoint = index[0] + (index[-1] - index[0]) / 2
+            prior = interest_df.loc[index < midpoint, keyword].values
+            recent = interest_df.loc[index >= midpoint, keyword].values
+
+            prior_mean = float(np.mean(prior)) if len(prior) else 0.0
+            recent_mean = float(np.mean(recent)) if len(recent) else 0.0
+            momentum = (recent_mean - prior_mean) / max(prior_mean, 1.0)
+        elif len(interest_df) >= 26:  # No dates: at least 26 rows for a half/half split
             mid = len(interest_df) // 2
             last_6mo = interest_df.iloc[mid:][keyword].values
             prior_6mo = interest_df.iloc[:mid][keyword].values
@@ -92,10 +217,20 @@ class KeywordAnalyzer:
         related_count = len(top_queries)
         rising_count = len(rising_queries)
 
-        # Recent peak: did it peak in last 90 days?
+        # Related topics: counted by entity id, so reworded duplicates count once
+        topic_related, topic_breakout = topic_mids((related_topics or {}).get(keyword, {}))
+
+        # Recent peak: did it peak in the recent window (last 90 days, or the last
+        # quarter of shorter ranges)?
         recent_peak = False
         recent_peak_value = 0.0
-        if len(interest_df) >= 13:  # At least 13 weeks
+        if isinstance(interest_df.index, pd.DatetimeIndex) and len(interest_df) >= 4:
+            window_start = interest_df.index[-1] - recent_window(interest_df.index)
+            recent_values = interest_df.loc[interest_df.index > window_start, keyword]
+            if len(recent_values):
+                recent_peak = recent_values.max() > interest_df[keyword].quantile(0.75)
+                recent_peak_value = float(recent_values.max())
+        elif len(interest_df) >= 13:  # No dates: last 13 rows (13 weeks)
             recent_weeks = interest_df.iloc[-13:][keyword]
             recent_peak = recent_weeks.max() > interest_df[keyword].quantile(0.75)
             recent_peak_value = float(recent_weeks.max())
@@ -110,10 +245,43 @@ class KeywordAnalyzer:
             breakout_queries_count=breakout_count,
             related_queries_count=related_count,
             rising_queries_count=rising_count,
-            recent_peak=recent_peak,
+            recent_peak=bool(recent_peak),
             recent_peak_value=recent_peak_value,
+            entity_mid=entity_mid,
+            topic_breadth=len(topic_related),
+            topic_breakout_count=len(topic_breakout),
         )
 
+    def extract_metrics_batch(
+        self,
+        interest_df: pd.DataFrame,
+        related_queries: dict,
+        executor=None,
+        related_topics: dict | None = None,
+        entity_mids: dict[str, str] | None = None,
+    ) -> dict[str, KeywordMetrics]:
+        """Metrics for every keyword column of interest_df, as extract_metrics gives them.
+
+        With a parallel.AnalyticsExecutor, keywords are sharded across its
+        workers, which read the series from shared memory. Like extract_metrics,
+        this leaves global_interest and the forecast fields to the caller.
+        """
+        interest_df = interest_df.drop(columns=["isPartial"], errors="ignore")
+        keywords = list(dict.fromkeys(interest_df.columns))
+        values = interest_df[keywords].to_numpy(dtype=float).T
+        per_row = {
+            "keywords": keywords,
+            "related": [related_queries.get(kw, {}) for kw in keywords],
+            "topics": [related_topics.get(kw) if related_topics else None for kw in keywords],
+            "entity_mids": [(entity_mids or {}).get(kw, "") for kw in keywords],
+        }
+        dates = interest_df.index.to_numpy()
+        if executor is None:
+            metrics = extract_metrics_rows(values, **per_row, dates=dates)
+        else:
+            metrics = executor.map_rows(extract_metrics_rows, values, per_row=per_row, dates=dates)
+        return dict(zip(keywords, metrics))
+
     def set_reference_keywords(self, reference_keywords: list[str], metrics_dict: dict[str, KeywordMetrics]) -> None:
         """Set reference benchmarks from reference keywords."""
         self.reference_metrics = {kw: metrics_dict[kw] for kw in reference_keywords if kw in metrics_dict}
@@ -127,6 +295,10 @@ class KeywordAnalyzer:
             self.reference_momentum = np.mean(ref_momentums)
             self.reference_breadth = np.mean(ref_breadths)
 
+            # Global scale only if every reference is calibrated
+            ref_globals = [m.global_interest for m in self.reference_metrics.values()]
+            self.reference_global_interest = float(np.mean(ref_globals)) if all(g > 0 for g in ref_globals) else 0.0
+
             logger.info(
                 f"Reference benchmarks set: "
                 f"avg_interest={self.reference_avg_interest:.1f}, "
@@ -134,6 +306,7 @@ class KeywordAnalyzer:
                 f"breadth={self.reference_breadth:.0f}"
             )
 
+    @tracer.traced("scoring", kind="similarity")
     def compare_to_reference(self, keyword: str, metrics: KeywordMetrics) -> ComparisonScore:
         """Compare a keyword to reference benchmarks."""
 
@@ -151,17 +324,17 @@ class KeywordAnalyzer:
         max_momentum_gap = max(abs(self.reference_momentum), abs(metrics.momentum), 1.0)
         max_breadth_gap = max(self.reference_breadth, 20)
 
-        interest_score = max(0, 100 - (avg_interest_gap / max_interest_gap) * 100)
+        calibrated = metrics.global_interest > 0 and self.reference_global_interest > 0
+        if calibrated:
+            # Global values span orders of magnitude: one order of magnitude apart scores 0
+            interest_score = max(0, 100 - abs(np.log10(metrics.global_interest / self.reference_global_interest)) * 100)
+        else:
+            interest_score = max(0, 100 - (avg_interest_gap / max_interest_gap) * 100)
         momentum_score = max(0, 100 - (momentum_gap / max_momentum_gap) * 100)
         breadth_score = max(0, 100 - (breadth_gap / max_breadth_gap) * 100)
 
         # Composite similarity score: weighted average
-        weights = {
-            "interest": 0.35,
-            "momentum": 0.35,
-            "breadth": 0.30,
-        }
-
+        weights = self.similarity_weights
         similarity_score = (
             interest_score * weights["interest"]
             + momentum_score * weights["momentum"]
@@ -170,9 +343,15 @@ class KeywordAnalyzer:
 
         # Demand-ratio penalty: "comparable" should require comparable average demand.
         # This guards against inflated scores when breadth matches but demand is far lower.
-        demand_ratio = min(metrics.avg_interest, self.reference_avg_interest) / max(
-            metrics.avg_interest, self.reference_avg_interest, 1.0
-        )
+        # Calibrated runs compare global volumes, so the ratio holds across batches and runs.
+        if calibrated:
+            demand_ratio = min(metrics.global_interest, self.reference_global_interest) / max(
+                metrics.global_interest, self.reference_global_interest
+            )
+        else:
+            demand_ratio = min(metrics.avg_interest, self.reference_avg_interest) / max(
+                metrics.avg_interest, self.reference_avg_interest, 1.0
+            )
         similarity_score *= demand_ratio
 
         return ComparisonScore(
@@ -182,33 +361,13 @@ class KeywordAnalyzer:
             momentum_gap=float(momentum_gap),
             breadth_gap=float(breadth_gap),
             metrics=metrics,
+            interest_score=float(interest_score),
+            momentum_score=float(momentum_score),
+            breadth_score=float(breadth_score),
+            demand_ratio=float(demand_ratio),
         )
 
-    def get_opportunity_score(self, metrics: KeywordMetrics) -> float:
+    def get_opportunity_score(self, metrics: KeywordMetrics, weights: dict[str, float] | None = None) -> float:
         """Calculate standalone opportunity score (0-100) for a keyword."""
-        score = 0.0
-
-        # Avg interest (25%)
-        if metrics.avg_interest >= config.MIN_AVG_INTEREST:
-            interest_component = min(100, (metrics.avg_interest / 80) * 100)
-        else:
-            interest_component = 0
-        score += interest_component * config.OPPORTUNITY_WEIGHTS["avg_interest"]
-
-        # Momentum (25%)
-        momentum_component = max(0, min(100, (metrics.momentum + 1) * 50))  # Range [-1, 3] → [0, 100]
-        score += momentum_component * config.OPPORTUNITY_WEIGHTS["momentum"]
-
-        # Breakout queries (20%)
-        breakout_component = min(100, (metrics.breakout_queries_count / config.MIN_BREAKOUT_QUERIES) * 50)
-        score += breakout_component * config.OPPORTUNITY_WEIGHTS["breakout_queries"]
-
-        # Breadth (15%)
-        breadth_component = min(100, (metrics.related_queries_count / config.MIN_RELATED_QUERIES) * 50)
-        score += breadth_component * config.OPPORTUNITY_WEIGHTS["breadth"]
-
-        # Recency (15%)
-        recency_component = 50 if metrics.recent_peak else 0
-        score += recency_component * config.OPPORTUNITY_WEIGHTS["recency"]
-
-        return score
+        with tracer.span("scoring", kind="opportunity"):
+            return float(opportunity_score(vars(metrics), weights))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Replay benchmark for the streaming spike detector.
+
+Replays every cached interest_over_time frame through a DetectorBank, point by
+point, then tiles the cached series (or synthetic ones if the cache is empty)
+up to --keywords series to measure per-point cost at scale.
+
+    python benchmarks/bench_detector.py --keywords 5000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from detector import DetectorBank  # noqa: E402
+from fetcher import CachedFetcher  # noqa: E402
+
+
+def load_cached_frames() -> list[pd.DataFrame]:
+    """All cached interest_over_time frames that carry a date index."""
+    fetcher = CachedFetcher()
+    frames = []
+    for path in sorted(config.CACHE_DIR.glob("interest_over_time_*.json")):
+        cached = fetcher._load_cache(path.stem, ttl=float("inf"))
+        if not cached:
+            continue
+        df = fetcher._frame_from_cache(cached).drop(columns=["isPartial"], errors="ignore")
+        if isinstance(df.index, pd.DatetimeIndex) and not df.empty:
+            frames.append(df)
+    return frames
+
+
+def synthetic_frame(n_keywords: int, n_points: int, seed: int = 0) -> pd.DataFrame:
+    """Weekly noisy series with occasional injected spikes."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(5, 60, n_keywords)
+    values = base + rng.normal(0, 3, (n_points, n_keywords))
+    spikes = rng.random((n_points, n_keywords)) < 0.01
+    values[spikes] += rng.uniform(20, 60, spikes.sum())
+    index = pd.date_range("2021-01-03", periods=n_points, freq="W")
+    return pd.DataFrame(np.clip(values, 0, 100), index=index, columns=[f"kw{i}" for i in range(n_keywords)])
+
+
+def universe_frame(frames: list[pd.DataFrame], n_keywords: int, n_points: int) -> pd.DataFrame:
+    """Tile cached series side by side up to n_keywords columns."""
+    if not frames:
+        return synthetic_frame(n_keywords, n_points)
+
+    columns = [df[col].to_numpy(dtype=float)[-n_points:] for df in frames for col in df.columns]
+    length = min(len(c) for c in columns)
+    tiled = np.stack([columns[i % len(columns)][-length:] for i in range(n_keywords)], axis=1)
+    index = frames[0].index[-length:]
+    return pd.DataFrame(tiled, index=index, columns=[f"kw{i}" for i in range(n_keywords)])
+
+
+def bench(df: pd.DataFrame) -> dict:
+    """Replay a frame row by row and time it."""
+    bank = DetectorBank()
+    start = time.perf_counter()
+    events = bank.update_frame(df)
+    elapsed = time.perf_counter() - start
+
+    points = df.size
+    return {
+        "series": df.shape[1],
+        "points": points,
+        "seconds": elapsed,
+        "us_per_point": elapsed / points * 1e6,
+        "events": len(events),
+        "state_bytes": bank.state_nbytes(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keywords", type=int, default=5000, help="Series to replay at scale (default: 5000)")
+    parser.add_argument("--points", type=int, default=260, help="Points per series at scale (default: 260)")
+    args = parser.parse_args()
+
+    frames = load_cached_frames()
+    print(f"Cached frames: {len(frames)}")
+
+    if frames:
+        for df in frames[:5]:
+            result = bench(df)
+            print(f"  replay {list(df.columns)}: {result['points']} pts, {result['events']} events")
+
+    result = bench(universe_frame(frames, args.keywords, args.points))
+    print(
+        f"Scale: {result['series']} series x {result['points'] // result['series']} pts "
+        f"in {result['seconds']:.3f}s ({result['us_per_point']:.2f} us/point), "
+        f"{result['events']} events, state={result['state_bytes'] / 1024:.0f} KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for parallel analytics.
+
+Runs metric extraction, forecast fitting and curve clustering over a synthetic
+universe of --keywords weekly series, first in-process and then on an
+AnalyticsExecutor with 1, 2, 4, ... up to --max-workers worker processes, and
+reports the speedup of each over in-process. Every parallel result is checked
+against the in-process one, so a sharding bug shows up as a mismatch.
+
+Clustering recall is checked too: on the first --recall-sample series, the
+share of linkable pairs (found by comparing every pair) that the curve LSH
+makes candidates.
+
+    python benchmarks/bench_parallel.py --keywords 100000 --max-workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from analyzer import KeywordAnalyzer  # noqa: E402
+from clustering import aligned_curves, cluster_keywords, simhash_pairs  # noqa: E402
+from forecast import ForecastBank  # noqa: E402
+from parallel import AnalyticsExecutor  # noqa: E402
+
+
+def synthetic_universe(n_keywords: int, n_points: int, group: int = 10, seed: int = 0) -> pd.DataFrame:
+    """Weekly random-walk series in co-moving groups of `group` (so clustering has work to do)."""
+    rng = np.random.default_rng(seed)
+    walks = np.cumsum(rng.normal(0, 3, (n_points, -(-n_keywords // group))), axis=0)
+    values = np.repeat(walks, group, axis=1)[:, :n_keywords] + rng.normal(0, 1, (n_points, n_keywords))
+    index = pd.date_range("2025-01-05", periods=n_points, freq="W", name="date")
+    return pd.DataFrame(np.round(np.clip(50 + values, 0, 100)), index=index, columns=[f"kw {i}" for i in range(n_keywords)])
+
+
+def run_tasks(df: pd.DataFrame, executor: AnalyticsExecutor | None) -> tuple[dict, dict]:
+    """(seconds per task, comparable output per task)."""
+    seconds, output = {}, {}
+
+    start = time.perf_counter()
+    metrics = KeywordAnalyzer().extract_metrics_batch(df, {}, executor=executor)
+    seconds["metrics"] = time.perf_counter() - start
+    output["metrics"] = [(m.avg_interest, m.momentum, m.recent_peak) for m in metrics.values()]
+
+    start = time.perf_counter()
+    bank = ForecastBank(executor=executor)
+    bank.update_frame(df)
+    seconds["forecast"] = time.perf_counter() - start
+    output["forecast"] = (bank.level.copy(), bank.coef.copy(), bank.model.copy())
+
+    series = {kw: df[kw] for kw in df.columns}
+    start = time.perf_counter()
+    clusters = cluster_keywords(list(series), series, {}, executor=executor)
+    seconds["cluster"] = time.perf_counter() - start
+    output["cluster"] = [(c.representative, c.members) for c in clusters]
+    return seconds, output
+
+
+def cluster_recall(df: pd.DataFrame, sample: int) -> tuple[float, int, int]:
+    """(recall, linkable pairs, candidate pairs) of the curve LSH on the first `sample` series."""
+    series = {kw: df[kw] for kw in df.columns[:sample]}
+    _, curves, changes = aligned_curves(series, list(series))
+    n = len(curves)
+    linkable = []
+    for start in range(0, n, 1000):  # Every pair, a block of rows at a time
+        r = curves[start : start + 1000] @ curves.T
+        r_changes = changes[start : start + 1000] @ changes.T
+        a, b = np.nonzero((r >= config.CLUSTER_MIN_CORRELATION) & (r_changes >= config.CLUSTER_MIN_CHANGE_CORRELATION))
+        keep = a + start < b
+        linkable.append((a[keep] + start).astype(np.int64) * n + b[keep])
+    linkable = np.concatenate(linkable)
+
+    candidates = simhash_pairs(np.hstack([curves, changes]) / np.sqrt(2))
+    found = np.isin(linkable, candidates[:, 0].astype(np.int64) * n + candidates[:, 1])
+    return (float(found.mean()) if len(linkable) else 1.0), len(linkable), len(candidates)
+
+
+def same(a, b) -> bool:
+    if isinstance(a, tuple):
+        return all(np.array_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keywords", type=int, default=100000, help="Series in the universe (default: 100000)")
+    parser.add_argument("--points", type=int, default=52, help="Weekly points per series (default: 52)")
+    parser.add_argument(
+        "--max-workers", type=int, default=os.cpu_count() or 1, help="Most worker processes to try (default: CPU cores)"
+    )
+    parser.add_argument(
+        "--recall-sample", type=int, default=5000, help="Series compared exhaustively for clustering recall (default: 5000)"
+    )
+    args = parser.parse_args()
+
+    df = synthetic_universe(args.keywords, args.points)
+    print(f"Universe: {args.keywords} series x {args.points} pts, {os.cpu_count()} CPU cores")
+
+    recall, linkable, candidates = cluster_recall(df, args.recall_sample)
+    print(
+        f"  cluster LSH recall: {recall:.1%} of {linkable} linkable pairs among the first "
+        f"{min(args.recall_sample, args.keywords)} series ({candidates} candidates)"
+    )
+
+    baseline, expected = run_tasks(df, None)
+    print("  in-process: " + ", ".join(f"{task} {s:.2f}s" for task, s in baseline.items()))
+
+    workers = 1
+    while workers <= args.max_workers:
+        # min_rows=0: use the pool even for a small --keywords (one worker still runs in-process)
+        with AnalyticsExecutor(workers=workers, min_rows=0) as executor:
+            seconds, output = run_tasks(df, executor)
+        print(
+            f"  {workers} worker(s): "
+            + ", ".join(
+                f"{task} {s:.2f}s ({baseline[task] / s:.1f}x{'' if same(output[task], expected[task]) else ', MISMATCH'})"
+                for task, s in seconds.items()
+            )
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the CLI.
+
+Each measurement runs in a fresh interpreter so import caches don't leak
+between samples:
+
+  - startup_import       `import scraper` (what every invocation pays)
+  - startup_help         `scraper.py --help`
+  - startup_cached_json  `--keywords ... --no-report --json` with every request
+                         a cache hit (cache primed from the local mock server)
+
+Also prints the heaviest modules from `python -X importtime` for the cached run,
+which is where a regression in lazy loading shows up first.
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+
+import argparse
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+KEYWORDS = "world war 3,us iran war,draft"
+
+# Redirects every directory the research command writes to, then runs the CLI
+CACHED_RUN = """
+import sys
+from pathlib import Path
+sys.path.insert(0, {root!r})
+import config
+tmp = Path({tmp!r})
+config.CACHE_DIR = tmp / "cache"
+config.ENTITY_INDEX_FILE = tmp / "cache" / "entities.json"
+config.DATA_DIR = tmp / "data"
+config.HISTORY_DIR = tmp / "data" / "history"  # Derived from DATA_DIR at import, so set it too
+config.DETECTOR_STATE_DIR = tmp / "detector"
+config.FORECAST_STATE_DIR = tmp / "forecast"
+config.JOBS_DIR = tmp / "jobs"
+config.REPORTS_DIR = tmp / "reports"
+sys.argv = ["scraper.py", "--keywords", {keywords!r}, "--no-report", "--json"]
+import logging
+logging.disable(logging.WARNING)
+import scraper
+scraper.main()
+"""
+
+
+def run_python(args: list[str]) -> float:
+    """Wall time of one fresh interpreter running `python <args>`."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=PROJECT_ROOT, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def sample(args: list[str], repeat: int) -> dict:
+    run_python(args)  # Warm the OS file cache and __pycache__
+    samples = [run_python(args) for _ in range(repeat)]
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "repeat": repeat}
+
+
+def prime_cache(tmp: Path) -> None:
+    """Fill a throwaway cache with mock responses for KEYWORDS."""
+    import config
+    from fetcher import CachedFetcher
+    from mock_trends import MockTrendsServer
+
+    previous, config.CACHE_DIR = config.CACHE_DIR, tmp / "cache"
+    server = MockTrendsServer().start()
+    try:
+        fetcher = CachedFetcher(backoff_seconds=0, client_factory=server.client_factory)
+        keywords = KEYWORDS.split(",")
+        fetcher.interest_over_time(keywords)
+        fetcher.related_queries(keywords)
+        fetcher.related_topics(keywords)
+    finally:
+        server.stop()
+        config.CACHE_DIR = previous
+
+
+def heaviest_imports(code: str, top: int) -> list[tuple[int, str]]:
+    """Top-level modules by cumulative import time (microseconds)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, check=True, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match and len(match.group(2)) <= 2:  # scraper's own imports and below one level
+            rows.append((int(match.group(1)), match.group(3)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run(repeat: int) -> dict:
+    """All startup measurements; used by run.py as the `startup` benchmark."""
+    tmp = Path(tempfile.mkdtemp(prefix="trends-startup-"))
+    try:
+        prime_cache(tmp)
+        cached_code = CACHED_RUN.format(root=str(PROJECT_ROOT), tmp=str(tmp), keywords=KEYWORDS)
+        return {
+            "startup_import": sample(["-c", "import scraper"], repeat),
+            "startup_help": sample(["scraper.py", "--help"], repeat),
+            "startup_cached_json": sample(["-c", cached_code], repeat),
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest imports to list")
+    args = parser.parse_args()
+
+    for name, result in run(args.repeat).items():
+        print(f"{name:<24} {result['median_s'] * 1000:>8.1f} ms  (min {result['min_s'] * 1000:.1f} ms)")
+
+    tmp = Path(tempfile.mkdtemp(prefix="trends-startup-"))
+    try:
+        prime_cache(tmp)
+        code = CACHED_RUN.format(root=str(PROJECT_ROOT), tmp=str(tmp), keywords=KEYWORDS)
+        print("\nHeaviest imports on the cached --json path:")
+        for micros, module in heaviest_imports(code, args.top):
+            print(f"  {micros / 1000:>8.1f} ms  {module}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
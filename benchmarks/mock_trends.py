@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Local mock Google Trends server for offline benchmarks.
+
+The server answers one POST endpoint per pytrends call (/explore for the
+payload request, /interest_over_time, /related_queries, ...). Responses are
+replayed from recordings in the fetcher's cache format (point --recordings at
+a `.cache/` directory to replay real responses); anything not recorded is
+synthesized deterministically from the keywords. Latency and 429 responses
+can be injected.
+
+MockTrendReq is a drop-in for pytrends.TrendReq that talks to the server:
+
+    server = MockTrendsServer(latency=0.05).start()
+    fetcher = CachedFetcher(backoff_seconds=0, client_factory=server.client_factory)
+
+Run standalone to serve on a fixed port:
+
+    python benchmarks/mock_trends.py --port 8765 --latency 0.2 --error-rate 0.1
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fetcher import cache_filename  # noqa: E402
+from normalize import get_index  # noqa: E402
+
+
+def _seed(*parts) -> int:
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+    return int(digest[:8], 16)
+
+
+def _timeframe_index(timeframe: str) -> pd.DatetimeIndex:
+    """Dates Google would return for a timeframe (resolution included)."""
+    now = pd.Timestamp("2026-02-19 12:00")
+    if timeframe == "now 1-H":
+        return pd.date_range(end=now, periods=60, freq="min")
+    if timeframe == "now 4-H":
+        return pd.date_range(end=now, periods=240, freq="min")
+    if timeframe == "now 1-d":
+        return pd.date_range(end=now, periods=180, freq="8min")
+    if timeframe == "now 7-d":
+        return pd.date_range(end=now, periods=168, freq="h")
+    if timeframe.startswith("today "):
+        span = timeframe.split()[1]
+        months = {"1-m": 1, "3-m": 3, "12-m": 12, "5-y": 60}.get(span, 12)
+        start = now - pd.DateOffset(months=months)
+        freq = "D" if months <= 3 else "W"
+        return pd.date_range(start.normalize(), now.normalize(), freq=freq)
+    if timeframe == "all":
+        return pd.date_range("2004-01-01", now.normalize(), freq="MS")
+
+    start, end = (pd.Timestamp(part) for part in timeframe.split()[:2])
+    freq = "D" if (end - start).days < 270 else "W"
+    return pd.date_range(start, end, freq=freq)
+
+
+def synthesize(method: str, params: dict):
+    """Deterministic response payload (fetcher cache format) for a request."""
+    keywords = params.get("keywords", [])
+    timeframe = params.get("timeframe", "today 12-m")
+    geo = params.get("geo", "US")
+    gprop = params.get("gprop", "")
+
+    if method == "interest_over_time":
+        index = _timeframe_index(timeframe)
+        t = np.arange(len(index))
+        columns = {}
+        for kw in keywords:
+            # Scale and shape depend only on the keyword, so a keyword has the
+            # same underlying curve in every window and batch.
+            rng = np.random.default_rng(_seed(kw, geo, gprop))
+            level = rng.uniform(5, 80)
+            absolute_t = (index - pd.Timestamp("2004-01-01")).days.to_numpy() / 7
+            curve = level * (1 + 0.3 * np.sin(absolute_t / rng.uniform(5, 30)))
+            curve += rng.normal(0, level * 0.05, len(t))
+            columns[kw] = np.clip(curve, 0, None)
+        peak = max((c.max() for c in columns.values()), default=1.0) or 1.0
+        data = {"date": [d.isoformat() for d in index]}
+        for kw, curve in columns.items():
+            data[kw] = np.round(curve / peak * 100).astype(int).tolist()
+        data["isPartial"] = [False] * (len(index) - 1) + [True] if len(index) else []
+        return data
+
+    if method in ("related_queries", "related_topics"):
+        result = {}
+        for kw in keywords:
+            rng = random.Random(_seed(method, kw, timeframe, geo))
+            suffixes = ["news", "today", "map", "explained", "2026", "odds", "live", "update",
+                        "history", "timeline", "reddit", "latest", "nuclear", "draft", "russia"]
+            top, rising = [], []
+            if method == "related_topics":
+                # As on Trends, a query's top related topic is usually its own entity
+                top.append({
+                    "value": 100,
+                    "formattedValue": "100",
+                    "topic_mid": f"/m/{_seed(kw) % 10**6:06d}",
+                    "topic_title": kw.title(),
+                    "topic_type": "Topic",
+                })
+            for i, suffix in enumerate(rng.sample(suffixes, 10)):
+                entry = {"query": f"{kw} {suffix}", "value": 100 - i * 8}
+                if method == "related_topics":
+                    entry = {
+                        "value": entry["value"],
+                        "formattedValue": str(entry["value"]),
+                        "topic_mid": f"/m/{_seed(kw, suffix) % 10**6:06d}",
+                        "topic_title": entry["query"].title(),
+                        "topic_type": "Topic",
+                    }
+                top.append(entry)
+            for suffix in rng.sample(suffixes, 8):
+                value = rng.choice([40, 120, 350, 900, 5000, 250000])
+                entry = {"query": f"{kw} {suffix} update", "value": value}
+                if method == "related_topics":
+                    entry = {
+                        "value": value,
+                        "formattedValue": "Breakout" if value >= 5000 else f"+{value}%",
+                        "topic_mid": f"/m/{_seed(kw, suffix, 'r') % 10**6:06d}",
+                        "topic_title": f"{suffix.title()} ({kw})",
+                        "topic_type": "Topic",
+                    }
+                rising.append(entry)
+            result[kw] = {"top": top, "rising": rising}
+        return result
+
+    if method == "interest_by_region":
+        rng = np.random.default_rng(_seed(method, *keywords))
+        regions = [f"Region {i}" for i in range(50)]
+        data = {"geoName": regions}
+        for kw in keywords:
+            data[kw] = rng.integers(0, 101, len(regions)).tolist()
+        return data
+
+    if method == "trending_searches":
+        rng = random.Random(_seed(method, params.get("pn")))
+        topics = ["iran", "world war 3", "draft", "nato", "taiwan", "oil prices", "israel",
+                  "ukraine", "china", "north korea", "missile", "embassy", "stocks", "gold",
+                  "election", "senate", "earthquake", "hurricane", "nfl", "nba"]
+        rng.shuffle(topics)
+        return {"0": topics}
+
+    if method == "realtime_trending_searches":
+        rng = random.Random(_seed(method, params.get("pn"), params.get("cat")))
+        titles = ["Iran, Israel, Strike", "NATO, Article 5", "Taiwan, China, Drills", "Oil, OPEC"]
+        rng.shuffle(titles)
+        return {"title": titles, "entityNames": [t.split(", ") for t in titles]}
+
+    return {}
+
+
+class MockTrendsServer:
+    """Threaded HTTP server replaying recorded (or synthetic) Trends responses."""
+
+    def __init__(
+        self,
+        recordings_dir: Path | None = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        fail_every: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ):
+        self.recordings_dir = Path(recordings_dir) if recordings_dir else None
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_every = fail_every  # Deterministic 429 on every Nth request (0 = off)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "replayed": 0, "synthesized": 0}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _recording(self, method: str, params: dict):
+        """Recorded payload under the fetcher's cache-key naming, if present."""
+        if not self.recordings_dir:
+            return None
+        keywords = params.get("keywords", [])
+        prefix = {"realtime_trending_searches": "realtime_trends"}.get(method, method)
+        if method in ("trending_searches", "realtime_trending_searches"):
+            name = f"{prefix}_{params.get('geo', 'US')}"
+            if method == "realtime_trending_searches":
+                name += f"_{params.get('cat', 'all')}"
+        else:
+            name = f"{prefix}_{get_index().batch_key(keywords)}_{params.get('timeframe')}_{params.get('geo')}"
+        path = self.recordings_dir / cache_filename(name)
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def respond(self, method: str, params: dict) -> tuple[int, dict]:
+        """Status code and payload for one request."""
+        with self._lock:
+            self.stats["requests"] += 1
+            n = self.stats["requests"]
+            throttle = (self.fail_every and n % self.fail_every == 0) or self._rng.random() < self.error_rate
+            if throttle:
+                self.stats["throttled"] += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+        if throttle:
+            return 429, {"error": "Too Many Requests"}
+        if method == "explore":
+            return 200, {"widgets": len(params.get("keywords", []))}
+
+        payload = self._recording(method, params)
+        with self._lock:
+            self.stats["replayed" if payload is not None else "synthesized"] += 1
+        return 200, payload if payload is not None else synthesize(method, params)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                params = json.loads(self.rfile.read(length) or b"{}")
+                status, payload = server.respond(self.path.strip("/"), params)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MockTrendsServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def client_factory(self, hl: str = "en-US", tz: int = 360) -> "MockTrendReq":
+        """Factory for CachedFetcher(client_factory=...)."""
+        return MockTrendReq(self.url, hl=hl, tz=tz)
+
+
+class MockTrendReq:
+    """The subset of pytrends.TrendReq used by CachedFetcher, backed by the mock server."""
+
+    def __init__(self, base_url: str, hl: str = "en-US", tz: int = 360):
+        self.base_url = base_url
+        self.hl = hl
+        self.tz = tz
+        self.session = requests.Session()
+        self.payload = {}
+
+    def _post(self, method: str, **params):
+        response = self.session.post(f"{self.base_url}/{method}", json=params, timeout=30)
+        if response.status_code == 429:
+            raise requests.HTTPError("The request failed: Google returned a response with code 429")
+        response.raise_for_status()
+        return response.json()
+
+    def build_payload(self, kw_list, cat=0, timeframe="today 5-y", geo="", gprop=""):
+        self.payload = {"keywords": list(kw_list), "cat": cat, "timeframe": timeframe, "geo": geo, "gprop": gprop}
+        self._post("explore", **self.payload)
+
+    def interest_over_time(self):
+        data = self._post("interest_over_time", **self.payload)
+        df = pd.DataFrame(data)
+        if df.empty:
+            return df
+        df["date"] = pd.to_datetime(df["date"])
+        return df.set_index("date")
+
+    def _related(self, method: str) -> dict:
+        data = self._post(method, **self.payload)
+        return {
+            kw: {kind: pd.DataFrame(rows) for kind, rows in parts.items()}
+            for kw, parts in data.items()
+        }
+
+    def related_queries(self):
+        return self._related("related_queries")
+
+    def related_topics(self):
+        return self._related("related_topics")
+
+    def interest_by_region(self, resolution="COUNTRY", inc_low_vol=False, inc_geo_code=False):
+        data = self._post("interest_by_region", resolution=resolution, **self.payload)
+        return pd.DataFrame(data).set_index("geoName")
+
+    def trending_searches(self, pn="united_states"):
+        return pd.DataFrame(self._post("trending_searches", pn=pn, geo=pn))
+
+    def realtime_trending_searches(self, pn="US", cat="all", count=300):
+        return pd.DataFrame(self._post("realtime_trending_searches", pn=pn, geo=pn, cat=cat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve mock Google Trends responses.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--recordings", type=Path, help="Directory of recorded responses (fetcher cache format)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 429 per request")
+    parser.add_argument("--fail-every", type=int, default=0, help="Return 429 on every Nth request")
+    args = parser.parse_args()
+
+    server = MockTrendsServer(args.recordings, args.latency, args.error_rate, args.fail_every, port=args.port)
+    print(f"Mock Trends server on {server.url} (Ctrl-C to stop)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite.
+
+Runs every benchmark against the local mock Trends server (no network, no 60 s
+backoff), with the cache redirected to a temporary directory, and appends the
+results to benchmarks/results/history.jsonl. Each run is compared with the
+previous entry and slowdowns beyond --threshold are reported.
+
+    python benchmarks/run.py                      # full suite
+    python benchmarks/run.py --only cache,metrics # subset
+    python benchmarks/run.py --sizes 10,1000      # smaller metric sweep
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+import bench_startup  # noqa: E402
+import config  # noqa: E402
+from analyzer import KeywordAnalyzer, KeywordMetrics  # noqa: E402
+from crawler import RelatedQueryCrawler  # noqa: E402
+from fetcher import CachedFetcher  # noqa: E402
+from forecast import ForecastEngine  # noqa: E402
+from mock_trends import MockTrendsServer  # noqa: E402
+from planner import Episode, RefreshPlanner, SnapshotStore  # noqa: E402
+from ranking import metrics_table, rank  # noqa: E402
+from reporter import HTMLReporter  # noqa: E402
+from scraper import fetch_data_for_keywords  # noqa: E402
+
+HISTORY_FILE = BENCH_DIR / "results" / "history.jsonl"
+
+RESEARCH_KEYWORDS = ["world war 3", "us iran war", "israel iran war", "draft", "nato article 5"]
+REFERENCE_KEYWORDS = ["Jeffrey Epstein", "Epstein Files"]
+
+
+def timed(fn, repeat: int) -> dict:
+    """Run fn `repeat` times; fn may return a dict of extra counters."""
+    samples, extra = [], {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extra = fn() or {}
+        samples.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "repeat": repeat, **extra}
+
+
+class Suite:
+    """Benchmarks sharing one mock server and a throwaway cache directory."""
+
+    def __init__(self, latency: float, repeat: int, sizes: list[int]):
+        self.repeat = repeat
+        self.sizes = sizes
+        self.server = MockTrendsServer(latency=latency).start()
+        self.tmp = Path(tempfile.mkdtemp(prefix="trends-bench-"))
+        config.CACHE_DIR = self.tmp / "cache"
+        config.ENTITY_INDEX_FILE = config.CACHE_DIR / "entities.json"
+        config.FORECAST_STATE_DIR = config.CACHE_DIR / "forecast"
+        config.CACHE_DIR.mkdir()
+
+    def close(self) -> None:
+        self.server.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def fetcher(self) -> CachedFetcher:
+        return CachedFetcher(backoff_seconds=0, client_factory=self.server.client_factory)
+
+    def clear_cache(self) -> None:
+        for path in config.CACHE_DIR.glob("*.json"):
+            path.unlink()
+
+    # --- Fetcher cache paths -------------------------------------------------
+
+    def bench_cache(self) -> dict:
+        batches = [RESEARCH_KEYWORDS[i : i + 1] for i in range(len(RESEARCH_KEYWORDS))]
+
+        def miss():
+            self.clear_cache()
+            fetcher = self.fetcher()
+            for batch in batches:
+                fetcher.interest_over_time(batch)
+            return {"requests": fetcher.request_count}
+
+        def hit():
+            fetcher = self.fetcher()
+            for batch in batches:
+                fetcher.interest_over_time(batch)
+            return {"requests": fetcher.request_count}
+
+        results = {"cache_miss": timed(miss, self.repeat)}
+        results["cache_hit"] = timed(hit, self.repeat)
+        return results
+
+    def bench_retry_429(self) -> dict:
+        """One injected 429 per fetch: measures the retry path (dominated by its wait)."""
+        def run():
+            self.clear_cache()
+            self.server.fail_every = 2
+            try:
+                fetcher = self.fetcher()
+                fetcher.interest_over_time(["retry probe"])
+            finally:
+                self.server.fail_every = 0
+            return {"requests": fetcher.request_count}
+
+        return {"retry_429": timed(run, 1)}
+
+    # --- End-to-end runs -----------------------------------------------------
+
+    def bench_research(self) -> dict:
+        def run():
+            self.clear_cache()
+            fetcher = self.fetcher()
+            keywords = RESEARCH_KEYWORDS + REFERENCE_KEYWORDS
+            metrics, interest_df, regions_df = fetch_data_for_keywords(fetcher, keywords, "today 12-m", "US")
+
+            analyzer = KeywordAnalyzer()
+            analyzer.set_reference_keywords(REFERENCE_KEYWORDS, metrics)
+            scores = {kw: analyzer.compare_to_reference(kw, metrics[kw]) for kw in RESEARCH_KEYWORDS}
+
+            HTMLReporter(self.tmp / "reports").generate_research_report(
+                RESEARCH_KEYWORDS, interest_df, regions_df, metrics, scores
+            )
+            return {"requests": fetcher.request_count}
+
+        return {"research_e2e": timed(run, self.repeat)}
+
+    def bench_discovery(self) -> dict:
+        def trending():
+            self.clear_cache()
+            fetcher = self.fetcher()
+            trending_df = fetcher.trending_searches(geo="US")
+            keywords = trending_df.iloc[:10, 0].tolist()
+            metrics, _, _ = fetch_data_for_keywords(fetcher, keywords, "now 7-d", "US")
+            analyzer = KeywordAnalyzer()
+            scores = [analyzer.get_opportunity_score(m) for m in metrics.values()]
+            return {"requests": fetcher.request_count, "scored": len(scores)}
+
+        def crawl():
+            self.clear_cache()
+            fetcher = self.fetcher()
+            graph = RelatedQueryCrawler(fetcher, request_budget=20).crawl(["world war 3"])
+            return {"requests": fetcher.request_count, "nodes": len(graph.nodes)}
+
+        return {"discovery_e2e": timed(trending, self.repeat), "crawl_e2e": timed(crawl, self.repeat)}
+
+    # --- Analyzer --------------------------------------------------------------
+
+    def bench_metrics(self) -> dict:
+        results = {}
+        rng = np.random.default_rng(0)
+        index = pd.date_range("2025-02-16", periods=52, freq="W", name="date")
+
+        for size in self.sizes:
+            keywords = [f"kw{i}" for i in range(size)]
+            interest_df = pd.DataFrame(rng.uniform(0, 100, (52, size)), index=index, columns=keywords)
+            related = {
+                kw: {"top": [{"query": f"{kw} q{j}", "value": 50} for j in range(10)],
+                     "rising": [{"query": f"{kw} r{j}", "value": 300} for j in range(5)]}
+                for kw in keywords
+            }
+
+            def run():
+                analyzer = KeywordAnalyzer()
+                for kw in keywords:
+                    analyzer.extract_metrics(kw, interest_df, related)
+                return {"keywords": size}
+
+            results[f"extract_metrics_{size}"] = timed(run, 1 if size >= 10000 else self.repeat)
+        return results
+
+    def bench_rank(self) -> dict:
+        """Score and rank a whole metrics table, against the per-keyword loop."""
+        results = {}
+        rng = np.random.default_rng(0)
+        for size in self.sizes:
+            metrics = {
+                f"kw{i}": KeywordMetrics(
+                    keyword=f"kw{i}", avg_interest=float(rng.uniform(0, 100)), max_interest=100.0, min_interest=0.0,
+                    volatility=1.0, momentum=float(rng.uniform(-1, 3)), breakout_queries_count=int(rng.integers(0, 5)),
+                    related_queries_count=int(rng.integers(0, 25)), rising_queries_count=0,
+                    recent_peak=bool(rng.random() < 0.5), recent_peak_value=0.0,
+                )
+                for i in range(size)
+            }
+            table = metrics_table(metrics)
+
+            def loop():
+                analyzer = KeywordAnalyzer()
+                scores = [(analyzer.get_opportunity_score(m), kw) for kw, m in metrics.items()]
+                return {"keywords": size, "top": len(sorted(scores, reverse=True)[: config.RANK_TOP_K])}
+
+            def vectorized():
+                return {"keywords": size, "top": len(rank(table, "geopolitics"))}
+
+            repeat = 1 if size >= 10000 else self.repeat
+            results[f"rank_loop_{size}"] = timed(loop, repeat)
+            results[f"rank_vectorized_{size}"] = timed(vectorized, repeat)
+        return results
+
+    def bench_forecast(self) -> dict:
+        """Forecast every series from scratch, then again with two new points on cached state."""
+        results = {}
+        rng = np.random.default_rng(0)
+        index = pd.date_range("2025-02-16", periods=54, freq="W", name="date")
+
+        for size in self.sizes:
+            keywords = [f"kw{i}" for i in range(size)]
+            values = np.round(np.clip(50 + np.cumsum(rng.normal(0, 3, (54, size)), axis=0), 0, 100))
+            first = pd.DataFrame(values[:52], index=index[:52], columns=keywords)
+            later = pd.DataFrame(values[2:], index=index[2:], columns=keywords)
+            state_dir = self.tmp / f"forecast_{size}"
+
+            def full():
+                shutil.rmtree(state_dir, ignore_errors=True)
+                engine = ForecastEngine(state_dir)
+                forecasts = engine.forecast_frame(first, "today 12-m", "US")
+                engine.save()
+                return {"series": len(forecasts)}
+
+            def incremental():
+                return {"series": len(ForecastEngine(state_dir).forecast_frame(later, "today 12-m", "US"))}
+
+            repeat = 1 if size >= 10000 else self.repeat
+            results[f"forecast_full_{size}"] = timed(full, repeat)
+            full()
+            results[f"forecast_incremental_{size}"] = timed(incremental, repeat)
+        return results
+
+    # --- Reporter ----------------------------------------------------------------
+
+    def bench_report(self) -> dict:
+        fetcher = self.fetcher()
+        metrics, interest_df, regions_df = fetch_data_for_keywords(fetcher, RESEARCH_KEYWORDS, "today 5-y", "US")
+        reporter = HTMLReporter(self.tmp / "reports")
+
+        def run():
+            path = reporter.generate_research_report(RESEARCH_KEYWORDS, interest_df, regions_df, metrics)
+            return {"bytes": path.stat().st_size}
+
+        return {"report_render": timed(run, self.repeat)}
+
+    def bench_incremental(self) -> dict:
+        """Refresh a stale batch in full and by splicing; splicing must cost fewer requests."""
+        keywords = RESEARCH_KEYWORDS[:2]
+        self.clear_cache()
+        fetch_data_for_keywords(self.fetcher(), keywords, "today 12-m", "US")
+        cached = {path: path.read_bytes() for path in config.CACHE_DIR.glob("*.json")}
+
+        def refresh(incremental):
+            def run():
+                for path, data in cached.items():
+                    path.write_bytes(data)
+                    os.utime(path, (time.time() - 2 * config.CACHE_TTL_SECONDS,) * 2)
+                fetcher = self.fetcher()
+                fetch_data_for_keywords(fetcher, keywords, "today 12-m", "US", incremental=incremental)
+                return {"requests": fetcher.request_count}
+            return run
+
+        results = {"refresh_full": timed(refresh(False), self.repeat)}
+        results["refresh_incremental"] = timed(refresh(True), self.repeat)
+        if results["refresh_incremental"]["requests"] >= results["refresh_full"]["requests"]:
+            raise RuntimeError(
+                f"Incremental refresh made {results['refresh_incremental']['requests']} requests, "
+                f"a full refetch {results['refresh_full']['requests']}"
+            )
+        return results
+
+    # --- Refresh planner -------------------------------------------------------------
+
+    def bench_plan(self) -> dict:
+        """Plan a calendar of recorded episodes; a stale-cache record must leave its keyword due."""
+        now = datetime.now(timezone.utc)
+        episodes = [
+            Episode(episode_num=i, title=f"Episode {i}", primary_keyword=f"kw{i}", air_time=now + timedelta(hours=i))
+            for i in range(1, 101)
+        ]
+        store = SnapshotStore(self.tmp / "episodes")
+        shutil.rmtree(store.directory, ignore_errors=True)
+        planner = RefreshPlanner(episodes, store=store, now=now)
+        metrics = KeywordMetrics(
+            keyword="kw", avg_interest=50.0, max_interest=100.0, min_interest=0.0, volatility=1.0, momentum=0.0,
+            breakout_queries_count=0, related_queries_count=0, rising_queries_count=0,
+            recent_peak=False, recent_peak_value=0.0,
+        )
+        for p in planner.plan():
+            planner.record(p, metrics, "stale" if p.keyword == "kw1" else "fresh")
+
+        def run():
+            plan = planner.plan()
+            return {"keywords": len(plan), "due": sum(p.due for p in plan)}
+
+        result = timed(run, self.repeat)
+        if result["due"] != 1 or not next(p for p in planner.plan() if p.keyword == "kw1").due:
+            raise RuntimeError(f"Only the stale-recorded keyword should be due; {result['due']} are")
+        return {"plan_100_episodes": result}
+
+    # --- CLI startup ---------------------------------------------------------------
+
+    def bench_startup(self) -> dict:
+        return bench_startup.run(self.repeat)
+
+
+BENCHMARKS = {
+    "cache": Suite.bench_cache,
+    "retry": Suite.bench_retry_429,
+    "research": Suite.bench_research,
+    "incremental": Suite.bench_incremental,
+    "discovery": Suite.bench_discovery,
+    "metrics": Suite.bench_metrics,
+    "rank": Suite.bench_rank,
+    "forecast": Suite.bench_forecast,
+    "report": Suite.bench_report,
+    "plan": Suite.bench_plan,
+    "startup": Suite.bench_startup,
+}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR.parent,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def last_entry(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    lines = [line for line in path.read_text().splitlines() if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def compare(previous: dict | None, results: dict, threshold: float) -> list[str]:
+    """Benchmarks whose median got slower than the previous run by > threshold."""
+    if not previous:
+        return []
+    regressions = []
+    for name, result in results.items():
+        before = previous.get("results", {}).get(name)
+        if not before or before["median_s"] <= 0:
+            continue
+        change = result["median_s"] / before["median_s"] - 1
+        if change > threshold:
+            regressions.append(f"{name}: {before['median_s']:.4f}s -> {result['median_s']:.4f}s (+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", type=str, help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--skip", type=str, default="", help="Comma-separated benchmarks to skip")
+    parser.add_argument("--sizes", type=str, default="10,1000,100000", help="Keyword counts for metric extraction")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per benchmark (median reported)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock server latency per request (seconds)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Regression threshold vs previous run")
+    parser.add_argument("--history", type=Path, default=HISTORY_FILE, help="History file (JSON lines)")
+    parser.add_argument("--no-save", action="store_true", help="Don't append results to the history file")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any benchmark regressed")
+    args = parser.parse_args()
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    selected = [name for name in selected if name not in args.skip.split(",")]
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {unknown}")
+
+    # Benchmarks log every fetch; keep the output readable
+    import logging
+    logging.disable(logging.WARNING)
+
+    suite = Suite(args.latency, args.repeat, [int(s) for s in args.sizes.split(",")])
+    results = {}
+    try:
+        for name in selected:
+            for bench_name, result in BENCHMARKS[name](suite).items():
+                results[bench_name] = result
+                extras = {k: v for k, v in result.items() if k not in ("median_s", "min_s", "repeat")}
+                print(f"{bench_name:<28} {result['median_s'] * 1000:>10.2f} ms  {extras}")
+    finally:
+        suite.close()
+
+    entry = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_rev": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "latency": args.latency,
+        "results": results,
+    }
+
+    regressions = compare(last_entry(args.history), results, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+
+    if not args.no_save:
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        print(f"Results appended to {args.history}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
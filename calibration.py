@@ -0,0 +1,167 @@
+"""
+Calibration module: Approximate absolute scale for relative Trends values.
+
+Trends scales every request so its own peak is 100, so avg interest from two
+batches is not comparable. A ladder of anchor keywords (CALIBRATION_ANCHORS,
+very popular down to niche) is fetched in short overlapping requests once per
+CALIBRATION_TABLE_MAX_AGE_DAYS; chaining the shared anchors gives every anchor
+an avg interest on one global scale (the top anchor = 100), cached in
+`.cache/anchors.json`.
+
+A fetched batch is then calibrated with one small bridge request: the batch's
+strongest keyword next to the anchor closest to its expected volume. The
+bridge puts that keyword on the global scale, and the rest of the batch
+follows through their ratios within the batch. A bridge where either side is
+too small to read moves one step along the ladder and retries. Bridges are
+cached like any interest request, so repeat runs cost nothing.
+"""
+
+import json
+import logging
+import math
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import config
+from fetcher import CachedFetcher
+from locking import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class CalibrationError(Exception):
+    """Raised when anchors or a bridge cannot be put on one scale."""
+    pass
+
+
+def ladder_batches(anchors: list[str], size: int = config.CALIBRATION_CHAIN_SIZE) -> list[list[str]]:
+    """Overlapping anchor batches: each starts with the last anchor of the previous one."""
+    if size < 2:
+        raise ValueError("Ladder batches need at least 2 anchors to chain")
+    step = size - 1
+    return [anchors[i : i + size] for i in range(0, max(len(anchors) - 1, 1), step)]
+
+
+def _averages(df: pd.DataFrame, keywords: list[str]) -> dict[str, float]:
+    return {kw: float(df[kw].mean()) if kw in df.columns else 0.0 for kw in keywords}
+
+
+def build_anchor_table(
+    fetcher: CachedFetcher,
+    timeframe: str = config.DEFAULT_TIMEFRAME,
+    geo: str = config.DEFAULT_GEO,
+    anchors: list[str] = config.CALIBRATION_ANCHORS,
+) -> dict[str, float]:
+    """Global avg interest of every anchor, chained down the ladder (top anchor = 100)."""
+    table: dict[str, float] = {}
+    for batch in ladder_batches(anchors):
+        averages = _averages(fetcher.interest_over_time(batch, timeframe=timeframe, geo=geo), batch)
+        shared = batch[0]
+        if averages[shared] <= 0:
+            raise CalibrationError(f"Anchor '{shared}' has no interest in {geo}/{timeframe}; fix the ladder")
+
+        factor = (table[shared] if table else 100.0) / averages[shared]
+        for anchor in batch:
+            table.setdefault(anchor, averages[anchor] * factor)
+
+    # The chain ends where interest runs out; anchors below that can't be used
+    usable = {anchor: value for anchor, value in table.items() if value > 0}
+    logger.info(f"Anchor table ({geo}, {timeframe}): " + ", ".join(f"{a}={v:.3g}" for a, v in usable.items()))
+    return usable
+
+
+class AnchorTable:
+    """Anchor values per (geo, timeframe), rebuilt when older than CALIBRATION_TABLE_MAX_AGE_DAYS."""
+
+    def __init__(self, fetcher: CachedFetcher, path=None):
+        self.fetcher = fetcher
+        self.path = path or config.CALIBRATION_TABLE_FILE
+
+    def _load_all(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Failed to load anchor table {self.path}: {e}")
+            return {}
+
+    def get(self, timeframe: str, geo: str) -> dict[str, float]:
+        """Anchor values for a geo/timeframe, rebuilding the table if it is due."""
+        key = f"{geo}|{timeframe}"
+        tables = self._load_all()
+        entry = tables.get(key)
+        if entry:
+            age = datetime.now() - datetime.fromisoformat(entry["built_at"])
+            if age < timedelta(days=config.CALIBRATION_TABLE_MAX_AGE_DAYS) or self.fetcher.offline:
+                return entry["values"]
+
+        logger.info(f"Building anchor table for {geo}/{timeframe}")
+        values = build_anchor_table(self.fetcher, timeframe, geo)
+        tables = self._load_all()  # Another process may have written other keys meanwhile
+        tables[key] = {"built_at": datetime.now().isoformat(timespec="seconds"), "values": values}
+        atomic_write_json(self.path, tables, indent=2)
+        return values
+
+
+class Calibrator:
+    """Maps batches of keywords onto the anchor table's global scale."""
+
+    def __init__(self, fetcher: CachedFetcher, table: AnchorTable | None = None):
+        self.fetcher = fetcher
+        self.table = table or AnchorTable(fetcher)
+
+    @staticmethod
+    def nearest_anchor(anchors: dict[str, float], estimate: float | None) -> str:
+        """Anchor closest to an expected global value (log scale); the middle one if unknown."""
+        ordered = sorted(anchors, key=anchors.get, reverse=True)
+        if not estimate or estimate <= 0:
+            return ordered[len(ordered) // 2]
+        return min(ordered, key=lambda a: abs(math.log10(anchors[a]) - math.log10(estimate)))
+
+    def calibrate(
+        self,
+        interest_df: pd.DataFrame,
+        keywords: list[str],
+        timeframe: str,
+        geo: str,
+        estimate: float | None = None,
+    ) -> dict[str, float]:
+        """Global avg interest for every keyword of one batch frame.
+
+        estimate is the expected global value of the batch's strongest keyword
+        (e.g. from metric history); a good one means a single bridge request.
+        """
+        anchors = self.table.get(timeframe, geo)
+        if not anchors:
+            raise CalibrationError("Anchor table is empty")
+        ordered = sorted(anchors, key=anchors.get, reverse=True)
+
+        averages = _averages(interest_df, keywords)
+        lead = max(keywords, key=averages.get)
+        if averages[lead] <= 0:
+            return {kw: 0.0 for kw in keywords}
+
+        anchor = self.nearest_anchor(anchors, estimate)
+        for _ in range(config.CALIBRATION_MAX_STEPS):
+            if anchor == lead:
+                lead_global = anchors[anchor]
+                break
+            bridge = _averages(self.fetcher.interest_over_time([lead, anchor], timeframe=timeframe, geo=geo), [lead, anchor])
+            position = ordered.index(anchor)
+            if bridge[anchor] < config.CALIBRATION_MIN_SIGNAL and position > 0:
+                anchor = ordered[position - 1]  # Anchor drowned out: step up to a bigger one
+            elif bridge[lead] < config.CALIBRATION_MIN_SIGNAL and position < len(ordered) - 1:
+                anchor = ordered[position + 1]  # Keyword drowned out: step down to a smaller one
+            elif bridge[anchor] > 0:
+                lead_global = bridge[lead] * anchors[anchor] / bridge[anchor]
+                break
+            else:
+                raise CalibrationError(f"No usable anchor for '{lead}'")
+        else:
+            raise CalibrationError(f"No anchor within {config.CALIBRATION_MAX_STEPS} steps of '{lead}'")
+
+        logger.info(f"Calibrated batch via '{lead}' ~ '{anchor}': {lead} = {lead_global:.3g} global")
+        return {kw: averages[kw] / averages[lead] * lead_global for kw in keywords}
@@ -0,0 +1,364 @@
+"""
+Clustering module: Group co-moving keywords so one representative is refreshed for many.
+
+Keywords are compared on two signals already in the cache: their interest
+curves (Pearson correlation over shared dates, of the levels and of the
+period-to-period changes, since two unrelated trending curves can correlate
+closely by chance) and their related-query sets (Jaccard overlap). Comparing
+every pair is quadratic, so candidate pairs come from locality-sensitive
+hashing instead: random-hyperplane bits (SimHash) of the normalized curves,
+where agreeing bits track correlation, and MinHash signatures of the query
+sets, where agreeing values track Jaccard. Keywords sharing a bucket in any
+band are candidates; only candidates are compared exactly, and linked pairs
+are merged with union-find.
+
+A curve is hashed as its levels and changes side by side, so two curves'
+cosine is the mean of the two correlations: at least 0.75 for any pair that
+can link (levels 0.9, changes 0.6). CLUSTER_SIMHASH_BANDS x ROWS put the
+S-curve threshold, (1/bands)^(1/rows) agreeing bits, just below that, so
+linkable pairs become candidates with high probability while unrelated
+curves rarely share a band.
+
+Curve signatures and candidate correlations can be sharded across processes
+with a parallel.AnalyticsExecutor.
+
+Each cluster's representative is its medoid: the member whose curve is most
+correlated with the others. The planner refreshes representatives on their
+members' schedule and members CLUSTER_MEMBER_AGE_FACTOR times less often.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+from fetcher import CACHE_META_KEY, cache_filename
+from locking import atomic_write_json
+from normalize import get_index
+
+logger = logging.getLogger(__name__)
+
+_PRIME = 4294967311  # Smallest prime above 2**32
+
+
+@dataclass
+class Cluster:
+    """Co-moving keywords and the one refreshed on their behalf."""
+    representative: str
+    members: list[str]  # Includes the representative
+
+
+# Filename of a key too long to keep whole (fetcher.cache_filename)
+_TRUNCATED_NAME = re.compile(r"_[0-9a-f]{16}\.json$")
+
+
+def _cache_entries(kind: str, timeframe: str, geo: str) -> list[dict]:
+    """Default-scope cache entries of one kind for a timeframe/geo, oldest first.
+
+    Entries are matched on the key stored in them, since filenames of long
+    keys are truncated; entries saved before keys were stored are matched on
+    their filename.
+    """
+    suffix = f"_{timeframe}_{geo}"
+    paths = [
+        p
+        for p in config.CACHE_DIR.glob(f"{kind}_*.json")
+        if p.name.endswith(cache_filename(suffix)) or _TRUNCATED_NAME.search(p.name)
+    ]
+    entries = []
+    for path in sorted(paths, key=lambda p: p.stat().st_mtime):
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable cache file {path.name}: {e}")
+            continue
+        key = cached.pop(CACHE_META_KEY, {}).get("key")
+        if key.endswith(suffix) if key else path.name.endswith(cache_filename(suffix)):
+            entries.append(cached)
+    return entries
+
+
+def load_cached_series(timeframe: str = config.DEFAULT_TIMEFRAME, geo: str = config.DEFAULT_GEO) -> dict[str, pd.Series]:
+    """Newest cached interest curve of every keyword, keyed by canonical keyword."""
+    index = get_index()
+    series = {}
+    for cached in _cache_entries("interest_over_time", timeframe, geo):
+        df = pd.DataFrame(cached)
+        if "date" not in df.columns:
+            continue
+        df = df.drop(columns=["isPartial"], errors="ignore").set_index(pd.to_datetime(df["date"])).drop(columns=["date"])
+        for column in df.columns:
+            series[index.canonical(column)] = df[column].astype(float)
+    return series
+
+
+def load_cached_related(timeframe: str = config.DEFAULT_TIMEFRAME, geo: str = config.DEFAULT_GEO) -> dict[str, set[str]]:
+    """Newest cached related-query set (top + rising, normalized) of every keyword."""
+    index = get_index()
+    related = {}
+    for cached in _cache_entries("related_queries", timeframe, geo):
+        for keyword, queries in cached.items():
+            rows = (queries or {}).get("top", []) + (queries or {}).get("rising", [])
+            related[index.canonical(keyword)] = {index.key(row["query"]) for row in rows if row.get("query")}
+    return related
+
+
+def _unit_rows(values: np.ndarray) -> np.ndarray:
+    """Rows centered and scaled to unit length, so a dot product is their correlation."""
+    centered = values - values.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=1, keepdims=True)
+    return np.divide(centered, norms, out=np.zeros_like(centered), where=norms > 0)
+
+
+def aligned_curves(series: dict[str, pd.Series], keywords: list[str]) -> tuple[list[str], np.ndarray, np.ndarray]:
+    """Keywords with usable curves, their normalized curves and their normalized period-to-period changes.
+
+    Rows are on one date grid (the dates at least half the curves have; gaps
+    are interpolated) and scaled so a dot product of two rows is a correlation.
+    """
+    present = [kw for kw in keywords if kw in series]
+    if not present:
+        return [], np.empty((0, 0)), np.empty((0, 0))
+
+    frame = pd.concat([series[kw].rename(kw) for kw in present], axis=1)
+    frame = frame[frame.notna().mean(axis=1) >= 0.5]
+    counts = frame.notna().sum()
+    frame = frame.interpolate(limit_direction="both")
+    std = frame.std(ddof=0)
+    usable = [kw for kw in present if counts[kw] >= config.CLUSTER_MIN_POINTS and std[kw] > 0]
+    if not usable:
+        return [], np.empty((0, 0)), np.empty((0, 0))
+
+    levels = frame[usable].to_numpy().T
+    return usable, _unit_rows(levels), _unit_rows(np.diff(levels, axis=1))
+
+
+def _band_pairs(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """Row pairs (a < b, each once) whose signatures agree on every value of at least one band."""
+    n = len(signatures)
+    found = [np.empty(0, dtype=np.int64)]  # Pairs as a * n + b, so duplicates are cheap to drop
+    for band in range(bands):
+        keys = signatures[:, band * rows : (band + 1) * rows]
+        if rows == 1:
+            bucket = keys[:, 0]
+        else:
+            _, bucket = np.unique(keys, axis=0, return_inverse=True)
+            bucket = bucket.ravel()
+        order = np.argsort(bucket, kind="stable")  # Rows ascending within each bucket
+        ordered = bucket[order]
+        starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+        sizes = np.diff(np.r_[starts, len(order)])
+        for size in np.unique(sizes[sizes > 1]):
+            # Every bucket of this size at once: one row of members per bucket
+            members = order[starts[sizes == size][:, None] + np.arange(size)].astype(np.int64)
+            a, b = np.triu_indices(size, k=1)
+            found.append((members[:, a] * n + members[:, b]).ravel())
+    codes = np.unique(np.concatenate(found))
+    return np.column_stack([codes // n, codes % n]).astype(np.intp)
+
+
+def simhash_keys(curves: np.ndarray, planes: np.ndarray, rows: int) -> np.ndarray:
+    """Each band of `rows` random-hyperplane bits packed into one integer per curve (a parallel.AnalyticsExecutor task).
+
+    A bit is which side of a hyperplane the curve lies on; bands are computed a
+    few at a time so the projections never need one float per curve and plane.
+    """
+    bands = len(planes) // rows
+    weights = np.left_shift(1, np.arange(rows, dtype=np.int64))
+    keys = np.empty((len(curves), bands), dtype=np.int64)
+    step = max(1, 256 // rows)
+    for start in range(0, bands, step):
+        stop = min(start + step, bands)
+        bits = curves @ planes[start * rows : stop * rows].T > 0
+        keys[:, start:stop] = bits.reshape(len(curves), stop - start, rows) @ weights
+    return keys
+
+
+def simhash_pairs(
+    curves: np.ndarray,
+    bands: int = config.CLUSTER_SIMHASH_BANDS,
+    rows: int = config.CLUSTER_SIMHASH_ROWS,
+    seed: int = 0,
+    executor=None,
+) -> np.ndarray:
+    """Candidate row pairs of likely-correlated curves (random-hyperplane LSH)."""
+    if len(curves) < 2:
+        return np.empty((0, 2), dtype=np.intp)
+    planes = np.random.default_rng(seed).normal(size=(bands * rows, curves.shape[1]))
+    if executor is not None:
+        keys = executor.map_rows(simhash_keys, curves, planes=planes, rows=rows)
+    else:
+        keys = simhash_keys(curves, planes, rows)
+    return _band_pairs(keys, bands, 1)
+
+
+def minhash_signatures(sets: list[set[str]], count: int, seed: int = 0) -> np.ndarray:
+    """MinHash signature (count values) of each set; empty sets get all-max signatures."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 32, count, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, count, dtype=np.uint64)
+    signatures = np.full((len(sets), count), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, items in enumerate(sets):
+        if not items:
+            continue
+        # 32-bit item hashes and coefficients keep a * x + b inside uint64
+        x = np.array(
+            [int.from_bytes(hashlib.blake2b(item.encode(), digest_size=4).digest(), "big") for item in items],
+            dtype=np.uint64,
+        )
+        signatures[i] = ((np.outer(x, a) + b) % np.uint64(_PRIME)).min(axis=0)
+    return signatures
+
+
+def minhash_pairs(
+    sets: list[set[str]],
+    bands: int = config.CLUSTER_MINHASH_BANDS,
+    rows: int = config.CLUSTER_MINHASH_ROWS,
+    seed: int = 0,
+) -> np.ndarray:
+    """Candidate index pairs of likely-overlapping sets (MinHash LSH); empty sets never pair."""
+    nonempty = np.array([i for i, items in enumerate(sets) if items], dtype=np.intp)
+    if len(nonempty) < 2:
+        return np.empty((0, 2), dtype=np.intp)
+    signatures = minhash_signatures([sets[i] for i in nonempty], bands * rows, seed)
+    return nonempty[_band_pairs(signatures, bands, rows)]
+
+
+def pair_correlations(pairs: np.ndarray, curves: np.ndarray, changes: np.ndarray) -> np.ndarray:
+    """Correlation of the curves and of the changes of each (row, row) pair (a parallel.AnalyticsExecutor task)."""
+    values = np.empty((len(pairs), 2))
+    for start in range(0, len(pairs), 100000):  # Bounds the gathered rows' memory
+        a, b = pairs[start : start + 100000, 0], pairs[start : start + 100000, 1]
+        values[start : start + 100000, 0] = np.einsum("ij,ij->i", curves[a], curves[b])
+        values[start : start + 100000, 1] = np.einsum("ij,ij->i", changes[a], changes[b])
+    return values
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with path halving."""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def cluster_keywords(
+    keywords: list[str],
+    series: dict[str, pd.Series],
+    related: dict[str, set[str]],
+    executor=None,
+) -> list[Cluster]:
+    """Clusters of co-moving keywords (singletons included), largest first.
+
+    With a parallel.AnalyticsExecutor, curve signatures and candidate
+    correlations are sharded across its workers.
+    """
+    keywords = list(dict.fromkeys(get_index().canonical(kw) for kw in keywords))
+    position = {kw: i for i, kw in enumerate(keywords)}
+    curve_keywords, curves, changes = aligned_curves(series, keywords)
+    curve_row = {kw: i for i, kw in enumerate(curve_keywords)}
+
+    # Candidates: curves whose levels and changes hash alike (levels alone of unrelated trending
+    # curves do too often), plus keywords whose related queries hash alike; as keyword positions, a < b
+    curve_position = np.array([position[kw] for kw in curve_keywords], dtype=np.intp)
+    pairs = np.vstack(
+        [
+            curve_position[simhash_pairs(np.hstack([curves, changes]) / np.sqrt(2), executor=executor)],
+            minhash_pairs([related.get(kw, set()) for kw in keywords]),
+        ]
+    )
+    pairs = np.unique(np.sort(pairs, axis=1), axis=0)
+
+    # Correlations (levels, changes) of every candidate with two curves, in one pass
+    rows = np.full(len(keywords), -1, dtype=np.intp)
+    rows[curve_position] = np.arange(len(curve_position))
+    rows = rows[pairs]
+    both = (rows >= 0).all(axis=1)
+    r, r_changes = np.full(len(pairs), np.nan), np.full(len(pairs), np.nan)
+    if both.any():
+        if executor is not None:
+            values = executor.map_rows(pair_correlations, rows[both], curves=curves, changes=changes)
+        else:
+            values = pair_correlations(rows[both], curves, changes)
+        r[both], r_changes[both] = values[:, 0], values[:, 1]
+    with np.errstate(invalid="ignore"):
+        linked = (r >= config.CLUSTER_MIN_CORRELATION) & (r_changes >= config.CLUSTER_MIN_CHANGE_CORRELATION)
+
+    # Related-query overlap links the rest, unless their curves disagree
+    has_related = np.array([bool(related.get(kw)) for kw in keywords], dtype=bool)
+    for i in np.flatnonzero(~linked & has_related[pairs].all(axis=1)):
+        set_a, set_b = related[keywords[pairs[i, 0]]], related[keywords[pairs[i, 1]]]
+        jaccard = len(set_a & set_b) / len(set_a | set_b)
+        if jaccard >= config.CLUSTER_MIN_JACCARD and (np.isnan(r[i]) or r[i] >= config.CLUSTER_OVERLAP_MIN_CORRELATION):
+            linked[i] = True
+
+    links = UnionFind(len(keywords))
+    for a, b in pairs[linked]:
+        links.union(int(a), int(b))
+    logger.info(f"Clustering {len(keywords)} keywords: {len(pairs)} candidate pairs, {int(linked.sum())} linked")
+
+    groups: dict[int, list[str]] = {}
+    for kw in keywords:
+        groups.setdefault(links.find(position[kw]), []).append(kw)
+
+    clusters = []
+    for members in groups.values():
+        with_curves = [kw for kw in members if kw in curve_row]
+        representative = members[0]
+        if len(with_curves) > 1:
+            block = curves[[curve_row[kw] for kw in with_curves]]
+            representative = with_curves[int((block @ block.T).sum(axis=1).argmax())]
+        elif with_curves:
+            representative = with_curves[0]
+        clusters.append(Cluster(representative=representative, members=members))
+    return sorted(clusters, key=lambda c: -len(c.members))
+
+
+def save_clusters(clusters: list[Cluster], timeframe: str, geo: str, path: Path | None = None) -> Path:
+    """Write clusters (singletons left out) for the planner."""
+    path = Path(path or config.CLUSTERS_FILE)
+    atomic_write_json(
+        path,
+        {
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+            "timeframe": timeframe,
+            "geo": geo,
+            "clusters": [asdict(c) for c in clusters if len(c.members) > 1],
+        },
+        indent=2,
+    )
+    return path
+
+
+def load_representatives(path: Path | None = None) -> dict[str, str]:
+    """Normalization key of every clustered keyword -> its cluster's representative ({} if none saved)."""
+    path = Path(path or config.CLUSTERS_FILE)
+    if not path.exists():
+        return {}
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.warning(f"Failed to load clusters from {path}: {e}")
+        return {}
+
+    index = get_index()
+    return {index.key(member): c["representative"] for c in data.get("clusters", []) for member in c["members"]}
@@ -12,9 +12,8 @@ REPORTS_DIR = OUTPUT_DIR / "reports"
 DATA_DIR = OUTPUT_DIR / "data"
 CACHE_DIR = PROJECT_ROOT / ".cache"
 
-# Ensure directories exist
-for d in [REPORTS_DIR, DATA_DIR, CACHE_DIR]:
-    d.mkdir(parents=True, exist_ok=True)
+# Directories are created by whichever module writes into them, so importing
+# config (e.g. for --help) has no filesystem side effects.
 
 # Google Trends defaults
 DEFAULT_TIMEFRAME = "today 12-m"  # Last 12 months
@@ -29,29 +28,222 @@ RETRY_EXPONENTIAL_BASE = 2
 # Opportunity scoring weights (sum = 1.0)
 OPPORTUNITY_WEIGHTS = {
     "avg_interest": 0.25,        # Average interest over period
-    "momentum": 0.25,             # Trend momentum (slope)
+    "momentum": 0.15,             # Trend momentum (slope)
     "breakout_queries": 0.20,     # Count of breakout queries
     "breadth": 0.15,              # Related query diversity
     "recency": 0.15,              # Peaked recently?
+    "forecast": 0.10,             # Projected change over the next week (forecast.py)
 }
 
+# Similarity score weights (sum = 1.0): closeness to the reference benchmarks
+SIMILARITY_WEIGHTS = {
+    "interest": 0.35,
+    "momentum": 0.35,
+    "breadth": 0.30,
+}
+
+# Score sensitivity (explain.py): ranks recomputed under perturbed weights
+SENSITIVITY_SPREAD = 0.2  # Each weight scaled by a factor in [0.8, 1.2], then renormalized
+SENSITIVITY_SAMPLES = 200  # Random perturbations (on top of one-at-a-time ones)
+
+# Per-vertical weight profiles for ranking (--rank/--profile); same keys as above
+WEIGHT_PROFILES = {
+    "default": OPPORTUNITY_WEIGHTS,
+    # Scandals fan out: many breakout and related angles matter more than raw volume
+    "scandal": {
+        "avg_interest": 0.20,
+        "momentum": 0.15,
+        "breakout_queries": 0.30,
+        "breadth": 0.20,
+        "recency": 0.10,
+        "forecast": 0.05,
+    },
+    # War/geopolitics: sustained volume and direction matter more than side angles
+    "geopolitics": {
+        "avg_interest": 0.30,
+        "momentum": 0.20,
+        "breakout_queries": 0.10,
+        "breadth": 0.10,
+        "recency": 0.20,
+        "forecast": 0.10,
+    },
+}
+RANK_TOP_K = 25  # Keywords shown by --rank
+
+# Weight tuning against past episode outcomes (--tune)
+PROFILES_DIR = OUTPUT_DIR / "profiles"  # Tuned profiles (<name>.json), loadable by --profile
+TUNING_OUTCOME_COLUMN = "views"  # Outcome column in the outcomes CSV
+TUNING_SAMPLES = 20000  # Random weight vectors scored per fit
+TUNING_FOLDS = 5  # Cross-validation folds for the out-of-sample check
+TUNING_MIN_ROWS = 10  # Outcomes with recorded metrics needed to fit
+
 # Thresholds
 MIN_AVG_INTEREST = 5  # Ignore keywords with avg interest < 5
 MIN_BREAKOUT_QUERIES = 2  # Need at least 2 breakout queries for good score
 MIN_RELATED_QUERIES = 5  # Need at least 5 related queries for diversity
 RECENT_PEAK_DAYS = 90  # "Recent" = within last N days
+RECENT_PEAK_SPAN_FRACTION = 0.25  # ...or the last quarter of shorter timeframes
 MOMENTUM_THRESHOLD = 1.0  # Slope of last 6mo / prior 6mo
 
 # Discovery mode
 TRENDING_SEARCHES_LIMIT = 50  # Fetch top 50 trending searches
 MIN_DISCOVERY_SCORE = 40  # Only return opportunities with score >= 40
 
+# Daily stitching (long-horizon daily resolution)
+STITCH_DIR = DATA_DIR / "stitched"
+STITCH_WINDOW_DAYS = 180  # Trends returns daily rows for windows under ~9 months
+STITCH_OVERLAP_DAYS = 30  # Days shared by consecutive windows, used to chain scales
+STITCH_SETTLE_DAYS = 3  # Windows ending within N days of today are refetched next run
+STITCH_MAX_ERROR = 0.5  # Overlap calibration error (RMSE / mean) above which a chain is rejected
+
+# Incremental tail refresh (--incremental)
+INCREMENTAL_TIMEFRAMES = ("today 12-m", "today 5-y")  # Weekly windows refreshed by splicing a tail
+INCREMENTAL_TAIL_TIMEFRAME = "today 3-m"  # Daily window fetched instead, resampled to weeks
+INCREMENTAL_MIN_OVERLAP_POINTS = 4  # Complete weeks shared with the cached series
+INCREMENTAL_MAX_ERROR = 0.15  # Overlap calibration error (RMSE / mean) above which we refetch in full
+INCREMENTAL_MAX_SPLICES = 4  # Consecutive splices onto one entry before it is refetched in full
+
+# Realtime ingestion
+REALTIME_DIR = DATA_DIR / "realtime"
+REALTIME_TIMEFRAMES = ["now 1-d", "now 7-d"]  # Polled for every watched keyword
+REALTIME_POLL_SECONDS = 300  # Target interval between polling cycles
+REALTIME_CACHE_TTL_SECONDS = 300  # TTL for "now ..." timeframes and realtime trends
+REALTIME_RETENTION_POINTS = 2000  # Ring-buffer capacity per series
+REALTIME_RETENTION_HOURS = 24 * 8  # Drop points older than this
+LIVE_FEED_CALENDAR = PROJECT_ROOT / "world-war-iii" / "data" / "live_feed_calendar_day_1_to_14.json"
+
+# Episode refresh planner (--plan-refresh)
+EPISODE_SHEET = PROJECT_ROOT / "world-war-iii" / "data" / "time-capsule-60-episode-sheet.csv"
+EPISODE_SNAPSHOT_DIR = DATA_DIR / "episodes"  # One JSON file of metric snapshots per episode
+EPISODE_SNAPSHOTS_KEPT = 30  # Newest snapshots kept per episode
+PLANNER_FRESHNESS_HOURS = [  # (airs within N days, max data age in hours); first match wins
+    (1, 6),
+    (3, 24),
+    (7, 72),
+]
+PLANNER_UNSCHEDULED_MAX_AGE_HOURS = 24 * 14  # Airing later than that, or not on the calendar yet
+SLOT_TIMEZONES = {"PST": -8, "PDT": -7, "MST": -7, "MDT": -6, "CST": -6, "CDT": -5, "EST": -5, "EDT": -4, "UTC": 0}
+
+# Parallel analytics (parallel.py): row shards of large series matrices across a process pool
+PARALLEL_WORKERS = 0  # Worker processes (--workers); 0 = one per CPU core
+PARALLEL_SHARD_ROWS = 5000  # Rows per shard; fixed, so results don't depend on the worker count
+PARALLEL_MIN_ROWS = 20000  # Smaller matrices run in-process: pool startup would cost more than it saves
+
+# Keyword clustering (--cluster): co-moving keywords share one frequently refreshed representative
+CLUSTERS_FILE = DATA_DIR / "clusters.json"  # Applied by the planner when present
+CLUSTER_MIN_CORRELATION = 0.9  # Interest curves this correlated are one cluster...
+CLUSTER_MIN_CHANGE_CORRELATION = 0.6  # ...if their week-to-week changes are at least this correlated
+CLUSTER_MIN_JACCARD = 0.4  # Related-query overlap that links keywords...
+CLUSTER_OVERLAP_MIN_CORRELATION = 0.7  # ...if their curves are at least this correlated (or unknown)
+CLUSTER_MIN_POINTS = 8  # Shared points needed to compare two curves
+CLUSTER_SIMHASH_BANDS = 200  # Curve LSH: 200 bands x 20 random-hyperplane bits of levels + changes;
+CLUSTER_SIMHASH_ROWS = 20  # threshold cosine 0.74, below the 0.75 of a pair at both link thresholds
+CLUSTER_MINHASH_BANDS = 32  # Related-query LSH: 32 bands x 2 MinHash values
+CLUSTER_MINHASH_ROWS = 2
+CLUSTER_MEMBER_AGE_FACTOR = 7  # Members may be this many times older than their own policy allows
+
+# Absolute-scale calibration (--calibrate)
+CALIBRATION_ANCHORS = [  # Ladder from very popular to niche; neighbours should be within ~10x
+    "weather",
+    "news",
+    "recipes",
+    "tax refund",
+    "chess",
+    "knitting",
+    "sourdough starter",
+    "origami",
+    "bonsai care",
+    "stamp collecting",
+]
+CALIBRATION_CHAIN_SIZE = 3  # Anchors per ladder request; consecutive requests share one anchor
+CALIBRATION_TABLE_FILE = CACHE_DIR / "anchors.json"
+CALIBRATION_TABLE_MAX_AGE_DAYS = 30  # Rebuild the anchor table this often (per geo/timeframe)
+CALIBRATION_MIN_SIGNAL = 2.0  # Avg interest below this in a bridge request is too coarse to use
+CALIBRATION_MAX_STEPS = 3  # Bridge retries moving along the ladder before giving up
+CALIBRATION_GLOBAL_FLOOR = 0.01  # Global interest mapped to 0 in the opportunity score (top anchor = 100)
+
+# Metric history (append-only snapshot store)
+HISTORY_DIR = DATA_DIR / "history"
+HISTORY_MAX_SEGMENTS = 64  # Small segments (one per run) before they are compacted
+HISTORY_SEGMENT_ROWS = 50000  # Compaction writes segments of at most this many rows; full ones are left alone
+HISTORY_DAYS = 30  # Default --history lookback
+
+# Streaming spike detector (EWMA z-score)
+DETECTOR_STATE_DIR = CACHE_DIR / "detector"
+DETECTOR_ALPHA = 0.1  # EWMA smoothing factor (~10-point memory)
+DETECTOR_ONSET_Z = 3.0  # z-score that opens a spike
+DETECTOR_EXIT_Z = 1.0  # z-score under which an open spike ends
+DETECTOR_WARMUP_POINTS = 12  # Points observed before a series can spike
+DETECTOR_MIN_STD = 1.0  # Std floor so flat series don't spike on +1 noise
+
+# Short-horizon forecasts (damped Holt / AR per series, state cached for incremental refits)
+FORECAST_STATE_DIR = CACHE_DIR / "forecast"
+FORECAST_HORIZON_DAYS = 7  # Project interest this far ahead ("next week")
+FORECAST_MIN_POINTS = 12  # Shorter series get no forecast
+FORECAST_AR_ORDER = 3  # Lags in the autoregressive model
+FORECAST_DAMPING = 0.98  # Holt trend damping per point (1 = straight-line trend)
+FORECAST_ALPHAS = (0.1, 0.2, 0.3, 0.5, 0.7, 0.9)  # Holt level smoothing grid
+FORECAST_BETAS = (0.01, 0.05, 0.1, 0.2, 0.4)  # Holt trend smoothing grid
+FORECAST_REFIT_POINTS = 12  # New points run through a cached state before its parameters are refitted
+FORECAST_INTERVAL_Z = 1.645  # Interval half-width in standard errors (90%)
+
+# Related-query crawler
+CRAWL_DIR = DATA_DIR / "crawl"
+CRAWL_REQUEST_BUDGET = 20  # Total rate-limited requests per crawl (2 per uncached batch)
+CRAWL_MAX_DEPTH = 3  # Hops from the seed
+CRAWL_MIN_SCORE = 15  # Don't expand nodes predicted below this score
+CRAWL_DEPTH_DECAY = 0.85  # Predicted score multiplier per hop
+
+# Keyword normalization (phrases are normalized before lookup)
+KEYWORD_SYNONYMS = {
+    "ww3": "world war 3",
+    "wwiii": "world war 3",
+    "ww iii": "world war 3",
+    "ww 3": "world war 3",
+    "wwii": "world war 2",
+    "ww2": "world war 2",
+}
+KEYWORD_SYNONYMS_FILE = PROJECT_ROOT / "synonyms.json"  # Optional {"alias": "canonical"} overrides
+
+# Query service (--serve)
+SERVICE_HOST = "127.0.0.1"  # Use 0.0.0.0 to serve the team network
+SERVICE_PORT = 8765
+SERVICE_DISCOVER_LIMIT = 10  # Trending searches scored per /api/discover call
+
+# Run instrumentation
+TRACE_DIR = OUTPUT_DIR / "traces"
+TRACE_MAX_SPANS = 10000  # Raw spans kept per run; per-stage aggregates are unbounded
+
+# Job journals (journal.py): resumable fetch sweeps (--resume JOB_ID)
+JOBS_DIR = OUTPUT_DIR / "jobs"  # One <job-id>.jsonl event log per sweep run
+
+# Fetch matrix (Google properties x categories)
+GPROPS = {  # CLI name -> pytrends gprop
+    "web": "",
+    "news": "news",
+    "youtube": "youtube",
+    "images": "images",
+    "shopping": "froogle",
+}
+CATEGORY_NAMES = {  # Trends category ids used for episode planning
+    0: "All categories",
+    3: "Arts & Entertainment",
+    14: "People & Society",
+    16: "News",
+    396: "Politics",
+}
+
+# Related topics and entities
+PAYLOAD_SESSION_TTL_SECONDS = 600  # Reuse one build_payload token across a batch's calls for this long
+ENTITY_INDEX_FILE = CACHE_DIR / "entities.json"  # Keyword -> Knowledge Graph entity (topic_mid)
+ENTITY_RESOLVE_TOP_N = 3  # Top related topics checked when resolving a keyword's own entity
+ENTITY_MIN_TITLE_SIMILARITY = 0.9  # Normalized keyword vs topic title; below this a topic is not the keyword's own
+
 # Pytrends API limits
 MAX_KEYWORDS_PER_REQUEST = 5  # Pytrends can compare up to 5 keywords at once
 
 # HTML report
 REPORT_TEMPLATE_DIR = PROJECT_ROOT / "templates"
-REPORT_TEMPLATE_DIR.mkdir(exist_ok=True)
 
 # Data cache TTL (seconds)
 CACHE_TTL_SECONDS = 86400  # 24 hours
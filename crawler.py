@@ -0,0 +1,201 @@
+"""
+Crawler module: Expand seed keywords into a related-query graph.
+
+Top and rising related queries become graph edges. Unexpanded queries wait in
+a priority frontier ordered by predicted opportunity score (ties broken by
+depth, so expansion stays breadth-first among equals), and the shared keyword
+index keeps each normalized query to one node. Crawling stops when the
+request budget is spent.
+"""
+
+import heapq
+import json
+import logging
+import math
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+import config
+from fetcher import CachedFetcher
+from normalize import get_index
+
+logger = logging.getLogger(__name__)
+
+# Rate-limited calls per uncached related_queries batch (payload + widget data)
+REQUESTS_PER_BATCH = 2
+
+
+def edge_score(kind: str, value) -> float:
+    """Score (0-100) of a related query from its Trends value.
+
+    Top queries carry a 0-100 relative value. Rising queries carry percent
+    growth (breakouts are >5000%), mapped on a log scale so +100% scores 20
+    and breakouts saturate at 100.
+    """
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+    if kind == "rising":
+        return min(100.0, 20 * math.log2(1 + max(value, 0) / 100))
+    return max(0.0, min(100.0, value))
+
+
+@dataclass
+class QueryNode:
+    """A query in the crawl graph."""
+    keyword: str
+    depth: int
+    score: float  # Predicted opportunity score (0-100)
+    parent: str | None = None
+    expanded: bool = False
+
+
+@dataclass
+class QueryEdge:
+    """A related-query link between two nodes."""
+    source: str
+    target: str
+    kind: str  # "top" or "rising"
+    value: float
+
+
+class KeywordGraph:
+    """Nodes keyed by normalized query string, plus related-query edges."""
+
+    def __init__(self):
+        self.nodes: dict[str, QueryNode] = {}
+        self.edges: list[QueryEdge] = []
+
+    def __contains__(self, keyword: str) -> bool:
+        return get_index().key(keyword) in self.nodes
+
+    def ranked(self, limit: int | None = None) -> list[QueryNode]:
+        """Nodes sorted by predicted score, best first."""
+        nodes = sorted(self.nodes.values(), key=lambda n: (-n.score, n.depth, n.keyword))
+        return nodes[:limit] if limit else nodes
+
+    def to_dict(self) -> dict:
+        return {
+            "nodes": [asdict(n) for n in self.ranked()],
+            "edges": [asdict(e) for e in self.edges],
+        }
+
+    def save(self, path: Path) -> Path:
+        """Write the graph as JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Crawl graph saved: {path}")
+        return path
+
+
+class RelatedQueryCrawler:
+    """Priority-frontier crawler over related queries under a request budget."""
+
+    def __init__(
+        self,
+        fetcher: CachedFetcher,
+        timeframe: str = config.DEFAULT_TIMEFRAME,
+        geo: str = config.DEFAULT_GEO,
+        request_budget: int = config.CRAWL_REQUEST_BUDGET,
+        max_depth: int = config.CRAWL_MAX_DEPTH,
+        min_score: float = config.CRAWL_MIN_SCORE,
+        batch_size: int = config.MAX_KEYWORDS_PER_REQUEST,
+    ):
+        self.fetcher = fetcher
+        self.timeframe = timeframe
+        self.geo = geo
+        self.request_budget = request_budget
+        self.max_depth = max_depth
+        self.min_score = min_score
+        self.batch_size = batch_size
+
+        self.graph = KeywordGraph()
+        self._frontier: list[tuple[float, int, int, str]] = []
+        self._pushed = 0
+
+    def _push(self, key: str) -> None:
+        """Queue a node; stale heap entries are skipped when popped."""
+        node = self.graph.nodes[key]
+        heapq.heappush(self._frontier, (-node.score, node.depth, self._pushed, key))
+        self._pushed += 1
+
+    def _add_node(self, keyword: str, depth: int, score: float, parent: str | None) -> None:
+        """Add a node or raise the score of an existing unexpanded one."""
+        key = get_index().key(keyword)
+        node = self.graph.nodes.get(key)
+
+        if node is None:
+            node = QueryNode(keyword=keyword, depth=depth, score=score, parent=parent)
+            self.graph.nodes[key] = node
+        elif node.expanded or score <= node.score:
+            return
+        else:
+            node.score = score
+
+        if node.depth <= self.max_depth and node.score >= self.min_score:
+            self._push(key)
+
+    def _pop_batch(self) -> list[QueryNode]:
+        """Pop the best unexpanded nodes, up to one request's worth."""
+        batch = {}
+        while self._frontier and len(batch) < self.batch_size:
+            neg_score, _, _, key = heapq.heappop(self._frontier)
+            node = self.graph.nodes[key]
+            if node.expanded or -neg_score != node.score or key in batch:
+                continue
+            batch[key] = node
+        return list(batch.values())
+
+    def _expand(self, batch: list[QueryNode]) -> None:
+        """Fetch related queries for a batch and add their edges."""
+        keywords = [n.keyword for n in batch]
+        related = self.fetcher.related_queries(keywords, timeframe=self.timeframe, geo=self.geo)
+
+        for node in batch:
+            node.expanded = True
+            rq_data = related.get(node.keyword) or {}
+            for kind in ("rising", "top"):
+                for q in rq_data.get(kind) or []:
+                    query = q.get("query") if isinstance(q, dict) else None
+                    if not query:
+                        continue
+                    value = q.get("value", 0)
+                    score = edge_score(kind, value) * config.CRAWL_DEPTH_DECAY ** (node.depth + 1)
+                    self.graph.edges.append(QueryEdge(node.keyword, query, kind, float(value or 0)))
+                    self._add_node(query, node.depth + 1, score, node.keyword)
+
+    def crawl(self, seeds: list[str]) -> KeywordGraph:
+        """Expand seeds until the frontier is empty or the budget is spent."""
+        for seed in seeds:
+            self._add_node(seed, 0, 100.0, None)
+
+        start_requests = self.fetcher.request_count
+        while self._frontier:
+            spent = self.fetcher.request_count - start_requests
+            if spent + REQUESTS_PER_BATCH > self.request_budget:
+                logger.info(f"Request budget exhausted ({spent}/{self.request_budget})")
+                break
+
+            batch = self._pop_batch()
+            if not batch:
+                break
+            logger.info(f"Expanding {[n.keyword for n in batch]} (spent {spent}/{self.request_budget})")
+            self._expand(batch)
+
+        expanded = sum(1 for n in self.graph.nodes.values() if n.expanded)
+        logger.info(
+            f"Crawl finished: {len(self.graph.nodes)} queries, {len(self.graph.edges)} edges, "
+            f"{expanded} expanded, {self.fetcher.request_count - start_requests} requests"
+        )
+        return self.graph
+
+
+def default_graph_path(seeds: list[str]) -> Path:
+    """Output path for a crawl of the given seeds."""
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return config.CRAWL_DIR / f"crawl_{get_index().key(seeds[0]).replace(' ', '-')}_{timestamp}.json"
@@ -0,0 +1,309 @@
+"""
+Detector module: Streaming spike detection over interest series.
+
+Each tracked series keeps a constant-size EWMA state (mean, variance, spike
+bookkeeping), so every new point costs O(1) and memory is bounded by the
+number of series, not their length. States for many keywords live in NumPy
+arrays and are updated together, one timestamp at a time.
+
+Trends rescales every fetched window to its own peak, so a refetch of the
+same series can arrive on a different scale. Before a frame is fed, each
+state is brought onto the frame's scale through the last point it saw (which
+the new window still contains); a state that cannot be related to the frame
+that way is reset and warms up again, rather than mixing two scales in one
+baseline.
+"""
+
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+from locking import atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DetectorEvent:
+    """Spike lifecycle event for one series."""
+    keyword: str
+    kind: str  # "onset" (crossed into a spike) or "end" (decayed back to baseline)
+    timestamp: pd.Timestamp
+    value: float
+    baseline: float  # EWMA mean frozen at onset
+    zscore: float
+    magnitude: float  # Peak minus baseline
+    peak_timestamp: pd.Timestamp | None = None
+    duration_points: int = 0  # Points from onset to end
+    decay_points: int = 0  # Points from peak until back under half the magnitude
+
+
+_NO_TIME = np.iinfo(np.int64).min
+_MIN_RESCALE_VALUE = 5.0  # Below this, rounding makes a rescale ratio unreliable: reset instead
+
+
+class DetectorBank:
+    """EWMA z-score spike detector for a set of series sharing one resolution.
+
+    A point opens a spike when it sits `onset_z` standard deviations above the
+    running mean; the spike closes once the z-score falls under `exit_z`. The
+    baseline is frozen during a spike so the spike does not pollute it.
+    """
+
+    _FLOAT_FIELDS = ("mean", "var", "peak", "baseline", "peak_z", "last_value")
+    _INT_FIELDS = ("count", "last_ts", "onset_n", "peak_n", "half_n", "peak_ts")
+
+    def __init__(
+        self,
+        alpha: float = config.DETECTOR_ALPHA,
+        onset_z: float = config.DETECTOR_ONSET_Z,
+        exit_z: float = config.DETECTOR_EXIT_Z,
+        warmup: int = config.DETECTOR_WARMUP_POINTS,
+        min_std: float = config.DETECTOR_MIN_STD,
+    ):
+        self.alpha = alpha
+        self.onset_z = onset_z
+        self.exit_z = exit_z
+        self.warmup = warmup
+        self.min_std = min_std
+
+        self.keywords: list[str] = []
+        self._slots: dict[str, int] = {}
+        self.in_spike = np.zeros(0, dtype=bool)
+        for name in self._FLOAT_FIELDS:
+            setattr(self, name, np.zeros(0))
+        for name in self._INT_FIELDS:
+            setattr(self, name, np.zeros(0, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def slots(self, keywords: list[str]) -> np.ndarray:
+        """Slot indices for keywords, registering unseen ones."""
+        new = [kw for kw in dict.fromkeys(keywords) if kw not in self._slots]
+        if new:
+            for kw in new:
+                self._slots[kw] = len(self.keywords)
+                self.keywords.append(kw)
+            grow = len(new)
+            self.in_spike = np.concatenate([self.in_spike, np.zeros(grow, dtype=bool)])
+            for name in self._FLOAT_FIELDS:
+                setattr(self, name, np.concatenate([getattr(self, name), np.zeros(grow)]))
+            for name in self._INT_FIELDS:
+                fill = _NO_TIME if name == "last_ts" else 0
+                setattr(self, name, np.concatenate([getattr(self, name), np.full(grow, fill, dtype=np.int64)]))
+        return np.array([self._slots[kw] for kw in keywords], dtype=np.intp)
+
+    def update(self, timestamp: pd.Timestamp, slots: np.ndarray, values: np.ndarray) -> list[DetectorEvent]:
+        """Feed one timestamp's values for the given slots.
+
+        Points at or before a slot's last seen timestamp are ignored, so
+        replaying overlapping windows is idempotent. NaNs are skipped.
+        """
+        ts = pd.Timestamp(timestamp).value
+        values = np.asarray(values, dtype=float)
+        fresh = (self.last_ts[slots] < ts) & ~np.isnan(values)
+        if not fresh.any():
+            return []
+        s, x = slots[fresh], values[fresh]
+        self.last_ts[s] = ts
+        self.last_value[s] = x
+
+        mean, var = self.mean[s], self.var[s]
+        std = np.maximum(np.sqrt(var), self.min_std)
+        z = (x - mean) / std
+        warm = self.count[s] >= self.warmup
+        spiking = self.in_spike[s]
+
+        onset = warm & ~spiking & (z >= self.onset_z)
+        ongoing = spiking & (z >= self.exit_z)
+        ended = spiking & ~ongoing
+        events = []
+
+        # Onsets: freeze the baseline and start tracking the peak
+        for i in np.flatnonzero(onset):
+            slot = s[i]
+            self.in_spike[slot] = True
+            self.baseline[slot] = mean[i]
+            self.peak[slot] = x[i]
+            self.peak_z[slot] = z[i]
+            self.peak_ts[slot] = ts
+            self.onset_n[slot] = self.count[slot]
+            self.peak_n[slot] = self.count[slot]
+            self.half_n[slot] = -1
+            events.append(DetectorEvent(
+                keyword=self.keywords[slot],
+                kind="onset",
+                timestamp=pd.Timestamp(ts),
+                value=float(x[i]),
+                baseline=float(mean[i]),
+                zscore=float(z[i]),
+                magnitude=float(x[i] - mean[i]),
+            ))
+
+        # Ongoing spikes: move the peak, note when it first decays below half magnitude
+        if ongoing.any():
+            o, xo = s[ongoing], x[ongoing]
+            higher = xo > self.peak[o]
+            self.peak_ts[o[higher]] = ts
+            self.peak_n[o[higher]] = self.count[o[higher]]
+            self.half_n[o[higher]] = -1
+            self.peak[o] = np.maximum(self.peak[o], xo)
+            self.peak_z[o] = np.maximum(self.peak_z[o], z[ongoing])
+            halfway = self.baseline[o] + (self.peak[o] - self.baseline[o]) / 2
+            decayed = (self.half_n[o] < 0) & (xo <= halfway)
+            self.half_n[o[decayed]] = self.count[o[decayed]]
+
+        # Ends: report the full spike and resume baseline tracking
+        for i in np.flatnonzero(ended):
+            slot = s[i]
+            self.in_spike[slot] = False
+            half_n = self.half_n[slot] if self.half_n[slot] >= 0 else self.count[slot]
+            events.append(DetectorEvent(
+                keyword=self.keywords[slot],
+                kind="end",
+                timestamp=pd.Timestamp(ts),
+                value=float(x[i]),
+                baseline=float(self.baseline[slot]),
+                zscore=float(self.peak_z[slot]),
+                magnitude=float(self.peak[slot] - self.baseline[slot]),
+                peak_timestamp=pd.Timestamp(int(self.peak_ts[slot])),
+                duration_points=int(self.count[slot] - self.onset_n[slot]),
+                decay_points=int(half_n - self.peak_n[slot]),
+            ))
+
+        # EWMA update for series outside a spike (baseline stays frozen inside one)
+        calm = ~self.in_spike[s]
+        c, xc = s[calm], x[calm]
+        first = self.count[c] == 0
+        diff = xc - self.mean[c]
+        incr = self.alpha * diff
+        self.mean[c] = np.where(first, xc, self.mean[c] + incr)
+        self.var[c] = np.where(first, 0.0, (1 - self.alpha) * (self.var[c] + diff * incr))
+        self.count[s] += 1
+
+        return events
+
+    def update_frame(self, df: pd.DataFrame, rescale: bool = True) -> list[DetectorEvent]:
+        """Feed every row of a time-indexed frame (columns = keywords).
+
+        With rescale, states are first brought onto the frame's scale (pass
+        False for frames the caller already put on the stored scale).
+        """
+        df = df.drop(columns=["isPartial"], errors="ignore")
+        if df.empty:
+            return []
+        slots = self.slots(list(df.columns))
+        values = df.to_numpy(dtype=float)
+        if rescale:
+            self._rescale(slots, pd.DatetimeIndex(df.index).as_unit("ns").asi8, values)  # update() keys by ns
+
+        events = []
+        for timestamp, row in zip(df.index, values):
+            events.extend(self.update(timestamp, slots, row))
+        return events
+
+    def _rescale(self, slots: np.ndarray, times: np.ndarray, values: np.ndarray) -> None:
+        """Bring states onto a frame's scale via their last points; reset those that cannot be."""
+        seen = self.count[slots] > 0
+        last_ts = self.last_ts[slots]
+        position = np.minimum(np.searchsorted(times, last_ts), len(times) - 1)
+        observed = values[position, np.arange(len(slots))]
+        stored = self.last_value[slots]
+        same = observed == stored
+        usable = (
+            seen
+            & (times[position] == last_ts)
+            & ~np.isnan(observed)
+            & (same | (np.minimum(observed, stored) >= _MIN_RESCALE_VALUE))
+        )
+
+        scaled = usable & ~same
+        s, scale = slots[scaled], observed[scaled] / stored[scaled]
+        self.mean[s] *= scale
+        self.var[s] *= scale**2
+        self.peak[s] *= scale
+        self.baseline[s] *= scale
+        self.last_value[s] = observed[scaled]
+
+        # Only states the frame would feed new points to need resetting
+        reset = slots[seen & ~usable & (times[-1] > last_ts)]
+        self.count[reset] = 0
+        self.in_spike[reset] = False
+        for name in ("mean", "var", "peak", "baseline", "peak_z"):
+            getattr(self, name)[reset] = 0.0
+        if len(s) or len(reset):
+            logger.debug(f"Detector states rescaled: {len(s)}, reset on an unrelated scale: {len(reset)}")
+
+    def state_nbytes(self) -> int:
+        """Bytes held by the per-series state arrays."""
+        fields = self._FLOAT_FIELDS + self._INT_FIELDS
+        return self.in_spike.nbytes + sum(getattr(self, name).nbytes for name in fields)
+
+    def save(self, path: Path) -> None:
+        """Persist detector state (atomically: concurrent runs share the state files)."""
+        fields = {name: getattr(self, name) for name in self._FLOAT_FIELDS + self._INT_FIELDS}
+        with atomic_write(path, "wb") as f:
+            np.savez(f, keywords=np.array(self.keywords, dtype=str), in_spike=self.in_spike, **fields)
+
+    def load(self, path: Path) -> None:
+        """Restore detector state saved with `save` (missing files are ignored)."""
+        path = Path(path)
+        if not path.exists():
+            return
+        try:
+            data = np.load(path)
+            self.keywords = data["keywords"].tolist()
+            self._slots = {kw: i for i, kw in enumerate(self.keywords)}
+            self.in_spike = data["in_spike"]
+            for name in self._FLOAT_FIELDS + self._INT_FIELDS:
+                # State saved before a field existed starts it at zero
+                default = np.zeros(len(self.keywords), dtype=float if name in self._FLOAT_FIELDS else np.int64)
+                setattr(self, name, data[name] if name in data.files else default)
+        except Exception as e:
+            logger.warning(f"Failed to load detector state {path.name}: {e}")
+
+
+class SpikeMonitor:
+    """Fetcher listener that runs one DetectorBank per (timeframe, geo).
+
+    Series at different resolutions never share a bank, since an EWMA tuned
+    for weekly points means nothing for hourly ones.
+    """
+
+    def __init__(self, state_dir: Path = config.DETECTOR_STATE_DIR):
+        self.state_dir = Path(state_dir)
+        self.banks: dict[tuple[str, str], DetectorBank] = {}
+        self.events: list[DetectorEvent] = []
+
+    def _state_path(self, timeframe: str, geo: str) -> Path:
+        return self.state_dir / f"detector_{timeframe.replace(' ', '_')}_{geo}.npz"
+
+    def bank(self, timeframe: str, geo: str) -> DetectorBank:
+        """Detector bank for a timeframe/geo, restored from disk on first use."""
+        key = (timeframe, geo)
+        if key not in self.banks:
+            bank = DetectorBank()
+            bank.load(self._state_path(timeframe, geo))
+            self.banks[key] = bank
+        return self.banks[key]
+
+    def observe(self, keywords: list[str], timeframe: str, geo: str, df: pd.DataFrame) -> list[DetectorEvent]:
+        """Feed a fetched interest frame; call with every frame the fetcher returns."""
+        events = self.bank(timeframe, geo).update_frame(df)
+        for event in events:
+            logger.info(
+                f"Spike {event.kind}: {event.keyword} [{timeframe}] at {event.timestamp} "
+                f"magnitude={event.magnitude:.1f} z={event.zscore:.1f}"
+            )
+        self.events.extend(events)
+        return events
+
+    def save(self) -> None:
+        """Persist every bank's state."""
+        for (timeframe, geo), bank in self.banks.items():
+            bank.save(self._state_path(timeframe, geo))
@@ -0,0 +1,184 @@
+"""
+Entities module: Knowledge Graph entities behind keywords, from related topics.
+
+Related topics carry stable entity ids (`topic_mid`, e.g. "/m/0d0vqn"), which
+are a better identity than query strings: "ww3", "world war iii" and "third
+world war" are different strings but one entity. Each keyword is resolved to
+the top related topic whose title is the keyword itself (the same
+normalization key, or a near-identical one), and the resolution is kept in
+`.cache/entities.json`. A keyword that merely appears in a title ("war" in
+"World War III") is left unresolved, since aliasing it would replace the
+user's keyword in every later run. A keyword that resolves to an entity another keyword
+already holds is aliased to that keyword in the shared KeywordIndex, so later
+runs fetch and cache them once.
+
+Breadth and breakout are also counted per entity: distinct topic mids rather
+than query strings, so "iran news" and "news iran" count once.
+"""
+
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import config
+from locking import atomic_write_json
+from normalize import KeywordIndex, get_index
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Entity:
+    """A Knowledge Graph entity and the keywords that resolve to it."""
+    mid: str
+    title: str
+    type: str
+    keywords: list[str] = field(default_factory=list)  # First one is canonical
+
+
+@dataclass
+class EntityMetrics:
+    """Breadth and breakout of one entity, across all keywords resolving to it."""
+    mid: str
+    title: str
+    keywords: list[str]
+    avg_interest: float  # Highest avg interest among its keywords
+    topic_breadth: int  # Distinct related topic entities
+    topic_breakout_count: int  # Distinct rising topic entities marked "Breakout"
+
+
+def is_breakout(topic: dict) -> bool:
+    """Rising topics whose growth is too large to quote are labelled "Breakout"."""
+    return str(topic.get("formattedValue", "")).strip().lower() == "breakout"
+
+
+def topic_mids(topics: dict) -> tuple[set[str], set[str]]:
+    """(related, breakout) entity mids in one keyword's related topics."""
+    related = {t["topic_mid"] for t in topics.get("top", []) + topics.get("rising", []) if t.get("topic_mid")}
+    breakout = {t["topic_mid"] for t in topics.get("rising", []) if t.get("topic_mid") and is_breakout(t)}
+    return related, breakout
+
+
+class EntityIndex:
+    """Keyword -> entity resolutions, persisted between runs."""
+
+    def __init__(self, path: Path | None = None, keyword_index: KeywordIndex | None = None):
+        self.path = Path(path or config.ENTITY_INDEX_FILE)
+        self.keyword_index = keyword_index or get_index()
+        self.entities: dict[str, Entity] = {}  # mid -> entity
+        self._by_key: dict[str, str] = {}  # keyword normalization key -> mid
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load entity index from {self.path}: {e}")
+            return
+
+        dropped = []
+        for raw in data.get("entities", []):
+            entity = Entity(**raw)
+            # Resolutions saved under looser matching rules are not trusted
+            dropped += [kw for kw in entity.keywords if not self.names(kw, entity.title)]
+            entity.keywords = [kw for kw in entity.keywords if self.names(kw, entity.title)]
+            if not entity.keywords:
+                continue
+            self.entities[entity.mid] = entity
+            for keyword in entity.keywords:
+                self._register(keyword, entity)
+        if dropped:
+            logger.info(f"Dropped {len(dropped)} entity resolutions whose titles do not name the keyword: {dropped[:10]}")
+
+    def save(self) -> None:
+        atomic_write_json(self.path, {"entities": [asdict(e) for e in self.entities.values()]}, indent=2)
+
+    def _register(self, keyword: str, entity: Entity) -> None:
+        """Point keyword at entity, aliasing it to the entity's canonical keyword."""
+        if keyword != entity.keywords[0]:
+            self.keyword_index.alias(keyword, entity.keywords[0])
+        self._by_key[self.keyword_index.key(keyword)] = entity.mid
+
+    def get(self, keyword: str) -> Entity | None:
+        """The entity a keyword resolves to, if known."""
+        mid = self._by_key.get(self.keyword_index.key(keyword))
+        return self.entities.get(mid) if mid else None
+
+    def names(self, keyword: str, title: str) -> bool:
+        """Whether a topic title is the keyword itself: the same normalization key, or nearly."""
+        key, title_key = self.keyword_index.key(keyword), self.keyword_index.key(title)
+        if key == title_key:
+            return True
+        return SequenceMatcher(None, key, title_key).ratio() >= config.ENTITY_MIN_TITLE_SIMILARITY
+
+    def resolve(self, keyword: str, topics: dict) -> Entity | None:
+        """Resolve keyword to the top related topic whose title names it (see names)."""
+        known = self.get(keyword)
+        if known:
+            return known
+
+        top = sorted(topics.get("top", []), key=lambda t: -float(t.get("value") or 0))
+        for topic in top[: config.ENTITY_RESOLVE_TOP_N]:
+            mid = topic.get("topic_mid")
+            if not mid or not self.names(keyword, topic.get("topic_title", "")):
+                continue
+
+            entity = self.entities.get(mid)
+            if entity is None:
+                entity = self.entities[mid] = Entity(mid, topic.get("topic_title", ""), topic.get("topic_type", ""))
+            if keyword not in entity.keywords:
+                entity.keywords.append(keyword)
+                if len(entity.keywords) > 1:
+                    logger.info(f"'{keyword}' is the same entity as '{entity.keywords[0]}' ({entity.title})")
+            self._register(keyword, entity)
+            return entity
+        return None
+
+    def ingest(self, related_topics: dict) -> None:
+        """Resolve every keyword in a related_topics result and save the index."""
+        resolved = [self.resolve(kw, topics) for kw, topics in related_topics.items()]
+        if any(resolved):
+            self.save()
+
+
+def entity_metrics(metrics: dict, related_topics: dict, entity_index: EntityIndex) -> dict[str, EntityMetrics]:
+    """Per-entity breadth and breakout, merging the topics of every keyword resolving to it."""
+    keywords: dict[str, list[str]] = {}
+    related: dict[str, set[str]] = {}
+    breakout: dict[str, set[str]] = {}
+    for keyword in metrics:
+        entity = entity_index.get(keyword)
+        if entity is None:
+            continue
+        kw_related, kw_breakout = topic_mids(related_topics.get(keyword, {}))
+        keywords.setdefault(entity.mid, []).append(keyword)
+        related.setdefault(entity.mid, set()).update(kw_related)
+        breakout.setdefault(entity.mid, set()).update(kw_breakout)
+
+    return {
+        mid: EntityMetrics(
+            mid=mid,
+            title=entity_index.entities[mid].title,
+            keywords=kws,
+            avg_interest=max(metrics[kw].avg_interest for kw in kws),
+            topic_breadth=len(related[mid]),
+            topic_breakout_count=len(breakout[mid]),
+        )
+        for mid, kws in keywords.items()
+    }
+
+
+_entity_index: EntityIndex | None = None
+
+
+def get_entity_index() -> EntityIndex:
+    """The process-wide entity index (its aliases apply to the shared KeywordIndex)."""
+    global _entity_index
+    if _entity_index is None:
+        _entity_index = EntityIndex()
+    return _entity_index
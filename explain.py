@@ -0,0 +1,154 @@
+"""
+Explain module: Why keywords scored what they did, and how firm their ranks are.
+
+Contributions split a score into the points each weighted component adds, for
+every keyword at once: similarity from the component scores ComparisonScore
+keeps (interest/momentum/breadth, times the demand ratio), opportunity from
+analyzer.opportunity_components(). They sum to the score.
+
+Sensitivity re-ranks the batch under perturbed weights in one matrix product:
+each weight scaled up and down by SENSITIVITY_SPREAD on its own, plus
+SENSITIVITY_SAMPLES random perturbations of all weights together. A keyword's
+best and worst rank across them show whether its place depends on the exact
+weights; `sensitive_to` names the weight that moves it most on its own.
+"""
+
+import numpy as np
+import pandas as pd
+
+import config
+from analyzer import ComparisonScore, opportunity_components
+from ranking import get_profile
+
+# Similarity weight name -> ComparisonScore component column
+SIMILARITY_COMPONENTS = {
+    "interest": "interest_score",
+    "momentum": "momentum_score",
+    "breadth": "breadth_score",
+}
+
+
+def score_table(scores: dict[str, ComparisonScore]) -> pd.DataFrame:
+    """One row per scored keyword with its component scores and demand ratio."""
+    return pd.DataFrame(
+        {
+            "keyword": list(scores),
+            "similarity_score": [s.similarity_score for s in scores.values()],
+            **{column: [getattr(s, column) for s in scores.values()] for column in SIMILARITY_COMPONENTS.values()},
+            "demand_ratio": [s.demand_ratio for s in scores.values()],
+        }
+    )
+
+
+def weight_perturbations(
+    weights: dict[str, float],
+    spread: float = config.SENSITIVITY_SPREAD,
+    samples: int = config.SENSITIVITY_SAMPLES,
+    seed: int = 0,
+) -> np.ndarray:
+    """Weight vectors (one per row, columns in weights order), renormalized to the same total.
+
+    Row 0 is the weights themselves, rows 1..2m scale one weight by 1 ± spread,
+    the rest scale every weight by a random factor in [1 - spread, 1 + spread].
+    """
+    base = np.array(list(weights.values()), dtype=float)
+    one_at_a_time = np.repeat(np.eye(len(base)), 2, axis=0) * np.tile([spread, -spread], len(base))[:, None] + 1
+    random = np.random.default_rng(seed).uniform(1 - spread, 1 + spread, (samples, len(base)))
+    vectors = base * np.vstack([np.ones(len(base)), one_at_a_time, random])
+    return vectors / vectors.sum(axis=1, keepdims=True) * base.sum()
+
+
+def ranks(scores: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+    """1-based rank of rows (default: all) within each column of scores: 1 + how many score higher."""
+    targets = scores if rows is None else scores[rows]
+    return 1 + (scores[None, :, :] > targets[:, None, :]).sum(axis=1)
+
+
+def sensitivity(
+    components: np.ndarray,
+    weights: dict[str, float],
+    multiplier: np.ndarray | None = None,
+    rows: np.ndarray | None = None,
+    spread: float = config.SENSITIVITY_SPREAD,
+    samples: int = config.SENSITIVITY_SAMPLES,
+) -> pd.DataFrame:
+    """Rank, best/worst rank under perturbed weights, and the weight each row is most sensitive to.
+
+    components has one row per keyword and one column per weight (weights order);
+    multiplier scales each row's weighted sum (similarity's demand ratio). With
+    rows, only those rows are explained, still ranked against every row.
+    """
+    vectors = weight_perturbations(weights, spread, samples)
+    explained = len(components) if rows is None else len(rows)
+
+    # Chunk the perturbations so the comparison cube stays ~16M cells for large tables
+    chunk = max(1, 2**24 // max(1, len(components) * explained))
+    parts = []
+    for start in range(0, len(vectors), chunk):
+        scores = components @ vectors[start : start + chunk].T
+        if multiplier is not None:
+            scores = scores * multiplier[:, None]
+        parts.append(ranks(scores, rows))
+    ranked = np.hstack(parts)
+
+    base = ranked[:, :1]
+    one_at_a_time = np.abs(ranked[:, 1 : 1 + 2 * len(weights)] - base).reshape(explained, len(weights), 2).max(axis=2)
+    names = np.array(list(weights))
+    sensitive_to = np.where(one_at_a_time.max(axis=1) > 0, names[one_at_a_time.argmax(axis=1)], "")
+
+    return pd.DataFrame(
+        {
+            "rank": base[:, 0],
+            "rank_best": ranked.min(axis=1),
+            "rank_worst": ranked.max(axis=1),
+            "sensitive_to": sensitive_to,
+        }
+    )
+
+
+def explain_scores(scores: dict[str, ComparisonScore], weights: dict[str, float] | None = None) -> pd.DataFrame:
+    """Similarity contributions and rank sensitivity for a batch of scores.
+
+    Also fills each ComparisonScore's similarity_rank, similarity_rank_best and
+    similarity_rank_worst, so they are recorded and reported with the scores.
+    """
+    weights = weights or config.SIMILARITY_WEIGHTS
+    table = score_table(scores)
+    components = table[[SIMILARITY_COMPONENTS[name] for name in weights]].to_numpy(dtype=float)
+    ratio = table["demand_ratio"].to_numpy(dtype=float)
+
+    explained = pd.DataFrame({"keyword": table["keyword"], "similarity_score": table["similarity_score"]})
+    weighted = components * np.array(list(weights.values()))
+    for i, name in enumerate(weights):
+        explained[name] = weighted[:, i] * ratio
+    explained["demand_penalty"] = weighted.sum(axis=1) * (1 - ratio)
+
+    explained = pd.concat([explained, sensitivity(components, weights, multiplier=ratio)], axis=1)
+    for row in explained.itertuples():
+        score = scores[row.keyword]
+        score.similarity_rank = int(row.rank)
+        score.similarity_rank_best, score.similarity_rank_worst = int(row.rank_best), int(row.rank_worst)
+    return explained
+
+
+def explain_opportunities(table: pd.DataFrame, profile: str = "default", rows: np.ndarray | None = None) -> pd.DataFrame:
+    """Opportunity contributions and rank sensitivity for rows of a metrics table (default: all).
+
+    Ranks are always against the whole table, so explaining a top-k of the
+    tracked universe passes the top-k's positions as rows.
+    """
+    weights = get_profile(profile)
+    components = opportunity_components(table)
+    matrix = np.column_stack([np.broadcast_to(components[name], (len(table),)) for name in weights])
+    keywords = table["keyword"].to_numpy()
+    if rows is not None:
+        keywords, selected = keywords[rows], matrix[rows]
+    else:
+        selected = matrix
+
+    explained = pd.DataFrame({"keyword": keywords})
+    weighted = selected * np.array(list(weights.values()))
+    for i, name in enumerate(weights):
+        explained[name] = weighted[:, i]
+    explained["opportunity_score"] = weighted.sum(axis=1)
+    return pd.concat([explained, sensitivity(matrix, weights, rows=rows)], axis=1)
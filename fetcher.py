@@ -2,23 +2,21 @@
 Fetcher module: pytrends wrapper with rate limiting, retries, and caching.
 """
 
+import hashlib
 import json
+import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime, timedelta
 import logging
 
 import pandas as pd
-from pytrends.request import TrendReq
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-)
-import requests
 
 import config
+from instrument import tracer
+from locking import RateBudget, atomic_write_json, key_lock
+from normalize import get_index
 
 logger = logging.getLogger(__name__)
 
@@ -33,78 +31,310 @@ class RateLimitError(FetcherError):
     pass
 
 
+class CacheMissError(FetcherError):
+    """Raised in offline mode when a request is not in the cache."""
+    pass
+
+
+# Per-keyword data freshness, from best to worst
+DATA_STATUSES = ("fresh", "stale", "missing")
+
+# Key of an entry's bookkeeping (its cache key; a splice count), stripped when the entry is read
+CACHE_META_KEY = "_meta"
+
+
+def cache_filename(key: str) -> str:
+    """Filesystem-safe cache filename for a key.
+
+    Path separators are escaped, and keys too long for one path component
+    (large related-query batches) are truncated with a digest suffix.
+    """
+    safe = key.replace("/", "%2F")
+    if len(safe.encode()) <= 200:
+        return f"{safe}.json"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return f"{safe.encode()[:150].decode(errors='ignore')}_{digest}.json"
+
+
+def scope_suffix(cat: int = config.DEFAULT_CATEGORY, gprop: str = "") -> str:
+    """Cache-key suffix for a non-default category or Google property.
+
+    Default-scope keys (all categories, web search) are unchanged, so existing
+    cache entries stay valid.
+    """
+    suffix = f"_cat{cat}" if cat != config.DEFAULT_CATEGORY else ""
+    return suffix + (f"_{gprop}" if gprop else "")
+
+
+def _retry_sleep(seconds: float) -> None:
+    """Retry wait between attempts, traced separately from the regular backoff."""
+    tracer.count("retries")
+    with tracer.span("retry_wait"):
+        time.sleep(seconds)
+
+
+def _retrying():
+    """Retry policy for one request.
+
+    tenacity and requests are only needed once a request actually goes out,
+    so they are imported here rather than at module load (cache hits never pay
+    for them).
+    """
+    import requests
+    from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+    return Retrying(
+        stop=stop_after_attempt(config.RETRY_MAX_ATTEMPTS),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_exception_type((RateLimitError, requests.ConnectionError)),
+        reraise=True,
+        sleep=_retry_sleep,
+    )
+
+
 class CachedFetcher:
     """Wrapper around pytrends with rate limiting, retries, and caching."""
 
-    def __init__(self, backoff_seconds=config.REQUEST_BACKOFF_SECONDS):
+    def __init__(self, backoff_seconds=config.REQUEST_BACKOFF_SECONDS, client_factory=None, offline=False):
         self.backoff_seconds = backoff_seconds
+        self.client_factory = client_factory  # Swap in a mock client for offline benchmarks
+        self.offline = offline  # Serve from cache only (stale entries allowed); never touch the network
+        self.max_cache_age: int | None = None  # Caps every cache TTL (seconds); set by the refresh planner
         self.last_request_time = 0
+        self.rate_budget = RateBudget(config.CACHE_DIR / ".rate_budget.json")  # Shared by all processes
+        self.request_count = 0  # Rate-limited calls issued (cache misses and retries)
         self.hl = "en-US"
         self.tz = 360
+        self.listeners = []
+        self.data_status: dict[str, str] = {}  # keyword -> worst of DATA_STATUSES seen this run
+        self.scope_status: dict[tuple[str, str, str], dict[str, str]] = {}  # Same, per (timeframe, geo, scope)
+        self._stale_keys: set[str] = set()
+        self._sessions = threading.local()  # Per-thread (payload, built_at, client) of the last batch
+
+    def _client(self):
+        """Create a pytrends client (or compatible mock) for one request."""
+        if self.client_factory is None:
+            from pytrends.request import TrendReq
+
+            self.client_factory = TrendReq
+        return self.client_factory(hl=self.hl, tz=self.tz)
+
+    def _session(self, keywords: list[str], timeframe: str, geo: str, cat: int, gprop: str):
+        """Client with the payload for this batch built, reused by the batch's other calls.
+
+        build_payload costs a rate-limited token request; interest, related
+        queries and related topics for the same batch share one within
+        PAYLOAD_SESSION_TTL_SECONDS.
+        """
+        payload = (tuple(keywords), timeframe, geo, cat, gprop)
+        last = getattr(self._sessions, "last", None)
+        if last and last[0] == payload and time.time() - last[1] < config.PAYLOAD_SESSION_TTL_SECONDS:
+            tracer.count("payload_reused")
+            return last[2]
+
+        pytrends = self._client()
+        self._fetch_with_retry(
+            pytrends.build_payload,
+            keywords,
+            timeframe=timeframe,
+            geo=geo,
+            cat=cat,
+            gprop=gprop,
+        )
+        self._sessions.last = (payload, time.time(), pytrends)
+        return pytrends
+
+    def add_listener(self, listener) -> None:
+        """Register a callback(keywords, timeframe, geo, df) for every interest frame returned."""
+        self.listeners.append(listener)
+
+    @contextmanager
+    def cache_only(self, enabled: bool = True):
+        """Serve requests in the block from cache as in offline mode (stale entries allowed)."""
+        if not enabled or self.offline:
+            yield
+            return
+        self.offline = True
+        try:
+            yield
+        finally:
+            self.offline = False
+
+    def mark_status(self, keywords: list[str], status: str, scope: tuple[str, str, str] | None = None) -> None:
+        """Record data freshness for keywords, keeping the worst status seen this run.
+
+        scope (timeframe, geo, scope_suffix) also records it for that fetch
+        scope alone, so a batch that failed in one timeframe or geo does not
+        mark the keywords missing in the others.
+        """
+        statuses = [self.data_status] + ([self.scope_status.setdefault(scope, {})] if scope else [])
+        for keyword in keywords:
+            for recorded in statuses:
+                current = recorded.get(keyword)
+                if current is None or DATA_STATUSES.index(status) > DATA_STATUSES.index(current):
+                    recorded[keyword] = status
+
+    def status(self, timeframe: str, geo: str, scope: str = "") -> dict[str, str]:
+        """keyword -> worst status seen this run within one fetch scope."""
+        return self.scope_status.get((timeframe, geo, scope), {})
+
+    def _mark_cached(self, keywords: list[str], cache_key: str, scope: tuple[str, str, str]) -> None:
+        self.mark_status(keywords, "stale" if cache_key in self._stale_keys else "fresh", scope)
+
+    def _notify(self, keywords: list[str], timeframe: str, geo: str, df: pd.DataFrame) -> None:
+        """Pass an interest frame to listeners; a failing listener never breaks a fetch."""
+        for listener in self.listeners:
+            try:
+                listener(keywords, timeframe, geo, df)
+            except Exception as e:
+                logger.warning(f"Interest listener failed: {e}")
 
     def _get_cache_path(self, key: str) -> Path:
         """Generate cache file path for a key."""
-        filename = f"{key}.json"
-        return config.CACHE_DIR / filename
+        return config.CACHE_DIR / cache_filename(key)
 
-    def _is_cache_fresh(self, cache_path: Path) -> bool:
+    def _ttl_for_timeframe(self, timeframe: str) -> int:
+        """Cache TTL for a timeframe: "now ..." windows go stale within minutes."""
+        ttl = config.REALTIME_CACHE_TTL_SECONDS if timeframe.startswith("now ") else config.CACHE_TTL_SECONDS
+        if self.max_cache_age is not None:
+            ttl = min(ttl, self.max_cache_age)
+        return ttl
+
+    def _is_cache_fresh(self, cache_path: Path, ttl: int = config.CACHE_TTL_SECONDS) -> bool:
         """Check if cache file exists and is fresh (< TTL)."""
         if not cache_path.exists():
             return False
 
         mtime = cache_path.stat().st_mtime
         age = time.time() - mtime
-        return age < config.CACHE_TTL_SECONDS
+        return age < ttl
 
-    def _load_cache(self, key: str) -> dict | None:
-        """Load data from cache if it exists and is fresh."""
+    def _read_cache(self, key: str, ttl: int) -> dict | None:
+        """Read a cache entry if it is fresh (or exists at all, in offline mode)."""
         cache_path = self._get_cache_path(key)
-
-        if self._is_cache_fresh(cache_path):
-            try:
-                with open(cache_path) as f:
-                    data = json.load(f)
-                    logger.info(f"Loaded from cache: {key}")
-                    return data
-            except Exception as e:
-                logger.warning(f"Failed to load cache for {key}: {e}")
-                return None
-
-        return None
+        fresh = self._is_cache_fresh(cache_path, ttl)
+        if not (fresh or (self.offline and cache_path.exists())):
+            return None
+        try:
+            with open(cache_path) as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load cache for {key}: {e}")
+            return None
+        data.pop(CACHE_META_KEY, None)
+
+        if fresh:
+            logger.info(f"Loaded from cache: {key}")
+        else:
+            logger.info(f"Loaded stale cache (offline): {key}")
+            self._stale_keys.add(key)
+            tracer.count("cache_stale")
+        return data
+
+    def _load_cache(self, key: str, ttl: int = config.CACHE_TTL_SECONDS) -> dict | None:
+        """Load data from cache if it exists and is fresh.
+
+        In offline mode stale entries are returned too, and a missing entry
+        raises CacheMissError instead of falling through to the network.
+        """
+        with tracer.span("cache_lookup"):
+            data = self._read_cache(key, ttl)
+
+        tracer.count("cache_hits" if data else "cache_misses")
+        if data is None and self.offline:
+            raise CacheMissError(f"Not in cache (offline mode): {key}")
+        return data
+
+    @contextmanager
+    def _cache_slot(self, key: str, ttl: int = config.CACHE_TTL_SECONDS):
+        """Yield the cached entry for key, or None with the key's lock held.
+
+        On a miss the caller fetches and saves while holding a cross-process
+        lock on the key. Concurrent misses on the same key (other threads or
+        processes) wait on that lock, then find the entry on re-check, so only
+        one request goes out.
+        """
+        data = self._load_cache(key, ttl)
+        if data:
+            yield data
+            return
+
+        with tracer.span("lock_wait"):
+            lock = key_lock(config.CACHE_DIR, key).acquire()
+        try:
+            data = self._read_cache(key, ttl)
+            if data:
+                tracer.count("coalesced")
+            yield data
+        finally:
+            lock.release()
 
     def _save_cache(self, key: str, data: dict) -> None:
-        """Save data to cache."""
+        """Save data to cache, with its key (filenames of long keys are truncated)."""
         cache_path = self._get_cache_path(key)
+        data = {**data, CACHE_META_KEY: {**data.get(CACHE_META_KEY, {}), "key": key}}
         try:
-            with open(cache_path, "w") as f:
-                json.dump(data, f, indent=2, default=str)
-                logger.debug(f"Cached: {key}")
+            # Atomic: concurrent readers see the old entry or the new one, never a torn file
+            atomic_write_json(cache_path, data, indent=2, default=str)
+            logger.debug(f"Cached: {key}")
         except Exception as e:
             logger.warning(f"Failed to cache {key}: {e}")
 
+    def _frame_from_cache(self, cached: dict, keywords: list[str] | None = None) -> pd.DataFrame:
+        """Rebuild a time-indexed DataFrame from cached column lists.
+
+        Cache keys are normalized, so an entry may have been saved under another
+        spelling; columns are renamed back to the requested keywords.
+        """
+        df = pd.DataFrame({column: values for column, values in cached.items() if column != CACHE_META_KEY})
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+            df = df.set_index("date")
+        if keywords:
+            index = get_index()
+            requested = {index.key(kw): kw for kw in keywords}
+            df = df.rename(columns=lambda col: requested.get(index.key(col), col) if col != "isPartial" else col)
+        return df
+
+    def _rekey_cached(self, cached: dict, keywords: list[str]) -> dict:
+        """Re-key a cached per-keyword dict to the requested spellings."""
+        index = get_index()
+        requested = {index.key(kw): kw for kw in keywords}
+        return {requested.get(index.key(kw), kw): value for kw, value in cached.items()}
+
     def _apply_backoff(self) -> None:
-        """Apply rate limit backoff between requests."""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.backoff_seconds:
-            sleep_time = self.backoff_seconds - elapsed
-            logger.info(f"Rate limit backoff: sleeping {sleep_time:.1f}s")
-            time.sleep(sleep_time)
+        """Apply rate limit backoff between requests.
+
+        The spacing is shared by every process using this cache directory, so
+        parallel runs don't multiply the request rate.
+        """
+        if self.backoff_seconds > 0:
+            sleep_time = self.rate_budget.reserve(self.backoff_seconds)
+            if sleep_time > 0:
+                logger.info(f"Rate limit backoff: sleeping {sleep_time:.1f}s")
+                with tracer.span("backoff_sleep"):
+                    time.sleep(sleep_time)
         self.last_request_time = time.time()
 
-    @retry(
-        stop=stop_after_attempt(config.RETRY_MAX_ATTEMPTS),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type((RateLimitError, requests.ConnectionError)),
-        reraise=True,
-    )
     def _fetch_with_retry(self, fetch_fn, *args, **kwargs):
         """Execute fetch function with retry logic."""
+        if self.offline:
+            raise CacheMissError("Offline mode: network request skipped")
+        return _retrying()(self._fetch_once, fetch_fn, *args, **kwargs)
+
+    def _fetch_once(self, fetch_fn, *args, **kwargs):
+        """One backoff-throttled attempt; 429/503 surface as RateLimitError."""
         try:
             self._apply_backoff()
-            return fetch_fn(*args, **kwargs)
+            self.request_count += 1
+            tracer.count("requests")
+            with tracer.span("http_request", call=getattr(fetch_fn, "__name__", "request")):
+                return fetch_fn(*args, **kwargs)
         except Exception as e:
             if "429" in str(e) or "503" in str(e):
+                tracer.count("rate_limited")
                 raise RateLimitError(f"Rate limited by Google Trends: {e}")
+            tracer.count("request_errors")
             raise
 
     def interest_over_time(
@@ -113,32 +343,82 @@ class CachedFetcher:
         timeframe: str = config.DEFAULT_TIMEFRAME,
         geo: str = config.DEFAULT_GEO,
         cat: int = config.DEFAULT_CATEGORY,
+        gprop: str = "",
     ) -> pd.DataFrame:
-        """Fetch interest over time for keywords."""
-        cache_key = f"interest_over_time_{'_'.join(sorted(keywords))}_{timeframe}_{geo}"
-
-        cached = self._load_cache(cache_key)
-        if cached:
-            return pd.DataFrame(cached)
-
-        logger.info(f"Fetching interest_over_time: {keywords}")
-        pytrends = TrendReq(hl=self.hl, tz=self.tz)
-
-        df = self._fetch_with_retry(
-            pytrends.build_payload,
-            keywords,
-            timeframe=timeframe,
-            geo=geo,
-            cat=cat,
-        )
-
-        df_data = self._fetch_with_retry(pytrends.interest_over_time)
-
-        # Convert to serializable format
-        cache_data = df_data.to_dict(orient="list")
-        self._save_cache(cache_key, cache_data)
-
-        return df_data
+        """Fetch interest over time for keywords (gprop: "", "news", "youtube", "images", "froogle")."""
+        scope = scope_suffix(cat, gprop)
+        cache_key = self._interest_key(keywords, timeframe, geo, scope)
+
+        with self._cache_slot(cache_key, self._ttl_for_timeframe(timeframe)) as cached:
+            if cached:
+                df_data = self._frame_from_cache(cached, keywords)
+                self._mark_cached(keywords, cache_key, (timeframe, geo, scope))
+                if not scope:
+                    self._notify(keywords, timeframe, geo, df_data)
+                return df_data
+
+            logger.info(f"Fetching interest_over_time: {keywords}")
+            pytrends = self._session(keywords, timeframe, geo, cat, gprop)
+
+            df_data = self._fetch_with_retry(pytrends.interest_over_time)
+
+            # Convert to serializable format (keep the date index as a column)
+            cache_data = df_data.reset_index().to_dict(orient="list")
+            self._save_cache(cache_key, cache_data)
+            self.mark_status(keywords, "fresh", (timeframe, geo, scope))
+
+            # Listeners (spike detection) track web search; other scopes would mix series
+            if not scope:
+                self._notify(keywords, timeframe, geo, df_data)
+            return df_data
+
+    def _interest_key(self, keywords: list[str], timeframe: str, geo: str, scope: str = "") -> str:
+        return f"interest_over_time_{get_index().batch_key(keywords)}_{timeframe}_{geo}{scope}"
+
+    def cached_interest(
+        self, keywords: list[str], timeframe: str = config.DEFAULT_TIMEFRAME, geo: str = config.DEFAULT_GEO
+    ) -> tuple[pd.DataFrame | None, float | None, dict]:
+        """Cached web-search interest frame regardless of TTL, its age in seconds and its bookkeeping."""
+        cache_path = self._get_cache_path(self._interest_key(keywords, timeframe, geo))
+        try:
+            age = time.time() - cache_path.stat().st_mtime
+            with open(cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None, None, {}
+        return self._frame_from_cache(cached, keywords), age, cached.get(CACHE_META_KEY, {})
+
+    def cached_related(
+        self, kind: str, keywords: list[str], timeframe: str = config.DEFAULT_TIMEFRAME, geo: str = config.DEFAULT_GEO
+    ) -> dict | None:
+        """Cached web-search related_queries or related_topics regardless of TTL, without fetching.
+
+        Unlike an offline read, the keywords' data status is left alone: this
+        serves a window whose interest was just refreshed some other way.
+        """
+        cache_path = self._get_cache_path(f"{kind}_{get_index().batch_key(keywords)}_{timeframe}_{geo}")
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        cached.pop(CACHE_META_KEY, None)
+        return self._rekey_cached(cached, keywords)
+
+    def store_interest(
+        self, keywords: list[str], timeframe: str, geo: str, df: pd.DataFrame, **meta
+    ) -> None:
+        """Cache an interest frame built locally (a spliced tail) as if it had just been fetched.
+
+        Keyword arguments are kept with the entry (see cached_interest); a
+        fetched entry replacing it has none.
+        """
+        cache_data = df.reset_index().to_dict(orient="list")
+        if meta:
+            cache_data[CACHE_META_KEY] = meta
+        self._save_cache(self._interest_key(keywords, timeframe, geo), cache_data)
+        self.mark_status(keywords, "fresh", (timeframe, geo, ""))
+        self._notify(keywords, timeframe, geo, df)
 
     def related_queries(
         self,
@@ -146,48 +426,44 @@ class CachedFetcher:
         timeframe: str = config.DEFAULT_TIMEFRAME,
         geo: str = config.DEFAULT_GEO,
         cat: int = config.DEFAULT_CATEGORY,
+        gprop: str = "",
     ) -> dict:
         """Fetch related queries for keywords."""
-        cache_key = f"related_queries_{'_'.join(sorted(keywords))}_{timeframe}_{geo}"
+        scope = scope_suffix(cat, gprop)
+        cache_key = f"related_queries_{get_index().batch_key(keywords)}_{timeframe}_{geo}{scope}"
 
-        cached = self._load_cache(cache_key)
-        if cached:
-            return cached
+        with self._cache_slot(cache_key, self._ttl_for_timeframe(timeframe)) as cached:
+            if cached:
+                self._mark_cached(keywords, cache_key, (timeframe, geo, scope))
+                return self._rekey_cached(cached, keywords)
 
-        logger.info(f"Fetching related_queries: {keywords}")
-        pytrends = TrendReq(hl=self.hl, tz=self.tz)
+            logger.info(f"Fetching related_queries: {keywords}")
+            pytrends = self._session(keywords, timeframe, geo, cat, gprop)
 
-        self._fetch_with_retry(
-            pytrends.build_payload,
-            keywords,
-            timeframe=timeframe,
-            geo=geo,
-            cat=cat,
-        )
-
-        related = self._fetch_with_retry(pytrends.related_queries)
+            related = self._fetch_with_retry(pytrends.related_queries)
 
-        # Convert to serializable format
-        cache_data = {}
-        for kw, df_dict in related.items():
-            if df_dict is None:
-                # pytrends returns None for keywords with no related query data
-                cache_data[kw] = {"top": [], "rising": []}
-            else:
-                # Handle cases where top/rising might be None or empty
-                top_data = []
-                rising_data = []
+            # Convert to serializable format
+            cache_data = {}
+            for kw, df_dict in related.items():
+                if df_dict is None:
+                    # pytrends returns None for keywords with no related query data
+                    cache_data[kw] = {"top": [], "rising": []}
+                else:
+                    # Handle cases where top/rising might be None or empty
+                    top_data = []
+                    rising_data = []
 
-                if df_dict.get("top") is not None and not df_dict["top"].empty:
-                    top_data = df_dict["top"].to_dict(orient="records")
+                    if df_dict.get("top") is not None and not df_dict["top"].empty:
+                        top_data = df_dict["top"].to_dict(orient="records")
 
-                if df_dict.get("rising") is not None and not df_dict["rising"].empty:
-                    rising_data = df_dict["rising"].to_dict(orient="records")
+                    if df_dict.get("rising") is not None and not df_dict["rising"].empty:
+                        rising_data = df_dict["rising"].to_dict(orient="records")
 
-                cache_data[kw] = {"top": top_data, "rising": rising_data}
+                    cache_data[kw] = {"top": top_data, "rising": rising_data}
 
-        self._save_cache(cache_key, cache_data)
-        return cache_data
+            self._save_cache(cache_key, cache_data)
+            self.mark_status(keywords, "fresh", (timeframe, geo, scope))
+            return cache_data
 
     def related_topics(
         self,
@@ -195,48 +471,41 @@ class CachedFetcher:
         timeframe: str = config.DEFAULT_TIMEFRAME,
         geo: str = config.DEFAULT_GEO,
         cat: int = config.DEFAULT_CATEGORY,
+        gprop: str = "",
     ) -> dict:
         """Fetch related topics for keywords."""
-        cache_key = f"related_topics_{'_'.join(sorted(keywords))}_{timeframe}_{geo}"
+        cache_key = f"related_topics_{get_index().batch_key(keywords)}_{timeframe}_{geo}{scope_suffix(cat, gprop)}"
 
-        cached = self._load_cache(cache_key)
-        if cached:
-            return cached
+        with self._cache_slot(cache_key, self._ttl_for_timeframe(timeframe)) as cached:
+            if cached:
+                return self._rekey_cached(cached, keywords)
 
-        logger.info(f"Fetching related_topics: {keywords}")
-        pytrends = TrendReq(hl=self.hl, tz=self.tz)
+            logger.info(f"Fetching related_topics: {keywords}")
+            pytrends = self._session(keywords, timeframe, geo, cat, gprop)
 
-        self._fetch_with_retry(
-            pytrends.build_payload,
-            keywords,
-            timeframe=timeframe,
-            geo=geo,
-            cat=cat,
-        )
-
-        topics = self._fetch_with_retry(pytrends.related_topics)
+            topics = self._fetch_with_retry(pytrends.related_topics)
 
-        # Convert to serializable format
-        cache_data = {}
-        for kw, df_dict in topics.items():
-            if df_dict is None:
-                # pytrends returns None for keywords with no related topic data
-                cache_data[kw] = {"top": [], "rising": []}
-            else:
-                # Handle cases where top/rising might be None or empty
-                top_data = []
-                rising_data = []
+            # Convert to serializable format
+            cache_data = {}
+            for kw, df_dict in topics.items():
+                if df_dict is None:
+                    # pytrends returns None for keywords with no related topic data
+                    cache_data[kw] = {"top": [], "rising": []}
+                else:
+                    # Handle cases where top/rising might be None or empty
+                    top_data = []
+                    rising_data = []
 
-                if df_dict.get("top") is not None and not df_dict["top"].empty:
-                    top_data = df_dict["top"].to_dict(orient="records")
+                    if df_dict.get("top") is not None and not df_dict["top"].empty:
+                        top_data = df_dict["top"].to_dict(orient="records")
 
-                if df_dict.get("rising") is not None and not df_dict["rising"].empty:
-                    rising_data = df_dict["rising"].to_dict(orient="records")
+                    if df_dict.get("rising") is not None and not df_dict["rising"].empty:
+                        rising_data = df_dict["rising"].to_dict(orient="records")
 
-                cache_data[kw] = {"top": top_data, "rising": rising_data}
+                    cache_data[kw] = {"top": top_data, "rising": rising_data}
 
-        self._save_cache(cache_key, cache_data)
-        return cache_data
+            self._save_cache(cache_key, cache_data)
+            return cache_data
 
     def interest_by_region(
         self,
@@ -245,67 +514,61 @@ class CachedFetcher:
         geo: str = config.DEFAULT_GEO,
         cat: int = config.DEFAULT_CATEGORY,
         resolution: str = "COUNTRY",
+        gprop: str = "",
     ) -> pd.DataFrame:
         """Fetch interest by region for keywords."""
-        cache_key = f"interest_by_region_{'_'.join(sorted(keywords))}_{timeframe}_{geo}_{resolution}"
-
-        cached = self._load_cache(cache_key)
-        if cached:
-            return pd.DataFrame(cached)
+        scope = scope_suffix(cat, gprop)
+        cache_key = f"interest_by_region_{get_index().batch_key(keywords)}_{timeframe}_{geo}_{resolution}{scope}"
 
-        logger.info(f"Fetching interest_by_region: {keywords}")
-        pytrends = TrendReq(hl=self.hl, tz=self.tz)
+        with self._cache_slot(cache_key, self._ttl_for_timeframe(timeframe)) as cached:
+            if cached:
+                return self._frame_from_cache(cached, keywords)
 
-        self._fetch_with_retry(
-            pytrends.build_payload,
-            keywords,
-            timeframe=timeframe,
-            geo=geo,
-            cat=cat,
-        )
+            logger.info(f"Fetching interest_by_region: {keywords}")
+            pytrends = self._session(keywords, timeframe, geo, cat, gprop)
 
-        df_data = self._fetch_with_retry(pytrends.interest_by_region, inc_low_vol=True, inc_geo_code=False)
+            df_data = self._fetch_with_retry(pytrends.interest_by_region, inc_low_vol=True, inc_geo_code=False)
 
-        # Convert to serializable format
-        cache_data = df_data.to_dict(orient="list")
-        self._save_cache(cache_key, cache_data)
+            # Convert to serializable format
+            cache_data = df_data.to_dict(orient="list")
+            self._save_cache(cache_key, cache_data)
 
-        return df_data
+            return df_data
 
     def trending_searches(self, geo: str = config.DEFAULT_GEO) -> pd.DataFrame:
         """Fetch today's trending searches for a region."""
         cache_key = f"trending_searches_{geo}"
 
-        cached = self._load_cache(cache_key)
-        if cached:
-            return pd.DataFrame(cached)
+        with self._cache_slot(cache_key) as cached:
+            if cached:
+                return pd.DataFrame(cached)
 
-        logger.info(f"Fetching trending_searches: {geo}")
-        pytrends = TrendReq(hl=self.hl, tz=self.tz)
+            logger.info(f"Fetching trending_searches: {geo}")
+            pytrends = self._client()
 
-        df_data = self._fetch_with_retry(pytrends.trending_searches, pn=geo)
+            df_data = self._fetch_with_retry(pytrends.trending_searches, pn=geo)
 
-        # Convert to serializable format
-        cache_data = df_data.to_dict(orient="list")
-        self._save_cache(cache_key, cache_data)
+            # Convert to serializable format
+            cache_data = df_data.to_dict(orient="list")
+            self._save_cache(cache_key, cache_data)
 
-        return df_data
+            return df_data
 
     def realtime_search_trends(self, geo: str = config.DEFAULT_GEO, cat: str = "all") -> pd.DataFrame:
         """Fetch real-time search trends for a region."""
         cache_key = f"realtime_trends_{geo}_{cat}"
 
-        cached = self._load_cache(cache_key)
-        if cached:
-            return pd.DataFrame(cached)
+        with self._cache_slot(cache_key, config.REALTIME_CACHE_TTL_SECONDS) as cached:
+            if cached:
+                return pd.DataFrame(cached)
 
-        logger.info(f"Fetching realtime_search_trends: {geo}")
-        pytrends = TrendReq(hl=self.hl, tz=self.tz)
+            logger.info(f"Fetching realtime_search_trends: {geo}")
+            pytrends = self._client()
 
-        df_data = self._fetch_with_retry(pytrends.realtime_trending_searches, pn=geo, cat=cat)
+            df_data = self._fetch_with_retry(pytrends.realtime_trending_searches, pn=geo, cat=cat)
 
-        # Convert to serializable format
-        cache_data = df_data.to_dict(orient="list")
-        self._save_cache(cache_key, cache_data)
+            # Convert to serializable format
+            cache_data = df_data.to_dict(orient="list")
+            self._save_cache(cache_key, cache_data)
 
-        return df_data
+            return df_data
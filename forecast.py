@@ -0,0 +1,454 @@
+"""
+Forecast module: Short-horizon interest projections for many series at once.
+
+Two lightweight models are fitted to every series in NumPy: damped Holt
+exponential smoothing (level plus a damped trend, smoothing parameters picked
+from the FORECAST_ALPHAS x FORECAST_BETAS grid) and an AR(FORECAST_AR_ORDER)
+least-squares fit. Holt steps every series and every grid point forward
+together; AR solves one small stacked system per series. Each series keeps
+the model with the lower one-step error (adjusted for parameters fitted);
+AR fits whose roots make them explode are never kept.
+
+Like the spike detector, each series holds a constant-size state (parameters,
+level/trend, last lags, residual variance), saved per (timeframe, geo), so a
+later fetch only runs its new points through the recursions. Parameters are
+refitted once FORECAST_REFIT_POINTS points have been absorbed that way, or
+when the stored state no longer lines up with the fetched window. Google
+Trends rescales a window when its maximum changes; a state whose last point
+was rescaled is scaled along with it.
+
+Forecasts cover the next FORECAST_HORIZON_DAYS at the series' resolution, with
+intervals propagated from the one-step error through the model (psi weights).
+Large refits can be sharded across processes with a parallel.AnalyticsExecutor.
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+from locking import atomic_write
+
+logger = logging.getLogger(__name__)
+
+MODELS = ("holt", "ar")
+
+_NO_TIME = np.iinfo(np.int64).min
+_MIN_RESCALE_VALUE = 5.0  # Below this, rounding makes a rescale ratio unreliable: refit instead
+
+
+@dataclass
+class Forecast:
+    """Projection of one series over the next FORECAST_HORIZON_DAYS."""
+    keyword: str
+    model: str  # "holt" or "ar"
+    mean: np.ndarray  # Point forecast per future point
+    lower: np.ndarray  # Interval per future point (FORECAST_INTERVAL_Z standard errors)
+    upper: np.ndarray
+    interest: float  # Mean forecast over the horizon
+    low: float  # Interval of that mean
+    high: float
+    recent: float  # Mean of the last horizon's observed points
+    change: float  # (interest - recent) / max(recent, 1), on momentum's scale
+    prob_higher: float  # Chance the horizon's mean ends up above recent
+
+
+def horizon_points(index: pd.DatetimeIndex, days: float = config.FORECAST_HORIZON_DAYS) -> int:
+    """Points covering `days` at the index's resolution (at least one)."""
+    if len(index) < 2:
+        return 1
+    step = pd.Series(index).diff().median()
+    return max(1, int(round(pd.Timedelta(days=days) / step)))
+
+
+def holt_fit(
+    values: np.ndarray,
+    alphas=config.FORECAST_ALPHAS,
+    betas=config.FORECAST_BETAS,
+    phi: float = config.FORECAST_DAMPING,
+) -> dict[str, np.ndarray]:
+    """Damped Holt fits of every row of values (NaN = missing point), best grid parameters per row.
+
+    Returns per-row alpha, beta, final level and trend, and the one-step sse
+    and error count under those parameters.
+    """
+    n = len(values)
+    grid_alpha, grid_beta = np.meshgrid(alphas, betas, indexing="ij")
+    alpha, beta = grid_alpha.reshape(-1, 1), grid_beta.reshape(-1, 1)  # One grid point per row of state
+
+    valid = ~np.isnan(values)
+    first = values[np.arange(n), valid.argmax(axis=1)]
+    level = np.tile(np.nan_to_num(first), (len(alpha), 1))
+    trend = np.zeros_like(level)
+    sse = np.zeros_like(level)
+    for t in range(values.shape[1]):
+        predicted = level + phi * trend
+        error = np.nan_to_num(values[:, t] - predicted)  # Missing points leave the state coasting
+        level = predicted + alpha * error
+        trend = phi * trend + alpha * beta * error
+        sse += error * error
+
+    best = sse.argmin(axis=0)
+    rows = np.arange(n)
+    return {
+        "alpha": alpha[best, 0],
+        "beta": beta[best, 0],
+        "level": level[best, rows],
+        "trend": trend[best, rows],
+        "sse": sse[best, rows],
+        "count": np.maximum(valid.sum(axis=1) - 1, 0),  # The first point predicts itself
+    }
+
+
+def ar_fit(values: np.ndarray, order: int = config.FORECAST_AR_ORDER) -> dict[str, np.ndarray]:
+    """Least-squares AR(order) fits (with intercept) of every row of values (NaN = missing point).
+
+    Returns per-row coefficients (intercept first, then lag 1..order), the
+    last `order` values (most recent first), the one-step sse and error count,
+    and whether the fit is stable (all roots inside the unit circle).
+    """
+    n, length = values.shape
+    steps = length - order
+    lags = np.stack([values[:, order - k - 1 : length - k - 1] for k in range(order)], axis=2)
+    design = np.concatenate([np.ones((n, steps, 1)), lags], axis=2)
+    target = values[:, order:]
+    usable = ~np.isnan(target) & ~np.isnan(lags).any(axis=2)
+    design = np.where(usable[..., None], design, 0.0)
+    target = np.where(usable, target, 0.0)
+
+    gram = np.einsum("nsi,nsj->nij", design, design) + 1e-3 * np.eye(order + 1)  # Ridge keeps flat series solvable
+    coef = np.linalg.solve(gram, np.einsum("nsi,ns->ni", design, target)[..., None])[..., 0]
+    residual = target - np.einsum("nsi,ni->ns", design, coef)
+
+    companion = np.zeros((n, order, order))
+    companion[:, 0, :] = coef[:, 1:]
+    companion[:, 1:, :-1] = np.eye(order - 1)
+    stable = np.abs(np.linalg.eigvals(companion)).max(axis=1) < 1
+
+    last = pd.DataFrame(values.T).ffill().to_numpy().T[:, ::-1][:, :order]
+    return {
+        "coef": coef,
+        "lags": np.nan_to_num(last),
+        "sse": (residual**2).sum(axis=1),
+        "count": usable.sum(axis=1),
+        "stable": stable,
+    }
+
+
+def fit_rows(values: np.ndarray, order: int = config.FORECAST_AR_ORDER, phi: float = config.FORECAST_DAMPING) -> dict:
+    """Both models' fits of every row (a parallel.AnalyticsExecutor task)."""
+    return {"holt": holt_fit(values, phi=phi), "ar": ar_fit(values, order)}
+
+
+def _normal_cdf(z: float) -> float:
+    return 0.5 * (1 + math.erf(z / math.sqrt(2)))
+
+
+class ForecastBank:
+    """Forecast state for a set of series sharing one resolution."""
+
+    _FLOAT_FIELDS = ("alpha", "beta", "level", "trend", "holt_var", "ar_var", "last_value")
+    _INT_FIELDS = ("model", "count", "fit_count", "last_ts")
+
+    def __init__(
+        self,
+        order: int = config.FORECAST_AR_ORDER,
+        phi: float = config.FORECAST_DAMPING,
+        min_points: int = config.FORECAST_MIN_POINTS,
+        refit_points: int = config.FORECAST_REFIT_POINTS,
+        executor=None,
+    ):
+        self.order = order
+        self.phi = phi
+        self.min_points = min_points
+        self.refit_points = refit_points
+        self.executor = executor  # parallel.AnalyticsExecutor for large refits; None = in-process
+
+        self.keywords: list[str] = []
+        self._slots: dict[str, int] = {}
+        for name in self._FLOAT_FIELDS:
+            setattr(self, name, np.zeros(0))
+        for name in self._INT_FIELDS:
+            setattr(self, name, np.zeros(0, dtype=np.int64))
+        self.coef = np.zeros((0, order + 1))
+        self.lags = np.zeros((0, order))
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def slots(self, keywords: list[str]) -> np.ndarray:
+        """Slot indices for keywords, registering unseen ones (unfitted until update_frame)."""
+        new = [kw for kw in dict.fromkeys(keywords) if kw not in self._slots]
+        if new:
+            for kw in new:
+                self._slots[kw] = len(self.keywords)
+                self.keywords.append(kw)
+            grow = len(new)
+            for name in self._FLOAT_FIELDS:
+                setattr(self, name, np.concatenate([getattr(self, name), np.zeros(grow)]))
+            for name in self._INT_FIELDS:
+                fill = _NO_TIME if name == "last_ts" else 0
+                setattr(self, name, np.concatenate([getattr(self, name), np.full(grow, fill, dtype=np.int64)]))
+            self.coef = np.vstack([self.coef, np.zeros((grow, self.order + 1))])
+            self.lags = np.vstack([self.lags, np.zeros((grow, self.order))])
+        return np.array([self._slots[kw] for kw in keywords], dtype=np.intp)
+
+    def update_frame(self, df: pd.DataFrame) -> dict[str, int]:
+        """Absorb a time-indexed frame (columns = keywords): refit or step each series forward.
+
+        Returns how many series were refitted, stepped incrementally and skipped.
+        """
+        df = df.drop(columns=["isPartial"], errors="ignore")
+        df = df.loc[:, ~df.columns.duplicated()]
+        counts = {"refit": 0, "incremental": 0, "skipped": 0}
+        if df.empty or not isinstance(df.index, pd.DatetimeIndex):
+            return counts
+
+        slots = self.slots(list(df.columns))
+        values = df.to_numpy(dtype=float).T
+        times = df.index.asi8
+
+        # Steppable: fitted, last point still in the window, and not yet due a refit
+        last_ts = self.last_ts[slots]
+        position = np.minimum(np.searchsorted(times, last_ts), len(times) - 1)
+        rows = np.arange(len(slots))
+        observed = values[rows, position]
+        new_points = (~np.isnan(values) & (times[None, :] > last_ts[:, None])).sum(axis=1)
+        steppable = (
+            (self.count[slots] > 0)
+            & (times[position] == last_ts)
+            & ~np.isnan(observed)
+            & (self.count[slots] - self.fit_count[slots] + new_points < self.refit_points)
+        )
+        steppable[steppable] = self._rescale(slots[steppable], observed[steppable])
+        refit, incremental = rows[~steppable], rows[steppable]
+
+        if len(refit):
+            counts["refit"], counts["skipped"] = self._refit(slots[refit], values[refit], times)
+        if len(incremental):
+            self._step(slots[incremental], values[incremental], times)
+            counts["incremental"] = len(incremental)
+        return counts
+
+    def _rescale(self, slots: np.ndarray, observed: np.ndarray) -> np.ndarray:
+        """Bring states onto the window's scale via their last points; False where that is unreliable."""
+        stored = self.last_value[slots]
+        same = observed == stored
+        usable = same | (np.minimum(observed, stored) >= _MIN_RESCALE_VALUE)
+        s = slots[usable & ~same]
+        scale = observed[usable & ~same] / stored[usable & ~same]
+        self.level[s] *= scale
+        self.trend[s] *= scale
+        self.lags[s] *= scale[:, None]
+        self.coef[s, 0] *= scale  # AR intercept; lag coefficients are scale-free
+        self.holt_var[s] *= scale**2
+        self.ar_var[s] *= scale**2
+        self.last_value[s] = observed[usable & ~same]
+        return usable
+
+    def _refit(self, slots: np.ndarray, values: np.ndarray, times: np.ndarray) -> tuple[int, int]:
+        """Fit both models to whole series; series too short are left unfitted."""
+        valid = ~np.isnan(values)
+        enough = valid.sum(axis=1) >= self.min_points
+        self.count[slots[~enough]] = 0
+        slots, values, valid = slots[enough], values[enough], valid[enough]
+        if not len(slots):
+            return 0, int((~enough).sum())
+
+        if self.executor is not None:
+            fits = self.executor.map_rows(fit_rows, values, order=self.order, phi=self.phi)
+        else:
+            fits = fit_rows(values, self.order, self.phi)
+        holt, ar = fits["holt"], fits["ar"]
+        holt_var = holt["sse"] / np.maximum(holt["count"] - 2, 1)
+        ar_var = ar["sse"] / np.maximum(ar["count"] - (self.order + 1), 1)
+
+        last = valid.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+        self.alpha[slots], self.beta[slots] = holt["alpha"], holt["beta"]
+        self.level[slots], self.trend[slots] = holt["level"], holt["trend"]
+        self.coef[slots], self.lags[slots] = ar["coef"], ar["lags"]
+        self.holt_var[slots], self.ar_var[slots] = holt_var, ar_var
+        self.model[slots] = np.where(ar["stable"] & (ar_var < holt_var), MODELS.index("ar"), MODELS.index("holt"))
+        self.count[slots] = valid.sum(axis=1)
+        self.fit_count[slots] = self.count[slots]
+        self.last_ts[slots] = times[last]
+        self.last_value[slots] = values[np.arange(len(slots)), last]
+        return len(slots), int((~enough).sum())
+
+    def _step(self, slots: np.ndarray, values: np.ndarray, times: np.ndarray) -> None:
+        """Run points after each slot's last seen timestamp through both models' recursions."""
+        start = np.searchsorted(times, self.last_ts[slots].min(), side="right")
+        for t in range(start, len(times)):
+            fresh = (self.last_ts[slots] < times[t]) & ~np.isnan(values[:, t])
+            if not fresh.any():
+                continue
+            s, x = slots[fresh], values[fresh, t]
+            count = self.count[s] + 1
+
+            predicted = self.level[s] + self.phi * self.trend[s]
+            error = x - predicted
+            self.level[s] = predicted + self.alpha[s] * error
+            self.trend[s] = self.phi * self.trend[s] + self.alpha[s] * self.beta[s] * error
+            self.holt_var[s] += (error**2 - self.holt_var[s]) / count
+
+            error = x - (self.coef[s, 0] + (self.coef[s, 1:] * self.lags[s]).sum(axis=1))
+            self.ar_var[s] += (error**2 - self.ar_var[s]) / count
+            self.lags[s] = np.column_stack([x, self.lags[s, :-1]])
+
+            self.count[s] = count
+            self.last_ts[s] = times[t]
+            self.last_value[s] = x
+
+    def _paths(self, slots: np.ndarray, horizon: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Mean path, psi weights (error propagation) and one-step variance of each slot's model."""
+        n = len(slots)
+        damped = np.cumsum(self.phi ** np.arange(1, horizon + 1))  # phi + ... + phi^h
+        holt_mean = self.level[slots, None] + damped * self.trend[slots, None]
+        holt_psi = np.ones((n, horizon))
+        holt_psi[:, 1:] = self.alpha[slots, None] * (1 + self.beta[slots, None] * damped[:-1])
+
+        coef, lags = self.coef[slots], self.lags[slots].copy()
+        ar_mean, ar_psi = np.zeros((n, horizon)), np.ones((n, horizon))
+        for h in range(horizon):
+            ar_mean[:, h] = coef[:, 0] + (coef[:, 1:] * lags).sum(axis=1)
+            lags = np.column_stack([ar_mean[:, h], lags[:, :-1]])
+            if h:
+                taps = min(h, self.order)
+                ar_psi[:, h] = (coef[:, 1 : taps + 1] * ar_psi[:, h - 1 :: -1][:, :taps]).sum(axis=1)
+
+        use_ar = (self.model[slots] == MODELS.index("ar"))[:, None]
+        mean = np.where(use_ar, ar_mean, holt_mean)
+        psi = np.where(use_ar, ar_psi, holt_psi)
+        variance = np.where(use_ar[:, 0], self.ar_var[slots], self.holt_var[slots])
+        return mean, psi, variance
+
+    def forecast(self, keywords: list[str], horizon: int, recent: dict[str, float]) -> dict[str, Forecast]:
+        """Forecasts for fitted keywords over the next `horizon` points.
+
+        recent gives each keyword's mean over its last `horizon` observed
+        points, on the same scale as the frame last passed to update_frame.
+        """
+        keywords = [kw for kw in keywords if kw in self._slots and self.count[self._slots[kw]] > 0]
+        if not keywords:
+            return {}
+        slots = self.slots(keywords)
+        mean, psi, variance = self._paths(slots, horizon)
+
+        z = config.FORECAST_INTERVAL_Z
+        step_sd = np.sqrt(variance[:, None] * np.cumsum(psi**2, axis=1))
+        # A shock feeds every later point of the horizon; their mean has these weights
+        mean_sd = np.sqrt(variance * (np.cumsum(psi, axis=1) ** 2).sum(axis=1)) / horizon
+        interest = np.maximum(mean.mean(axis=1), 0)
+
+        forecasts = {}
+        for i, kw in enumerate(keywords):
+            base = recent.get(kw, float(interest[i]))
+            gap = float(interest[i]) - base
+            forecasts[kw] = Forecast(
+                keyword=kw,
+                model=MODELS[self.model[slots[i]]],
+                mean=np.maximum(mean[i], 0),
+                lower=np.maximum(mean[i] - z * step_sd[i], 0),
+                upper=mean[i] + z * step_sd[i],
+                interest=float(interest[i]),
+                low=max(float(interest[i] - z * mean_sd[i]), 0.0),
+                high=float(interest[i] + z * mean_sd[i]),
+                recent=base,
+                change=gap / max(base, 1.0),
+                prob_higher=_normal_cdf(gap / mean_sd[i]) if mean_sd[i] > 0 else float(gap > 0) + 0.5 * (gap == 0),
+            )
+        return forecasts
+
+    def state_nbytes(self) -> int:
+        """Bytes held by the per-series state arrays."""
+        fields = self._FLOAT_FIELDS + self._INT_FIELDS
+        return self.coef.nbytes + self.lags.nbytes + sum(getattr(self, name).nbytes for name in fields)
+
+    def save(self, path: Path) -> None:
+        """Persist forecast state (atomically: concurrent runs share the state files)."""
+        fields = {name: getattr(self, name) for name in self._FLOAT_FIELDS + self._INT_FIELDS}
+        with atomic_write(path, "wb") as f:
+            np.savez(f, keywords=np.array(self.keywords, dtype=str), coef=self.coef, lags=self.lags, **fields)
+
+    def load(self, path: Path) -> None:
+        """Restore state saved with `save` (missing files are ignored; mismatched orders start over)."""
+        path = Path(path)
+        if not path.exists():
+            return
+        try:
+            data = np.load(path)
+            if data["coef"].shape[1] != self.order + 1:
+                logger.info(f"Forecast state {path.name} has another AR order; refitting")
+                return
+            self.keywords = data["keywords"].tolist()
+            self._slots = {kw: i for i, kw in enumerate(self.keywords)}
+            self.coef, self.lags = data["coef"], data["lags"]
+            for name in self._FLOAT_FIELDS + self._INT_FIELDS:
+                setattr(self, name, data[name])
+        except Exception as e:
+            logger.warning(f"Failed to load forecast state {path.name}: {e}")
+
+
+def apply_forecast(metrics, forecast: Forecast) -> None:
+    """Copy a forecast's summary onto a KeywordMetrics' forecast fields."""
+    metrics.forecast_model = forecast.model
+    metrics.forecast_interest = forecast.interest
+    metrics.forecast_low = forecast.low
+    metrics.forecast_high = forecast.high
+    metrics.forecast_change = forecast.change
+    metrics.forecast_prob_higher = forecast.prob_higher
+
+
+class ForecastEngine:
+    """One ForecastBank per (timeframe, geo, scope), restored from and saved to disk.
+
+    Series at different resolutions or scopes never share a bank: their
+    states would not line up.
+    """
+
+    def __init__(self, state_dir: Path | None = None, executor=None):
+        self.state_dir = Path(state_dir or config.FORECAST_STATE_DIR)
+        self.executor = executor  # Shared by every bank (parallel.AnalyticsExecutor)
+        self.banks: dict[tuple[str, str, str], ForecastBank] = {}
+
+    def _state_path(self, timeframe: str, geo: str, scope: str) -> Path:
+        return self.state_dir / f"forecast_{timeframe.replace(' ', '_')}_{geo}{scope}.npz".replace("/", "%2F")
+
+    def bank(self, timeframe: str, geo: str, scope: str = "") -> ForecastBank:
+        """Forecast bank for a timeframe/geo/scope, restored from disk on first use."""
+        key = (timeframe, geo, scope)
+        if key not in self.banks:
+            bank = ForecastBank(executor=self.executor)
+            bank.load(self._state_path(timeframe, geo, scope))
+            self.banks[key] = bank
+        return self.banks[key]
+
+    def forecast_frame(self, df: pd.DataFrame, timeframe: str, geo: str, scope: str = "") -> dict[str, Forecast]:
+        """Absorb a fetched interest frame and forecast each of its series over the next horizon."""
+        df = df.drop(columns=["isPartial"], errors="ignore")
+        if df.empty or not isinstance(df.index, pd.DatetimeIndex):
+            return {}
+        df = df.loc[:, ~df.columns.duplicated()].sort_index()
+
+        bank = self.bank(timeframe, geo, scope)
+        counts = bank.update_frame(df)
+        logger.debug(f"Forecast state {timeframe}/{geo}{scope}: {counts}")
+
+        # Recent: each series' last `horizon` observed points
+        horizon = horizon_points(df.index)
+        values = df.to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+        window = valid & (from_end <= horizon)
+        totals, counts = np.where(window, values, 0).sum(axis=0), window.sum(axis=0)
+        recent = {kw: float(totals[i] / counts[i]) for i, kw in enumerate(df.columns) if counts[i]}
+        return bank.forecast(list(df.columns), horizon, recent)
+
+    def save(self) -> None:
+        """Persist every bank's state."""
+        for (timeframe, geo, scope), bank in self.banks.items():
+            bank.save(self._state_path(timeframe, geo, scope))
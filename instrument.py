@@ -0,0 +1,192 @@
+"""
+Instrument module: Per-stage timing spans and request counters.
+
+A process-wide `tracer` records a span for every instrumented stage (cache
+lookup, backoff sleep, HTTP request, retry wait, metric extraction, scoring,
+figure build, HTML write) plus counters such as requests issued, cache
+hits/misses and 429s. Runs can dump a JSON trace; long-running modes can
+expose the aggregates in OpenMetrics text format over HTTP.
+"""
+
+import functools
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import config
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Stages that are waiting rather than working
+SLEEP_STAGES = ("backoff_sleep", "retry_wait")
+
+
+class Tracer:
+    """Collects spans and counters for one run (or one daemon lifetime).
+
+    Per-stage aggregates are always kept; raw spans are kept up to
+    `max_spans` so a long-running daemon's memory stays bounded.
+    """
+
+    def __init__(self, max_spans: int = config.TRACE_MAX_SPANS):
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a fresh run."""
+        with self._lock:
+            self.started_at = datetime.now()
+            self._t0 = time.perf_counter()
+            self.spans: list[dict] = []
+            self.dropped_spans = 0
+            self.counters: Counter = Counter()
+            self.stages: dict[str, dict] = {}
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time a stage; nested spans record their parent stage."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            self._record(name, start, duration, parent, attrs)
+
+    def traced(self, name: str, **attrs):
+        """Decorator form of span: time every call of the function as a stage."""
+
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **attrs):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorate
+
+    def _record(self, name: str, start: float, duration: float, parent: str | None, attrs: dict) -> None:
+        with self._lock:
+            stage = self.stages.setdefault(name, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            stage["count"] += 1
+            stage["total_s"] += duration
+            stage["max_s"] = max(stage["max_s"], duration)
+
+            if len(self.spans) < self.max_spans:
+                span = {"name": name, "start_s": round(start - self._t0, 6), "duration_s": round(duration, 6)}
+                if parent:
+                    span["parent"] = parent
+                if attrs:
+                    span["attrs"] = attrs
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self.counters[name] += n
+
+    def summary(self) -> dict:
+        """Wall time, time asleep vs working, and per-stage aggregates."""
+        with self._lock:
+            wall = time.perf_counter() - self._t0
+            sleeping = sum(self.stages.get(s, {}).get("total_s", 0.0) for s in SLEEP_STAGES)
+            return {
+                "wall_s": round(wall, 6),
+                "sleeping_s": round(sleeping, 6),
+                "working_s": round(max(wall - sleeping, 0.0), 6),
+                "stages": {name: dict(stage) for name, stage in sorted(self.stages.items())},
+                "counters": dict(self.counters),
+            }
+
+    def to_dict(self) -> dict:
+        summary = self.summary()
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                **summary,
+                "dropped_spans": self.dropped_spans,
+                "spans": list(self.spans),
+            }
+
+    def write_trace(self, path: Path | None = None) -> Path:
+        """Write the run trace as JSON and log the sleep/work split."""
+        if path is None:
+            timestamp = self.started_at.strftime("%Y-%m-%d_%H-%M-%S")
+            path = config.TRACE_DIR / f"trace_{timestamp}.json"
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        data = self.to_dict()
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+        logger.info(
+            f"Run trace: {data['wall_s']:.1f}s wall, {data['sleeping_s']:.1f}s sleeping, "
+            f"{data['working_s']:.1f}s working, counters={data['counters']} -> {path}"
+        )
+        return path
+
+    def openmetrics(self) -> str:
+        """Aggregates in OpenMetrics text exposition format."""
+        summary = self.summary()
+        lines = [
+            "# TYPE trends_stage_seconds summary",
+            "# HELP trends_stage_seconds Time spent per instrumented stage.",
+        ]
+        for name, stage in summary["stages"].items():
+            lines.append(f'trends_stage_seconds_sum{{stage="{name}"}} {stage["total_s"]:.6f}')
+            lines.append(f'trends_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f"# TYPE trends_{name} counter")
+            lines.append(f"trends_{name}_total {value}")
+        lines.append("# TYPE trends_uptime_seconds gauge")
+        lines.append(f"trends_uptime_seconds {summary['wall_s']:.3f}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+tracer = Tracer()
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1", source: Tracer = tracer) -> "ThreadingHTTPServer":
+    """Serve /metrics (OpenMetrics) from a background thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = source.openmetrics().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    logger.info(f"Metrics endpoint: http://{host}:{httpd.server_address[1]}/metrics")
+    return httpd
@@ -0,0 +1,165 @@
+"""
+Journal module: Durable job journals so long fetch sweeps can be resumed.
+
+A sweep of hundreds of keywords is hours of rate-limited requests, and the
+assembled frames live only in memory. A sweep run with --journal writes a job
+journal to `output/jobs/<job-id>.jsonl`: one JSON event per line, appended and
+fsynced as it happens, so a crash or Ctrl-C loses at most the batch in flight.
+A job that ends with every batch done has nothing left to resume, and its
+journal is removed; one that crashed or left batches undone keeps it.
+
+    {"event": "job", "job_id": ..., "params": {...}}        the run's arguments
+    {"event": "planned", "batches": [{"key": ..., ...}]}    batches it will fetch
+    {"event": "done", "key": ...}                           a batch fully processed
+    {"event": "failed", "key": ..., "error": ...}           a batch skipped or fatal
+    {"event": "resumed"} / {"event": "finished"}
+
+`--resume <job-id>` reruns the job with its recorded arguments. Batches
+already done are rebuilt from the cache (stale entries allowed, so an entry
+that aged past its TTL meanwhile is not fetched again); failed and unfinished
+batches are fetched as usual. Batches are keyed by scope and the
+order-insensitive keyword batch key, so a resumed run matches them however
+the keywords were spelled.
+"""
+
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import config
+from normalize import get_index
+
+logger = logging.getLogger(__name__)
+
+# Arguments that belong to one invocation rather than to the job
+TRANSIENT_ARGS = ("resume", "trace")
+
+
+class JournalError(Exception):
+    """Raised when a job journal is missing or unreadable."""
+    pass
+
+
+def batch_key(keywords: list[str], timeframe: str, geo: str, scope: str = "") -> str:
+    """Journal key of one fetch batch (same normalization as cache keys)."""
+    return f"{get_index().batch_key(keywords)}|{timeframe}|{geo}{scope}"
+
+
+class JobJournal:
+    """Append-only event log of one job, and the state replayed from it."""
+
+    def __init__(self, job_id: str, jobs_dir: Path | None = None):
+        self.job_id = job_id
+        self.path = Path(jobs_dir or config.JOBS_DIR) / f"{job_id}.jsonl"
+        self.params: dict = {}
+        self.planned: dict[str, dict] = {}  # key -> {"keywords", "timeframe", "geo", "scope"}
+        self.done: set[str] = set()
+        self.failed: dict[str, str] = {}  # key -> last error
+        self.finished = False
+
+    @classmethod
+    def create(cls, params: dict, jobs_dir: Path | None = None) -> "JobJournal":
+        """Start a new job recording its arguments."""
+        job_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        journal = cls(job_id, jobs_dir)
+        journal.params = {name: value for name, value in params.items() if name not in TRANSIENT_ARGS}
+        journal._append({"event": "job", "job_id": job_id, "params": journal.params})
+        return journal
+
+    @classmethod
+    def open(cls, job_id: str, jobs_dir: Path | None = None) -> "JobJournal":
+        """Replay an existing job's journal."""
+        journal = cls(job_id, jobs_dir)
+        if not journal.path.exists():
+            raise JournalError(f"No job '{job_id}' in {journal.path.parent}")
+
+        with open(journal.path) as f:
+            lines = f.read().splitlines()
+        for number, line in enumerate(lines, 1):
+            try:
+                journal._apply(json.loads(line))
+            except ValueError:
+                # Only the last line can be torn (a crash mid-append); anything else is corruption
+                if number == len(lines):
+                    logger.warning(f"Ignoring torn last line of {journal.path}")
+                    continue
+                raise JournalError(f"{journal.path}:{number} is not a journal event")
+        if not journal.params:
+            raise JournalError(f"{journal.path} has no job record")
+        return journal
+
+    def _apply(self, event: dict) -> None:
+        kind = event["event"]
+        if kind == "job":
+            self.params = event["params"]
+        elif kind == "planned":
+            for batch in event["batches"]:
+                self.planned[batch["key"]] = {name: value for name, value in batch.items() if name != "key"}
+        elif kind == "done":
+            self.done.add(event["key"])
+            self.failed.pop(event["key"], None)
+        elif kind == "failed":
+            self.failed[event["key"]] = event["error"]
+        elif kind == "resumed":
+            self.finished = False
+        elif kind == "finished":
+            self.finished = True
+
+    def _append(self, event: dict) -> None:
+        """Write one event and fsync it, so it survives a crash right after."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps({**event, "at": datetime.now().isoformat(timespec="seconds")}, default=str)
+        with open(self.path, "a") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def plan(self, batches: list[list[str]], timeframe: str, geo: str, scope: str = "") -> list[str]:
+        """Record batches about to be fetched (those not planned before); their keys in order."""
+        keys = [batch_key(batch, timeframe, geo, scope) for batch in batches]
+        new = [
+            {"key": key, "keywords": batch, "timeframe": timeframe, "geo": geo, "scope": scope}
+            for key, batch in zip(keys, batches)
+            if key not in self.planned
+        ]
+        if new:
+            self._append({"event": "planned", "batches": new})
+            for batch in new:
+                self.planned[batch["key"]] = {name: value for name, value in batch.items() if name != "key"}
+        return keys
+
+    def is_done(self, key: str) -> bool:
+        return key in self.done
+
+    def mark_done(self, key: str) -> None:
+        self._append({"event": "done", "key": key})
+        self.done.add(key)
+        self.failed.pop(key, None)
+
+    def mark_failed(self, key: str, error: Exception | str) -> None:
+        self._append({"event": "failed", "key": key, "error": str(error)})
+        self.failed[key] = str(error)
+
+    def resume(self) -> None:
+        """Record that the job is running again and log where it stands."""
+        self._append({"event": "resumed"})
+        logger.info(
+            f"Resuming job {self.job_id}: {len(self.done)} of {len(self.planned)} planned batches done "
+            f"(rebuilt from cache), {len(self.failed)} failed (retried)"
+            + (" — job had finished with batches undone" if self.finished else "")
+        )
+        self.finished = False
+
+    def finish(self) -> None:
+        """Record the end of the run, removing the journal if every planned batch is done."""
+        self.finished = True
+        undone = len(set(self.planned) - self.done)
+        if not undone:
+            self.path.unlink(missing_ok=True)
+            logger.debug(f"Job {self.job_id} complete; removed {self.path}")
+            return
+        self._append({"event": "finished"})
+        logger.info(f"Job {self.job_id} left {undone} batches undone; --resume {self.job_id} fetches them")
@@ -0,0 +1,155 @@
+"""
+Locking module: Cross-process file locks, atomic writes, and a shared rate budget.
+
+Several scraper processes (cron jobs, analysts) share one `.cache/`. Writes go
+through a temp file and `os.replace`, so readers never see a torn file. Each
+cache key has its own lock file, so concurrent misses on one key coalesce into
+a single request. A rate budget file spaces requests across every process on
+the host.
+
+Locks use `fcntl.flock`, which the OS releases when a process dies. Where
+fcntl is unavailable (Windows) they fall back to in-process locks only.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_DIR_NAME = ".locks"
+
+# Fallback when fcntl is missing: one lock per path, shared by this process's threads
+_local_locks: dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def _read_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Read once at import: os.umask can only be read by setting it, which is not thread-safe
+_UMASK = _read_umask()
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = "w"):
+    """File to write path's new contents to: a temp file in the same directory,
+    renamed into place when the block exits cleanly (removed if it raises)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        # mkstemp creates 0600; give the file the mode open() would, so other accounts can read the cache
+        os.chmod(tmp_name, 0o666 & ~_UMASK)
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: Path, data, **dump_kwargs) -> None:
+    """Write JSON to a temp file in the same directory, then rename it into place."""
+    with atomic_write(path) as f:
+        json.dump(data, f, **dump_kwargs)
+
+
+class FileLock:
+    """Exclusive lock held on a lock file, across processes and threads.
+
+    One instance is one acquisition; threads should each create their own.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd = None
+        self._local = None
+
+    def acquire(self) -> "FileLock":
+        if fcntl is None:
+            with _local_locks_guard:
+                self._local = _local_locks.setdefault(str(self.path), threading.Lock())
+            self._local.acquire()
+            return self
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        except PermissionError:
+            # Another account's lock file (subject to its umask); flock only needs a read handle
+            self._fd = os.open(self.path, os.O_RDONLY)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(self._fd)
+            self._fd = None
+            raise
+        return self
+
+    def release(self) -> None:
+        if self._local is not None:
+            self._local.release()
+            self._local = None
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def key_lock(cache_dir: Path, key: str) -> FileLock:
+    """Lock guarding one cache key (lock file names are hashed; keys can be long)."""
+    digest = hashlib.sha1(key.encode()).hexdigest()[:20]
+    return FileLock(Path(cache_dir) / LOCK_DIR_NAME / f"{digest}.lock")
+
+
+class RateBudget:
+    """Spaces requests at least `min_interval` apart across every process sharing `state_path`.
+
+    Each caller reserves the next free slot under the lock and sleeps outside
+    it, so waiting processes don't block each other's reservations.
+    """
+
+    def __init__(self, state_path: Path):
+        self.state_path = Path(state_path)
+        self.lock_path = self.state_path.with_suffix(".lock")
+
+    def reserve(self, min_interval: float) -> float:
+        """Claim the next request slot; returns the seconds to wait until it."""
+        with FileLock(self.lock_path):
+            last_slot = 0.0
+            try:
+                with open(self.state_path) as f:
+                    last_slot = float(json.load(f).get("last_slot", 0.0))
+            except FileNotFoundError:
+                pass
+            except (ValueError, OSError) as e:
+                logger.warning(f"Resetting unreadable rate budget state: {e}")
+
+            now = time.time()
+            slot = max(now, last_slot + min_interval)
+            atomic_write_json(self.state_path, {"last_slot": slot, "pid": os.getpid()})
+        return slot - now
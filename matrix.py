@@ -0,0 +1,78 @@
+"""
+Matrix module: Keywords across Google properties and categories.
+
+A fetch matrix is keywords x cells, where a cell is one (gprop, category)
+scope, e.g. web search in all categories, or YouTube in News. Each cell is
+fetched with the same keyword batches, so values within a cell share a scale.
+Interest is normalized per request, so compare keywords within a cell, and
+compare a keyword's momentum and peaks, not raw levels, across cells.
+"""
+
+from dataclasses import dataclass
+from itertools import product
+
+import config
+from analyzer import ComparisonScore, KeywordAnalyzer, KeywordMetrics
+
+
+@dataclass(frozen=True)
+class MatrixCell:
+    """One fetch scope: a Google property (pytrends gprop) and a category id."""
+    gprop: str = ""
+    cat: int = config.DEFAULT_CATEGORY
+
+    @property
+    def label(self) -> str:
+        prop = next((name for name, value in config.GPROPS.items() if value == self.gprop), self.gprop)
+        if self.cat == config.DEFAULT_CATEGORY:
+            return prop
+        return f"{prop} / {config.CATEGORY_NAMES.get(self.cat, f'cat {self.cat}')}"
+
+
+def parse_gprops(text: str) -> list[str]:
+    """Comma-separated property names ("web,news,youtube") to pytrends gprop values."""
+    gprops = []
+    for name in (part.strip().lower() for part in text.split(",")):
+        if not name:
+            continue
+        if name not in config.GPROPS:
+            raise ValueError(f"Unknown property {name!r} (choose from {', '.join(config.GPROPS)})")
+        gprops.append(config.GPROPS[name])
+    return list(dict.fromkeys(gprops))
+
+
+def parse_categories(text: str) -> list[int]:
+    """Comma-separated Trends category ids ("0,16")."""
+    try:
+        categories = [int(part) for part in text.split(",") if part.strip()]
+    except ValueError as e:
+        raise ValueError(f"Categories must be numeric Trends ids: {e}") from e
+    return list(dict.fromkeys(categories))
+
+
+def build_cells(gprops: list[str], categories: list[int]) -> list[MatrixCell]:
+    """Every (gprop, category) combination, web/all-categories defaults filling empty axes."""
+    gprops = gprops or [""]
+    categories = categories or [config.DEFAULT_CATEGORY]
+    return [MatrixCell(gprop, cat) for gprop, cat in product(gprops, categories)]
+
+
+def score_matrix(
+    metrics: dict[MatrixCell, dict[str, KeywordMetrics]],
+    keywords: list[str],
+    reference: list[str],
+) -> dict[MatrixCell, dict[str, ComparisonScore]]:
+    """Similarity to the reference keywords, computed within each cell."""
+    scores = {}
+    for cell, cell_metrics in metrics.items():
+        cell_reference = [kw for kw in reference if kw in cell_metrics]
+        if not cell_reference:
+            continue
+        analyzer = KeywordAnalyzer()
+        analyzer.set_reference_keywords(cell_reference, cell_metrics)
+        scores[cell] = {
+            kw: analyzer.compare_to_reference(kw, cell_metrics[kw])
+            for kw in keywords
+            if kw in cell_metrics
+        }
+    return scores
@@ -0,0 +1,165 @@
+"""
+Normalize module: Canonical keyword keys and a shared dedupe index.
+
+"World War 3", "world war iii", "World War Three" and "ww3 " all normalize to
+the key "world war 3". Fetching, caching and discovery look keywords up in one
+shared KeywordIndex, so near-duplicates collapse into a single canonical
+keyword before they cost a rate-limited request.
+"""
+
+import json
+import logging
+import re
+import unicodedata
+from pathlib import Path
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Multi-letter roman numerals only: single "i", "v" and "x" are too often plain words.
+_ROMAN_VALUES = {"i": 1, "v": 5, "x": 10}
+_ROMAN_STOPWORDS = {"xi"}  # Names that happen to be valid numerals
+_NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+}
+
+_DROP_CHARS = re.compile(r"[.'’]")  # "u.s." -> "us", "trump's" -> "trumps"
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def _roman_to_int(token: str) -> int | None:
+    """Value of a well-formed roman numeral made of i/v/x, else None."""
+    if not token or any(c not in _ROMAN_VALUES for c in token):
+        return None
+    total = 0
+    for i, c in enumerate(token):
+        value = _ROMAN_VALUES[c]
+        if i + 1 < len(token) and _ROMAN_VALUES[token[i + 1]] > value:
+            total -= value
+        else:
+            total += value
+    # Reject non-canonical spellings such as "iiii" or "vx"
+    return total if _int_to_roman(total) == token else None
+
+
+def _int_to_roman(value: int) -> str:
+    numerals = [(10, "x"), (9, "ix"), (5, "v"), (4, "iv"), (1, "i")]
+    out = []
+    for n, symbol in numerals:
+        while value >= n:
+            out.append(symbol)
+            value -= n
+    return "".join(out)
+
+
+def _fold_token(token: str) -> str:
+    """Fold number words and multi-letter roman numerals to digits."""
+    if token in _NUMBER_WORDS:
+        return _NUMBER_WORDS[token]
+    if len(token) > 1 and token not in _ROMAN_STOPWORDS:
+        value = _roman_to_int(token)
+        if value is not None:
+            return str(value)
+    return token
+
+
+def normalize_keyword(keyword: str, synonyms: dict[str, str] | None = None) -> str:
+    """Normalization key for a keyword.
+
+    Applies unicode compatibility folding, accent stripping, case folding,
+    punctuation and whitespace collapsing, numeral folding, and finally the
+    synonym table (whole phrase first, then single tokens).
+    """
+    text = unicodedata.normalize("NFKD", keyword)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _DROP_CHARS.sub("", text)
+    tokens = [_fold_token(t) for t in _SEPARATORS.sub(" ", text).split()]
+    key = " ".join(tokens)
+
+    if synonyms:
+        if key in synonyms:
+            return synonyms[key]
+        key = " ".join(synonyms.get(t, t) for t in tokens)
+        key = synonyms.get(key, key)
+    return key
+
+
+def load_synonyms(path: Path = config.KEYWORD_SYNONYMS_FILE) -> dict[str, str]:
+    """Synonym table from config plus the optional JSON file, with normalized keys."""
+    table = dict(config.KEYWORD_SYNONYMS)
+    if path and Path(path).exists():
+        try:
+            with open(path) as f:
+                table.update(json.load(f))
+        except Exception as e:
+            logger.warning(f"Failed to load synonyms from {path}: {e}")
+
+    # Normalize both sides so entries match however they were typed
+    return {normalize_keyword(k): normalize_keyword(v) for k, v in table.items()}
+
+
+class KeywordIndex:
+    """Maps normalization keys to one canonical surface keyword.
+
+    The first surface form seen for a key becomes its canonical keyword, so
+    the text sent to Google is stable within a run. Keys are memoized per raw
+    string, so repeated lookups are a dict hit.
+    """
+
+    def __init__(self, synonyms: dict[str, str] | None = None):
+        self.synonyms = load_synonyms() if synonyms is None else synonyms
+        self._keys: dict[str, str] = {}  # raw keyword -> key
+        self._canonical: dict[str, str] = {}  # key -> canonical keyword
+
+    def key(self, keyword: str) -> str:
+        """Normalization key for a keyword (memoized)."""
+        key = self._keys.get(keyword)
+        if key is None:
+            key = normalize_keyword(keyword, self.synonyms)
+            self._keys[keyword] = key
+        return key
+
+    def __contains__(self, keyword: str) -> bool:
+        return self.key(keyword) in self._canonical
+
+    def canonical(self, keyword: str) -> str:
+        """Canonical keyword for a raw keyword, registering it if unseen."""
+        key = self.key(keyword)
+        if key not in self._canonical:
+            # A synonym hit canonicalizes to the table's phrase, not the alias ("ww3")
+            synonym_hit = normalize_keyword(keyword) != key
+            self._canonical[key] = key if synonym_hit else " ".join(keyword.split())
+        return self._canonical[key]
+
+    def alias(self, keyword: str, canonical: str) -> None:
+        """Make `keyword` resolve to the same key and keyword as `canonical`."""
+        self._keys[keyword] = self.key(canonical)
+        self._canonical.setdefault(self._keys[keyword], canonical)
+
+    def dedupe(self, keywords: list[str]) -> list[str]:
+        """Canonical keywords in first-seen order, near-duplicates collapsed."""
+        result = {}
+        for keyword in keywords:
+            canonical = self.canonical(keyword)
+            if canonical in result and keyword != canonical:
+                logger.info(f"Collapsed duplicate keyword '{keyword}' into '{canonical}'")
+            result.setdefault(canonical, None)
+        return list(result)
+
+    def batch_key(self, keywords: list[str]) -> str:
+        """Order- and spelling-insensitive key for a keyword batch (used in cache keys)."""
+        return "_".join(sorted(self.key(kw) for kw in keywords))
+
+
+_index: KeywordIndex | None = None
+
+
+def get_index() -> KeywordIndex:
+    """The process-wide keyword index shared by fetch, cache and discovery paths."""
+    global _index
+    if _index is None:
+        _index = KeywordIndex()
+    return _index
@@ -0,0 +1,138 @@
+"""
+Parallel module: Shard analytics over large keyword universes across a process pool.
+
+An AnalyticsExecutor splits the rows of a matrix (one row per keyword series,
+or per candidate pair) into fixed PARALLEL_SHARD_ROWS shards and runs a task
+on each in a worker process. The matrix, and any other arrays the task needs
+whole, are written once to memory-mapped .npy files (in /dev/shm where it
+exists, so they never touch disk); workers map them read-only, so no series
+is pickled or copied per task.
+
+Results are merged in row order, whichever shard finishes first. Shard
+boundaries do not depend on the worker count, and matrices under
+PARALLEL_MIN_ROWS (or a single worker) run the same shards in-process, so a
+task's output is identical however many workers ran it.
+
+Tasks are module-level functions (so workers can unpickle them) that work
+row by row and take the shard's rows first:
+
+    with AnalyticsExecutor(workers=4) as executor:
+        fits = executor.map_rows(fit_rows, values, order=3)
+"""
+
+import logging
+import os
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_SHARED_MEMORY_DIR = Path("/dev/shm")
+
+
+def default_workers() -> int:
+    """PARALLEL_WORKERS, or one worker per CPU core."""
+    return config.PARALLEL_WORKERS or os.cpu_count() or 1
+
+
+def merge(results: list):
+    """Shard results concatenated in order: arrays, tuples or dicts of them, or lists."""
+    first = results[0]
+    if isinstance(first, dict):
+        return {key: merge([r[key] for r in results]) for key in first}
+    if isinstance(first, tuple):
+        return tuple(merge(list(parts)) for parts in zip(*results))
+    if isinstance(first, np.ndarray):
+        return np.concatenate(results)
+    return [item for r in results for item in r]
+
+
+def _share(array: np.ndarray, directory: Path) -> Path:
+    """Write an array to a .npy file workers can memory-map."""
+    path = directory / f"{uuid.uuid4().hex}.npy"
+    mapped = np.lib.format.open_memmap(path, mode="w+", dtype=array.dtype, shape=array.shape)
+    mapped[...] = array
+    mapped.flush()
+    del mapped
+    return path
+
+
+def _run_shard(task, path: Path, start: int, stop: int, shared: dict, per_row: dict, kwargs: dict):
+    """Worker side: map the arrays and run the task on rows start:stop."""
+    rows = np.load(path, mmap_mode="r")[start:stop]
+    arrays = {name: np.load(p, mmap_mode="r") for name, p in shared.items()}
+    return start, task(rows, **per_row, **arrays, **kwargs)
+
+
+class AnalyticsExecutor:
+    """Runs row-wise tasks over shards of a matrix, in a process pool when it pays off."""
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        shard_rows: int = config.PARALLEL_SHARD_ROWS,
+        min_rows: int = config.PARALLEL_MIN_ROWS,
+    ):
+        self.workers = max(1, workers or default_workers())
+        self.shard_rows = shard_rows
+        self.min_rows = min_rows
+        self._pool: ProcessPoolExecutor | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Shut the worker pool down (it is started again on demand)."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def shards(self, rows: int) -> list[tuple[int, int]]:
+        """(start, stop) row ranges of PARALLEL_SHARD_ROWS each (the last may be shorter)."""
+        return [(start, min(start + self.shard_rows, rows)) for start in range(0, rows, self.shard_rows)]
+
+    def map_rows(self, task, values: np.ndarray, per_row: dict | None = None, **kwargs):
+        """task(values[start:stop], **slices, **kwargs) for every shard, merged in row order.
+
+        per_row holds sequences aligned with values' rows; each shard gets its
+        slice. Array kwargs are shared whole (memory-mapped in workers); other
+        kwargs are pickled as they are.
+        """
+        per_row = per_row or {}
+        shards = self.shards(len(values))
+        if not shards:
+            return task(values, **per_row, **kwargs)
+
+        def sliced(start, stop):
+            return {name: rows[start:stop] for name, rows in per_row.items()}
+
+        if self.workers == 1 or len(values) < self.min_rows:
+            return merge([task(values[start:stop], **sliced(start, stop), **kwargs) for start, stop in shards])
+
+        arrays = {name: value for name, value in kwargs.items() if isinstance(value, np.ndarray)}
+        others = {name: value for name, value in kwargs.items() if name not in arrays}
+        directory = _SHARED_MEMORY_DIR if _SHARED_MEMORY_DIR.is_dir() and os.access(_SHARED_MEMORY_DIR, os.W_OK) else None
+        with tempfile.TemporaryDirectory(prefix="trends-parallel-", dir=directory) as tmp:
+            path = _share(np.ascontiguousarray(values), Path(tmp))
+            shared = {name: _share(np.ascontiguousarray(array), Path(tmp)) for name, array in arrays.items()}
+            futures = [
+                self.pool().submit(_run_shard, task, path, start, stop, shared, sliced(start, stop), others)
+                for start, stop in shards
+            ]
+            results = dict(future.result() for future in futures)
+        logger.debug(f"{task.__name__}: {len(values)} rows in {len(shards)} shards on {self.workers} workers")
+        return merge([results[start] for start, _ in shards])
@@ -0,0 +1,258 @@
+"""
+Planner module: Refresh schedule driven by the episode calendar.
+
+The live-feed calendar gives every promoted episode a primary keyword and a
+publish slot; the episode sheet lists the rest, not yet scheduled. The planner
+turns them into a refresh plan: each keyword's soonest upcoming airing sets how
+fresh its data must be (PLANNER_FRESHNESS_HOURS), keywords airing soonest are
+fetched first, and keywords whose newest snapshot is fresh enough are skipped.
+Keywords clustered with a co-moving representative (clustering.py) are
+refreshed rarely while the representative carries their schedule.
+Fetches go through the fetcher's shared rate budget; results are appended to
+per-episode metric snapshots in `output/data/episodes/`.
+"""
+
+import csv
+import json
+import logging
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+
+import config
+from locking import atomic_write_json
+from normalize import get_index
+
+logger = logging.getLogger(__name__)
+
+_SLOT_TIME = re.compile(r"(\d{1,2}):(\d{2})\s*([AP]M)(?:\s+([A-Z]{2,4}))?", re.IGNORECASE)
+
+
+@dataclass
+class Episode:
+    """One episode and, if it is on the calendar, when it airs."""
+    episode_num: int
+    title: str
+    primary_keyword: str
+    air_time: datetime | None = None  # UTC; None = not on the calendar yet
+    slot: str = ""
+    arc: str = ""
+
+
+@dataclass
+class PlannedKeyword:
+    """A keyword in the refresh plan, with the freshness its soonest episode needs."""
+    keyword: str
+    air_time: datetime | None  # Soonest upcoming airing, None if unscheduled
+    max_age: timedelta  # Freshness policy for that airing
+    age: timedelta | None  # Age of the newest snapshot, None if never fetched
+    episodes: list[Episode] = field(default_factory=list)
+    representative: str = ""  # Cluster representative refreshed on this keyword's behalf, if any
+
+    @property
+    def due(self) -> bool:
+        return self.age is None or self.age > self.max_age
+
+
+def parse_slot(day: date, slot: str) -> datetime:
+    """Air time in UTC from a calendar date and a slot like "PM (2:00 PM PST)"."""
+    match = _SLOT_TIME.search(slot)
+    if not match:
+        return datetime.combine(day, time(), tzinfo=timezone.utc)  # Unknown slot: start of the day
+
+    hour = int(match.group(1)) % 12 + (12 if match.group(3).upper() == "PM" else 0)
+    offset = config.SLOT_TIMEZONES.get((match.group(4) or "UTC").upper(), 0)
+    local = datetime.combine(day, time(hour, int(match.group(2))), tzinfo=timezone(timedelta(hours=offset)))
+    return local.astimezone(timezone.utc)
+
+
+def load_calendar(path: Path = config.LIVE_FEED_CALENDAR) -> list[Episode]:
+    """Scheduled episodes from the live-feed calendar JSON."""
+    with open(path) as f:
+        calendar = json.load(f)
+
+    episodes = []
+    for day in calendar.get("calendar_days", []):
+        day_date = date.fromisoformat(day["date"])
+        for raw in day.get("episodes", []):
+            keyword = raw.get("primary_keyword", "").strip()
+            if not keyword:
+                continue
+            episodes.append(
+                Episode(
+                    episode_num=int(raw.get("episode_num", 0)),
+                    title=raw.get("title", ""),
+                    primary_keyword=keyword,
+                    air_time=parse_slot(day_date, raw.get("slot", "")),
+                    slot=raw.get("slot", ""),
+                    arc=raw.get("arc", ""),
+                )
+            )
+    return episodes
+
+
+def load_episode_sheet(path: Path = config.EPISODE_SHEET) -> list[Episode]:
+    """Every episode from an episode sheet CSV (unscheduled: the sheet has no dates)."""
+    with open(path, newline="") as f:
+        return [
+            Episode(
+                episode_num=int(row["Episode"]),
+                title=row.get("SEO_Title", ""),
+                primary_keyword=row["Primary_Keyword"].strip(),
+                arc=row.get("Arc", ""),
+            )
+            for row in csv.DictReader(f)
+            if row.get("Primary_Keyword", "").strip()
+        ]
+
+
+def merge_episodes(calendar: list[Episode], sheet: list[Episode]) -> list[Episode]:
+    """Sheet episodes with calendar entries (matched by episode number) taking precedence."""
+    merged = {episode.episode_num: episode for episode in sheet}
+    merged.update({episode.episode_num: episode for episode in calendar})
+    return sorted(merged.values(), key=lambda e: e.episode_num)
+
+
+class SnapshotStore:
+    """Per-episode metric snapshots, newest last, in one JSON file per episode."""
+
+    def __init__(self, directory: Path | None = None):
+        self.directory = Path(directory or config.EPISODE_SNAPSHOT_DIR)
+
+    def path(self, episode: Episode) -> Path:
+        return self.directory / f"episode_{episode.episode_num:03d}.json"
+
+    def load(self, episode: Episode) -> list[dict]:
+        path = self.path(episode)
+        if not path.exists():
+            return []
+        try:
+            with open(path) as f:
+                return json.load(f).get("snapshots", [])
+        except Exception as e:
+            logger.warning(f"Failed to load snapshots from {path}: {e}")
+            return []
+
+    def latest_time(self, episode: Episode) -> datetime | None:
+        """When the newest fresh snapshot was taken (stale cache data does not count as a refresh)."""
+        taken = [s["taken_at"] for s in self.load(episode) if s.get("data_status", "fresh") == "fresh"]
+        return datetime.fromisoformat(taken[-1]) if taken else None
+
+    def append(self, episode: Episode, snapshot: dict) -> None:
+        snapshots = (self.load(episode) + [snapshot])[-config.EPISODE_SNAPSHOTS_KEPT :]
+        data = {
+            "episode_num": episode.episode_num,
+            "title": episode.title,
+            "primary_keyword": episode.primary_keyword,
+            "air_time": episode.air_time.isoformat() if episode.air_time else None,
+            "snapshots": snapshots,
+        }
+        atomic_write_json(self.path(episode), data, indent=2, default=str)
+
+
+class RefreshPlanner:
+    """Orders keyword refreshes by how soon their episodes air."""
+
+    def __init__(
+        self,
+        episodes: list[Episode],
+        store: SnapshotStore | None = None,
+        now: datetime | None = None,
+        representatives: dict[str, str] | None = None,
+    ):
+        self.episodes = episodes
+        self.store = store or SnapshotStore()
+        self.now = now or datetime.now(timezone.utc)
+        self.representatives = representatives or {}  # Keyword key -> cluster representative (clustering.py)
+
+    def max_age(self, air_time: datetime | None) -> timedelta:
+        """Freshness policy: how old data may be for an episode airing at air_time."""
+        if air_time is not None:
+            until = air_time - self.now
+            for days, hours in config.PLANNER_FRESHNESS_HOURS:
+                if until <= timedelta(days=days):
+                    return timedelta(hours=hours)
+        return timedelta(hours=config.PLANNER_UNSCHEDULED_MAX_AGE_HOURS)
+
+    def plan(self, days_ahead: int | None = None) -> list[PlannedKeyword]:
+        """Every keyword with an upcoming (or unscheduled) episode, soonest airing first.
+
+        Aired episodes are dropped; with days_ahead, so are episodes airing later
+        than that or not scheduled at all.
+        """
+        index = get_index()
+        grouped: dict[str, list[Episode]] = {}
+        for episode in self.episodes:
+            if episode.air_time is not None and episode.air_time < self.now:
+                continue
+            if days_ahead is not None and (
+                episode.air_time is None or episode.air_time > self.now + timedelta(days=days_ahead)
+            ):
+                continue
+            grouped.setdefault(index.canonical(episode.primary_keyword), []).append(episode)
+
+        planned = []
+        for keyword, episodes in grouped.items():
+            air_times = [e.air_time for e in episodes if e.air_time is not None]
+            air_time = min(air_times) if air_times else None
+            taken = [t for t in (self.store.latest_time(e) for e in episodes) if t is not None]
+            planned.append(
+                PlannedKeyword(
+                    keyword=keyword,
+                    air_time=air_time,
+                    max_age=self.max_age(air_time),
+                    age=self.now - max(taken) if taken else None,
+                    episodes=episodes,
+                )
+            )
+
+        self._apply_clusters(planned)
+        far_future = datetime.max.replace(tzinfo=timezone.utc)
+        return sorted(planned, key=lambda p: p.air_time or far_future)
+
+    def _apply_clusters(self, planned: list[PlannedKeyword]) -> None:
+        """Refresh each cluster's representative as often as its members need, the members rarely.
+
+        A representative takes on the soonest airing and strictest freshness of
+        the members it stands in for; members keep their data up to
+        CLUSTER_MEMBER_AGE_FACTOR times longer. Members whose representative is
+        not in the plan keep their own policy.
+        """
+        if not self.representatives:
+            return
+        index = get_index()
+        by_key = {index.key(p.keyword): p for p in planned}
+        for p in planned:
+            representative = by_key.get(index.key(self.representatives.get(index.key(p.keyword), "")))
+            if representative is None or representative is p:
+                continue
+            if p.air_time is not None and (representative.air_time is None or p.air_time < representative.air_time):
+                representative.air_time = p.air_time
+            representative.max_age = min(representative.max_age, p.max_age)
+            p.max_age = p.max_age * config.CLUSTER_MEMBER_AGE_FACTOR
+            p.representative = representative.keyword
+
+    def batches(self, plan: list[PlannedKeyword]) -> list[list[PlannedKeyword]]:
+        """Due keywords in plan order, in request-sized batches."""
+        due = [p for p in plan if p.due]
+        size = config.MAX_KEYWORDS_PER_REQUEST
+        return [due[i : i + size] for i in range(0, len(due), size)]
+
+    def record(self, planned: PlannedKeyword, metrics, data_status: str | None) -> bool:
+        """Append a metrics snapshot to every upcoming episode of a keyword; whether it was recorded.
+
+        Only freshly fetched data is recorded: a snapshot of stale cache (offline,
+        or after a 429 in best-effort mode) would mark the keyword refreshed.
+        """
+        if (data_status or "fresh") != "fresh":
+            return False
+        snapshot = {
+            "taken_at": self.now.isoformat(timespec="seconds"),
+            "keyword": planned.keyword,
+            "data_status": data_status or "fresh",
+            "metrics": asdict(metrics),
+        }
+        for episode in planned.episodes:
+            self.store.append(episode, snapshot)
+        return True
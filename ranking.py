@@ -0,0 +1,87 @@
+"""
+Ranking module: Opportunity ranking over a whole table of keyword metrics.
+
+A metrics table is a DataFrame with one row per keyword and KeywordMetrics
+fields as columns: a run's metrics via metrics_table(), or the latest snapshot
+of every keyword in the history store via MetricsStore.latest(). rank() scores
+the whole table in one vectorized pass under a weight profile
+(config.WEIGHT_PROFILES, or one fitted by tuning.py) and keeps the best k with
+a heap, so re-ranking the tracked universe under another profile needs no
+fetches.
+
+    table = MetricsStore().latest()
+    rank(table, "geopolitics", k=25)
+"""
+
+import heapq
+import json
+from dataclasses import fields
+
+import numpy as np
+import pandas as pd
+
+import config
+from analyzer import KeywordMetrics, opportunity_score
+
+
+def metrics_table(metrics: dict[str, KeywordMetrics]) -> pd.DataFrame:
+    """One row per keyword (the dict's keys), KeywordMetrics fields as columns."""
+    columns = {f.name: [getattr(m, f.name) for m in metrics.values()] for f in fields(KeywordMetrics)}
+    columns["keyword"] = list(metrics)
+    return pd.DataFrame(columns)
+
+
+def load_profile(name: str) -> dict:
+    """A tuned profile from config.PROFILES_DIR ({"opportunity": {...}, "similarity": {...}})."""
+    path = config.PROFILES_DIR / f"{name}.json"
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        known = list(config.WEIGHT_PROFILES) + sorted(p.stem for p in config.PROFILES_DIR.glob("*.json"))
+        raise ValueError(f"Unknown weight profile '{name}' (known: {', '.join(known)})") from None
+
+
+def get_profile(name: str) -> dict[str, float]:
+    """Opportunity weights of a built-in (config.WEIGHT_PROFILES) or tuned profile."""
+    if name in config.WEIGHT_PROFILES:
+        return config.WEIGHT_PROFILES[name]
+    return load_profile(name).get("opportunity") or config.OPPORTUNITY_WEIGHTS
+
+
+def get_similarity_weights(name: str) -> dict[str, float]:
+    """Similarity weights of a tuned profile; built-in profiles use SIMILARITY_WEIGHTS."""
+    if name in config.WEIGHT_PROFILES:
+        return config.SIMILARITY_WEIGHTS
+    return load_profile(name).get("similarity") or config.SIMILARITY_WEIGHTS
+
+
+def top_k(scores: np.ndarray, k: int) -> list[int]:
+    """Row positions of the k highest scores, best first (ties keep table order)."""
+    return heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
+
+
+def rank(
+    table: pd.DataFrame,
+    profile: str = "default",
+    k: int = config.RANK_TOP_K,
+    min_score: float | None = None,
+) -> pd.DataFrame:
+    """The k best rows of a metrics table, with opportunity_score, rank and calibrated columns.
+
+    calibrated marks rows scored on the global interest scale; their scores
+    are not comparable with those of uncalibrated rows (see
+    analyzer.opportunity_components).
+    """
+    scores = np.broadcast_to(np.asarray(opportunity_score(table, get_profile(profile)), dtype=float), (len(table),))
+    if min_score is not None:
+        scores = np.where(scores >= min_score, scores, -np.inf)
+        k = min(k, int(np.isfinite(scores).sum()))
+
+    best = top_k(scores, k)
+    ranked = table.iloc[best].reset_index(drop=True)
+    ranked["opportunity_score"] = scores[best]
+    ranked["rank"] = np.arange(1, len(best) + 1)
+    global_interest = ranked["global_interest"] if "global_interest" in ranked else pd.Series(0.0, index=ranked.index)
+    ranked["calibrated"] = global_interest.fillna(0).to_numpy() > 0
+    return ranked
@@ -0,0 +1,308 @@
+"""
+Realtime module: Short-interval polling of a watch list with rolling storage.
+
+Polls `now ...` interest and realtime trending searches, appends new points to
+a per-series ring buffer (bounded by point count and age), and feeds them to
+the streaming spike detector so events are emitted as soon as a point lands.
+"""
+
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+
+import pandas as pd
+
+import config
+from detector import DetectorEvent, SpikeMonitor
+from fetcher import CachedFetcher, RateLimitError
+from normalize import get_index
+from stitcher import StitchError, estimate_scale
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpikeEvent:
+    """A breaking signal for a watched keyword."""
+    keyword: str
+    kind: str  # "spike" (onset), "decay" (spike ended) or "trending" (in realtime trending searches)
+    timeframe: str
+    timestamp: str  # Time of the data point (or poll time for "trending")
+    value: float
+    baseline: float
+    zscore: float
+    magnitude: float = 0.0
+    detail: str = ""
+
+    @classmethod
+    def from_detector(cls, event: DetectorEvent, timeframe: str) -> "SpikeEvent":
+        """Convert a detector lifecycle event."""
+        detail = ""
+        if event.kind == "end":
+            detail = f"duration={event.duration_points} pts, decay={event.decay_points} pts"
+        return cls(
+            keyword=event.keyword,
+            kind="spike" if event.kind == "onset" else "decay",
+            timeframe=timeframe,
+            timestamp=event.timestamp.isoformat(),
+            value=event.value,
+            baseline=event.baseline,
+            zscore=event.zscore,
+            magnitude=event.magnitude,
+            detail=detail,
+        )
+
+
+class RingBufferStore:
+    """Rolling per-series storage bounded by point count and age.
+
+    Each series holds (timestamp, value) points on the scale of its first poll;
+    later polls are rescaled onto it from the overlapping points.
+    """
+
+    def __init__(
+        self,
+        path: Path = config.REALTIME_DIR / "store.json",
+        capacity: int = config.REALTIME_RETENTION_POINTS,
+        retention_hours: float = config.REALTIME_RETENTION_HOURS,
+    ):
+        self.path = Path(path)
+        self.capacity = capacity
+        self.retention = timedelta(hours=retention_hours)
+        self._series: dict[str, deque] = {}
+
+    @staticmethod
+    def key(keyword: str, timeframe: str) -> str:
+        """Series key for a keyword/timeframe pair."""
+        return f"{timeframe}|{keyword}"
+
+    def _buffer(self, key: str) -> deque:
+        if key not in self._series:
+            self._series[key] = deque(maxlen=self.capacity)
+        return self._series[key]
+
+    def series(self, key: str) -> pd.Series:
+        """Return a stored series as a time-indexed pandas Series."""
+        points = self._series.get(key, ())
+        if not points:
+            return pd.Series(dtype=float)
+        timestamps, values = zip(*points)
+        return pd.Series(values, index=pd.DatetimeIndex(timestamps), dtype=float)
+
+    def last_timestamp(self, key: str) -> pd.Timestamp | None:
+        """Timestamp of the newest stored point, if any."""
+        points = self._series.get(key)
+        return points[-1][0] if points else None
+
+    def append(self, key: str, timestamp: pd.Timestamp, value: float) -> bool:
+        """Append a point if it is newer than the last stored one."""
+        buf = self._buffer(key)
+        if buf and timestamp <= buf[-1][0]:
+            return False
+        buf.append((timestamp, float(value)))
+        return True
+
+    def prune(self, now: datetime | None = None) -> int:
+        """Drop points older than the retention window. Returns points dropped."""
+        cutoff = pd.Timestamp(now or datetime.now()) - self.retention
+        dropped = 0
+        for buf in self._series.values():
+            while buf and buf[0][0] < cutoff:
+                buf.popleft()
+                dropped += 1
+        return dropped
+
+    def load(self) -> None:
+        """Load persisted buffers (missing or unreadable files start empty)."""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load realtime store {self.path.name}: {e}")
+            return
+
+        for key, points in data.get("series", {}).items():
+            buf = self._buffer(key)
+            for ts, value in points:
+                buf.append((pd.Timestamp(ts), float(value)))
+
+    def save(self) -> None:
+        """Persist all buffers to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "series": {
+                key: [(ts.isoformat(), value) for ts, value in buf]
+                for key, buf in self._series.items()
+            },
+        }
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+
+
+def load_calendar_watch_list(
+    path: Path = config.LIVE_FEED_CALENDAR,
+    days_ahead: int | None = None,
+    today: date | None = None,
+) -> list[str]:
+    """Primary keywords from the live-feed calendar, optionally only upcoming days."""
+    with open(path) as f:
+        calendar = json.load(f)
+
+    today = today or date.today()
+    keywords = []
+    for day in calendar.get("calendar_days", []):
+        if days_ahead is not None:
+            day_date = date.fromisoformat(day["date"])
+            if not (today <= day_date <= today + timedelta(days=days_ahead)):
+                continue
+        for episode in day.get("episodes", []):
+            kw = episode.get("primary_keyword", "").strip()
+            if kw:
+                keywords.append(kw)
+
+    return get_index().dedupe(keywords)
+
+
+class RealtimeIngestor:
+    """Polls realtime data for a watch list and emits spike events."""
+
+    def __init__(
+        self,
+        fetcher: CachedFetcher,
+        watch_list: list[str],
+        store: Optional[RingBufferStore] = None,
+        timeframes: list[str] = config.REALTIME_TIMEFRAMES,
+        geo: str = config.DEFAULT_GEO,
+        events_path: Path = config.REALTIME_DIR / "events.jsonl",
+        on_event: Optional[Callable[[SpikeEvent], None]] = None,
+    ):
+        self.fetcher = fetcher
+        self.watch_list = watch_list
+        self.store = store or RingBufferStore()
+        self.timeframes = timeframes
+        self.geo = geo
+        self.events_path = Path(events_path)
+        self.on_event = on_event
+        self.monitor = SpikeMonitor(state_dir=self.store.path.parent)
+        self._seen_trending: set[tuple[str, str]] = set()
+
+    def _emit(self, event: SpikeEvent) -> None:
+        """Log, persist and forward an event."""
+        logger.warning(
+            f"{event.kind.upper()}: {event.keyword} [{event.timeframe}] "
+            f"value={event.value:.1f} baseline={event.baseline:.1f} z={event.zscore:.1f} {event.detail}"
+        )
+        self.events_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.events_path, "a") as f:
+            f.write(json.dumps(asdict(event)) + "\n")
+        if self.on_event:
+            self.on_event(event)
+
+    def _ingest_frame(self, df: pd.DataFrame, keywords: list[str], timeframe: str) -> list[SpikeEvent]:
+        """Rescale a polled window onto stored scale and append its new points."""
+        if "isPartial" in df.columns:
+            # The partial bucket keeps changing until it closes; wait for it.
+            df = df[~df["isPartial"].astype(bool)]
+        df = df.drop(columns=["isPartial"], errors="ignore")
+
+        events = []
+        bank = self.monitor.bank(timeframe, self.geo)
+        for keyword in keywords:
+            if keyword not in df.columns:
+                continue
+            key = self.store.key(keyword, timeframe)
+            polled = df[[keyword]].astype(float)
+
+            stored = self.store.series(key)
+            if not stored.empty:
+                try:
+                    ratio, _ = estimate_scale(stored.to_frame(keyword), polled)
+                    polled = polled * ratio
+                except StitchError:
+                    logger.info(f"No overlap with stored {key}; appending on the polled scale")
+
+            appended = [ts for ts, value in polled[keyword].items() if self.store.append(key, ts, value)]
+            for event in bank.update_frame(polled.loc[appended], rescale=False):
+                events.append(SpikeEvent.from_detector(event, timeframe))
+
+        return events
+
+    def _check_trending(self) -> list[SpikeEvent]:
+        """Flag watched keywords that show up in realtime trending searches."""
+        trending = self.fetcher.realtime_search_trends(geo=self.geo)
+        if trending.empty:
+            return []
+
+        events = []
+        now = datetime.now().isoformat(timespec="seconds")
+        for _, row in trending.iterrows():
+            title = str(row.get("title", ""))
+            entities = row.get("entityNames") or []
+            haystack = " ".join([title, *map(str, entities)]).lower()
+
+            for keyword in self.watch_list:
+                if keyword.lower() in haystack and (keyword, title) not in self._seen_trending:
+                    self._seen_trending.add((keyword, title))
+                    events.append(SpikeEvent(
+                        keyword=keyword,
+                        kind="trending",
+                        timeframe="realtime",
+                        timestamp=now,
+                        value=0.0,
+                        baseline=0.0,
+                        zscore=0.0,
+                        detail=title,
+                    ))
+        return events
+
+    def poll_once(self) -> list[SpikeEvent]:
+        """Run one polling cycle. Rate-limited batches are skipped until next cycle."""
+        events = []
+        batch_size = config.MAX_KEYWORDS_PER_REQUEST
+
+        try:
+            events.extend(self._check_trending())
+        except RateLimitError as e:
+            logger.warning(f"Realtime trends rate limited, skipping this cycle: {e}")
+        except Exception as e:
+            logger.warning(f"Failed to fetch realtime trends: {e}")
+
+        for timeframe in self.timeframes:
+            for i in range(0, len(self.watch_list), batch_size):
+                batch = self.watch_list[i : i + batch_size]
+                try:
+                    df = self.fetcher.interest_over_time(batch, timeframe=timeframe, geo=self.geo)
+                except RateLimitError as e:
+                    logger.warning(f"Rate limited on {batch} [{timeframe}], retrying next cycle: {e}")
+                    continue
+                events.extend(self._ingest_frame(df, batch, timeframe))
+
+        self.store.prune()
+        self.store.save()
+        self.monitor.save()
+
+        for event in events:
+            self._emit(event)
+        return events
+
+    def run(self, interval: float = config.REALTIME_POLL_SECONDS, iterations: int | None = None) -> None:
+        """Poll until interrupted (or for a fixed number of cycles)."""
+        self.store.load()
+        cycle = 0
+        while iterations is None or cycle < iterations:
+            started = time.time()
+            events = self.poll_once()
+            cycle += 1
+            logger.info(f"Realtime cycle {cycle}: {len(events)} events")
+
+            if iterations is not None and cycle >= iterations:
+                break
+            time.sleep(max(0.0, interval - (time.time() - started)))
@@ -8,12 +8,10 @@ from pathlib import Path
 from typing import Optional
 
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 
 import config
 from analyzer import KeywordMetrics, ComparisonScore
+from instrument import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -105,6 +103,22 @@ class HTMLReporter:
                     background-color: #ffcccc;
                     color: #b71c1c;
                 }}
+                .status {{
+                    font-size: 12px;
+                    padding: 2px 6px;
+                    border-radius: 4px;
+                }}
+                .status.fresh {{
+                    background-color: #c8e6c9;
+                    color: #1b5e20;
+                }}
+                .status.stale {{
+                    background-color: #fff9c4;
+                    color: #f57f17;
+                }}
+                .data-missing {{
+                    color: #b71c1c;
+                }}
                 .metric {{
                     display: inline-block;
                     padding: 8px 12px;
@@ -142,8 +156,13 @@ class HTMLReporter:
         regions_df: pd.DataFrame,
         metrics: dict[str, KeywordMetrics],
         scores: Optional[dict[str, ComparisonScore]] = None,
+        data_status: Optional[dict[str, str]] = None,
     ) -> Path:
-        """Generate comprehensive research report comparing keywords."""
+        """Generate comprehensive research report comparing keywords.
+
+        data_status (keyword -> fresh/stale/missing) adds a data column to the
+        summary and lists keywords that have no data at all.
+        """
 
         timestamp = self._generate_timestamp()
         filename = f"research_{timestamp}.html"
@@ -155,7 +174,14 @@ class HTMLReporter:
 
         # Summary table
         html_parts.append("<h2>Summary</h2>")
-        html_parts.append(self._generate_summary_table(keywords, metrics, scores))
+        html_parts.append(self._generate_summary_table(keywords, metrics, scores, data_status))
+        if data_status:
+            html_parts.append(self._generate_missing_notice(keywords, data_status))
+
+        # Why each similarity score is what it is
+        if scores:
+            html_parts.append("<h2>Score Breakdown</h2>")
+            html_parts.append(self._generate_breakdown_table(keywords, scores))
 
         # Interest over time chart
         html_parts.append("<h2>Interest Over Time</h2>")
@@ -174,17 +200,131 @@ class HTMLReporter:
 
         html_parts.append(self._generate_html_footer())
 
-        with open(filepath, "w") as f:
-            f.write("\n".join(html_parts))
+        with tracer.span("html_write"):
+            with open(filepath, "w") as f:
+                f.write("\n".join(html_parts))
 
         logger.info(f"Report generated: {filepath}")
         return filepath
 
+    def generate_timeframe_report(
+        self,
+        keywords: list[str],
+        results: dict[str, tuple[dict[str, KeywordMetrics], pd.DataFrame]],
+        data_status: Optional[dict[str, str]] = None,
+    ) -> Path:
+        """Generate a report comparing keywords across timeframes side by side.
+
+        results maps each timeframe to its (metrics, interest_df).
+        """
+        return self._generate_side_by_side_report(
+            f"Google Trends Across Timeframes: {', '.join(keywords)}", "timeframes", keywords, results, data_status
+        )
+
+    def generate_matrix_report(
+        self,
+        keywords: list[str],
+        results: dict[str, tuple[dict[str, KeywordMetrics], pd.DataFrame]],
+        scores: Optional[dict[str, dict[str, ComparisonScore]]] = None,
+        data_status: Optional[dict[str, str]] = None,
+    ) -> Path:
+        """Generate a report comparing keywords across properties/categories side by side.
+
+        results maps each cell label (e.g. "youtube / News") to its (metrics, interest_df);
+        scores, if given, holds each cell's similarity scores.
+        """
+        return self._generate_side_by_side_report(
+            f"Google Trends by Property: {', '.join(keywords)}", "matrix", keywords, results, data_status, scores
+        )
+
+    def _generate_side_by_side_report(
+        self,
+        title: str,
+        prefix: str,
+        keywords: list[str],
+        results: dict[str, tuple[dict[str, KeywordMetrics], pd.DataFrame]],
+        data_status: Optional[dict[str, str]] = None,
+        scores: Optional[dict[str, dict[str, ComparisonScore]]] = None,
+    ) -> Path:
+        """One summary table with a column group per result, then one chart per result."""
+
+        timestamp = self._generate_timestamp()
+        filepath = self.output_dir / f"{prefix}_{timestamp}.html"
+
+        html_parts = [self._generate_html_header(title)]
+
+        html_parts.append("<h2>Summary</h2>")
+        html_parts.append(self._generate_side_by_side_table(keywords, results, scores))
+        if data_status:
+            html_parts.append(self._generate_missing_notice(keywords, data_status))
+
+        for i, (label, (_, interest_df)) in enumerate(results.items()):
+            if not interest_df.empty:
+                html_parts.append(
+                    self._generate_interest_chart(
+                        interest_df, keywords, title=f"Interest Over Time ({label})", div_id=f"interest_chart_{i}"
+                    )
+                )
+
+        html_parts.append(self._generate_html_footer())
+
+        with tracer.span("html_write"):
+            with open(filepath, "w") as f:
+                f.write("\n".join(html_parts))
+
+        logger.info(f"Report generated: {filepath}")
+        return filepath
+
+    def _generate_side_by_side_table(
+        self,
+        keywords: list[str],
+        results: dict[str, tuple[dict[str, KeywordMetrics], pd.DataFrame]],
+        scores: Optional[dict[str, dict[str, ComparisonScore]]] = None,
+    ) -> str:
+        """Keyword rows with avg interest, momentum, recent peak (and similarity) per result."""
+
+        columns = 4 if scores else 3
+        rows = []
+        for keyword in keywords:
+            cells = []
+            for label, (metrics, _) in results.items():
+                m = metrics.get(keyword)
+                if m is None:
+                    cells.append("<td>—</td>" * columns)
+                    continue
+                peak_class = "high" if m.recent_peak else "low"
+                cells.append(
+                    f"<td>{m.avg_interest:.1f}</td>"
+                    f"<td>{m.momentum:+.2f}</td>"
+                    f'<td><span class="score {peak_class}">{"Yes" if m.recent_peak else "No"}</span></td>'
+                )
+                if scores:
+                    score = scores.get(label, {}).get(keyword)
+                    cells.append(f"<td>{score.similarity_score:.1f}</td>" if score else "<td>—</td>")
+            rows.append(f"<tr><td><strong>{keyword}</strong></td>{''.join(cells)}</tr>")
+
+        group_headers = "".join(f'<th colspan="{columns}">{label}</th>' for label in results)
+        column_headers = (
+            "<th>Avg</th><th>Momentum</th><th>Recent Peak</th>" + ("<th>Similarity</th>" if scores else "")
+        ) * len(results)
+        return f"""
+        <table class="summary-table">
+            <thead>
+                <tr><th rowspan="2">Keyword</th>{group_headers}</tr>
+                <tr>{column_headers}</tr>
+            </thead>
+            <tbody>
+                {"".join(rows)}
+            </tbody>
+        </table>
+        """
+
     def _generate_summary_table(
         self,
         keywords: list[str],
         metrics: dict[str, KeywordMetrics],
         scores: Optional[dict[str, ComparisonScore]] = None,
+        data_status: Optional[dict[str, str]] = None,
     ) -> str:
         """Generate summary table HTML."""
 
@@ -203,6 +343,11 @@ class HTMLReporter:
             else:
                 score_html = "—"
 
+            status_cell = ""
+            if data_status is not None:
+                status = data_status.get(keyword, "fresh")
+                status_cell = f'<td><span class="status {status}">{status}</span></td>'
+
             rows.append(f"""
             <tr>
                 <td><strong>{keyword}</strong></td>
@@ -212,6 +357,7 @@ class HTMLReporter:
                 <td>{m.related_queries_count}</td>
                 <td>{m.rising_queries_count}</td>
                 <td>{score_html}</td>
+                {status_cell}
             </tr>
             """)
 
@@ -226,6 +372,7 @@ class HTMLReporter:
                     <th>Related Queries</th>
                     <th>Rising Queries</th>
                     <th>Similarity Score</th>
+                    {"<th>Data</th>" if data_status is not None else ""}
                 </tr>
             </thead>
             <tbody>
@@ -235,8 +382,66 @@ class HTMLReporter:
         """
         return table
 
-    def _generate_interest_chart(self, interest_df: pd.DataFrame, keywords: list[str]) -> str:
+    def _generate_breakdown_table(self, keywords: list[str], scores: dict[str, ComparisonScore]) -> str:
+        """Component scores (0-100), demand ratio and rank range behind each similarity score."""
+        rows = []
+        for keyword in keywords:
+            if keyword not in scores:
+                continue
+            score = scores[keyword]
+            rank = (
+                f"{score.similarity_rank} ({score.similarity_rank_best}–{score.similarity_rank_worst})"
+                if score.similarity_rank
+                else "—"
+            )
+            rows.append(f"""
+            <tr>
+                <td><strong>{keyword}</strong></td>
+                <td>{score.interest_score:.1f}</td>
+                <td>{score.momentum_score:.1f}</td>
+                <td>{score.breadth_score:.1f}</td>
+                <td>×{score.demand_ratio:.2f}</td>
+                <td>{score.similarity_score:.1f}</td>
+                <td>{rank}</td>
+            </tr>
+            """)
+
+        return f"""
+        <table class="summary-table">
+            <thead>
+                <tr>
+                    <th>Keyword</th>
+                    <th>Interest</th>
+                    <th>Momentum</th>
+                    <th>Breadth</th>
+                    <th>Demand Ratio</th>
+                    <th>Similarity Score</th>
+                    <th>Rank (range, weights ±{config.SENSITIVITY_SPREAD:.0%})</th>
+                </tr>
+            </thead>
+            <tbody>
+                {"".join(rows)}
+            </tbody>
+        </table>
+        """
+
+    def _generate_missing_notice(self, keywords: list[str], data_status: dict[str, str]) -> str:
+        """List keywords with no data (failed batches or not cached offline)."""
+        missing = [kw for kw in keywords if data_status.get(kw) == "missing"]
+        if not missing:
+            return ""
+        return f'<p class="data-missing">No data for: {", ".join(missing)}</p>'
+
+    @tracer.traced("figure_build", chart="interest")
+    def _generate_interest_chart(
+        self,
+        interest_df: pd.DataFrame,
+        keywords: list[str],
+        title: str = "Interest Over Time",
+        div_id: str = "interest_chart",
+    ) -> str:
         """Generate interest over time Plotly chart."""
+        import plotly.graph_objects as go  # Deferred: plotly is only needed when rendering
 
         fig = go.Figure()
 
@@ -253,7 +458,7 @@ class HTMLReporter:
                 )
 
         fig.update_layout(
-            title="Interest Over Time",
+            title=title,
             xaxis_title="Date",
             yaxis_title="Search Interest (0-100)",
             hovermode="x unified",
@@ -261,7 +466,7 @@ class HTMLReporter:
             template="plotly_white",
         )
 
-        return f'<div class="chart-container">{fig.to_html(include_plotlyjs=False, div_id="interest_chart")}</div>'
+        return f'<div class="chart-container">{fig.to_html(include_plotlyjs=False, div_id=div_id)}</div>'
 
     def _generate_metrics_section(self, metrics: KeywordMetrics) -> str:
         """Generate detailed metrics section for a keyword."""
@@ -269,12 +474,16 @@ class HTMLReporter:
         return f"""
         <div style="padding: 15px; background: #f9f9f9; border-radius: 4px;">
             <div class="metric">Avg Interest: {metrics.avg_interest:.1f}</div>
+            {f'<div class="metric">Global Interest: {metrics.global_interest:.3g}</div>' if metrics.global_interest else ''}
             <div class="metric">Max Interest: {metrics.max_interest:.0f}</div>
             <div class="metric">Volatility: {metrics.volatility:.2f}</div>
             <div class="metric">Momentum: {metrics.momentum:.2f}x</div>
+            {f'<div class="metric">Next Week: {metrics.forecast_interest:.1f} ({metrics.forecast_low:.1f}-{metrics.forecast_high:.1f}), {metrics.forecast_change:+.0%}, {metrics.forecast_prob_higher:.0%} chance higher</div>' if metrics.forecast_model else ''}
             <div class="metric">Related Queries: {metrics.related_queries_count}</div>
             <div class="metric">Rising Queries: {metrics.rising_queries_count}</div>
             <div class="metric">Breakout Queries: {metrics.breakout_queries_count}</div>
+            <div class="metric">Related Topics: {metrics.topic_breadth}</div>
+            <div class="metric">Breakout Topics: {metrics.topic_breakout_count}</div>
             <div class="metric">Recent Peak: {'Yes' if metrics.recent_peak else 'No'}</div>
         </div>
         """
@@ -288,21 +497,27 @@ class HTMLReporter:
                 df = regions_df[[keyword]].reset_index()
                 df.columns = ["region", "interest"]
 
-                fig = px.choropleth(
-                    df,
-                    locations="region",
-                    locationmode="country names",
-                    color="interest",
-                    hover_name="region",
-                    color_continuous_scale="Blues",
-                    title=f"Regional Interest: {keyword}",
-                )
+                with tracer.span("figure_build", chart="region"):
+                    return self._build_region_map(df, keyword)
+
+        return "<p>Regional heatmap unavailable for multi-keyword comparison.</p>"
 
-                fig.update_layout(height=600, template="plotly_white")
+    def _build_region_map(self, df: pd.DataFrame, keyword: str) -> str:
+        """Untraced choropleth body of _generate_region_heatmap."""
+        import plotly.express as px
+        fig = px.choropleth(
+            df,
+            locations="region",
+            locationmode="country names",
+            color="interest",
+            hover_name="region",
+            color_continuous_scale="Blues",
+            title=f"Regional Interest: {keyword}",
+        )
 
-                return f'<div class="chart-container">{fig.to_html(include_plotlyjs=False, div_id="region_chart")}</div>'
+        fig.update_layout(height=600, template="plotly_white")
 
-        return "<p>Regional heatmap unavailable for multi-keyword comparison.</p>"
+        return f'<div class="chart-container">{fig.to_html(include_plotlyjs=False, div_id="region_chart")}</div>'
 
     def export_csv(
         self,
@@ -335,8 +550,9 @@ class HTMLReporter:
         keyword: str,
         metrics: KeywordMetrics,
         output_dir: Path = config.DATA_DIR,
+        data_status: Optional[str] = None,
     ) -> Path:
-        """Export metrics to JSON."""
+        """Export metrics to JSON (with the keyword's data status, if known)."""
 
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -357,7 +573,23 @@ class HTMLReporter:
             "related_queries": metrics.related_queries_count,
             "rising_queries": metrics.rising_queries_count,
             "recent_peak": metrics.recent_peak,
+            "entity_mid": metrics.entity_mid,
+            "related_topics": metrics.topic_breadth,
+            "breakout_topics": metrics.topic_breakout_count,
+            "global_interest": metrics.global_interest,
+            "forecast": {
+                "model": metrics.forecast_model,
+                "interest": metrics.forecast_interest,
+                "low": metrics.forecast_low,
+                "high": metrics.forecast_high,
+                "change": metrics.forecast_change,
+                "prob_higher": metrics.forecast_prob_higher,
+            }
+            if metrics.forecast_model
+            else None,
         }
+        if data_status:
+            data["data_status"] = data_status
 
         with open(json_file, "w") as f:
             json.dump(data, f, indent=2)
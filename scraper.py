@@ -4,18 +4,24 @@ Google Trends Scraper CLI - Research comparable keywords at Epstein Files scale.
 Find keywords with similar search patterns, momentum, and related-query breadth.
 """
 
+from __future__ import annotations
+
 import argparse
 import logging
 import sys
 import webbrowser
+from datetime import date
 from pathlib import Path
-
-import pandas as pd
+from typing import TYPE_CHECKING
 
 import config
-from fetcher import CachedFetcher, FetcherError, RateLimitError
-from analyzer import KeywordAnalyzer, KeywordMetrics
-from reporter import HTMLReporter
+from instrument import serve_metrics, tracer
+from normalize import get_index
+
+# Heavy modules (pandas, pytrends, tenacity, plotly) are imported inside the
+# command that needs them, so --help and fully cached runs start fast.
+if TYPE_CHECKING:
+    from fetcher import CachedFetcher
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,8 +31,11 @@ logger = logging.getLogger(__name__)
 
 
 def parse_keywords(keywords_str: str) -> list[str]:
-    """Parse comma-separated keywords."""
-    return [kw.strip() for kw in keywords_str.split(",") if kw.strip()]
+    """Parse comma-separated keywords, collapsing near-duplicates and known same-entity keywords."""
+    from entities import get_entity_index
+
+    get_entity_index()  # Registers entity aliases with the keyword index
+    return get_index().dedupe([kw.strip() for kw in keywords_str.split(",") if kw.strip()])
 
 
 def fetch_data_for_keywords(
@@ -35,66 +44,374 @@ def fetch_data_for_keywords(
     timeframe: str,
     geo: str,
     batch_size: int = config.MAX_KEYWORDS_PER_REQUEST,
+    best_effort: bool = False,
+    cat: int = config.DEFAULT_CATEGORY,
+    gprop: str = "",
+    incremental: bool = False,
+    calibrate: bool = False,
+    journal=None,
 ):
-    """Fetch data for keywords, batching to respect pytrends limits."""
+    """Fetch data for keywords, batching to respect pytrends limits.
+
+    With best_effort, a failed batch is skipped (its keywords are marked
+    missing in fetcher.data_status, and for this timeframe/geo/scope alone in
+    fetcher.status) instead of aborting the run, and after a rate limit the
+    remaining batches are served from cache, stale or not.
+
+    Related topics share each batch's payload with interest and related
+    queries; they resolve keywords to entities, and keywords already known to
+    be one entity are collapsed before fetching.
+
+    With incremental, stale weekly web-search windows are refreshed by
+    splicing on a short recent tail (stitcher.TailRefresher), keeping their
+    cached related queries and topics. With calibrate, each batch is bridged
+    to the anchor ladder and metrics get global_interest.
+    Every fetched series is forecast over the next week (forecast.py), all at
+    once, from state cached by earlier runs.
+
+    With a journal (journal.JobJournal), batches are recorded as planned, done
+    or failed as they go; batches a resumed job already finished are rebuilt
+    from cache instead of fetched.
+    """
+    import pandas as pd
+
+    from analyzer import KeywordAnalyzer
+    from entities import entity_metrics, get_entity_index
+    from fetcher import CacheMissError, FetcherError, RateLimitError, scope_suffix
+    from forecast import ForecastEngine, apply_forecast
+
+    entity_index = get_entity_index()  # Loads known entity aliases into the keyword index
+    if incremental and cat == config.DEFAULT_CATEGORY and not gprop:
+        from stitcher import TailRefresher
+
+        refresher = TailRefresher(fetcher)
+    else:
+        refresher = None
+    if calibrate and cat == config.DEFAULT_CATEGORY and not gprop:
+        from calibration import Calibrator
+
+        calibrator = Calibrator(fetcher)
+    else:
+        calibrator = None
+    global_interest = {}
 
+    def fetch_batch(batch):
+        if refresher:
+            interest_df, spliced = refresher.refresh(batch, timeframe=timeframe, geo=geo)
+        else:
+            interest_df = fetcher.interest_over_time(batch, timeframe=timeframe, geo=geo, cat=cat, gprop=gprop)
+            spliced = False
+        # A spliced window keeps its cached related data rather than building the full window's payload
+        related = fetcher.cached_related("related_queries", batch, timeframe, geo) if spliced else None
+        if related is None:
+            related = fetcher.related_queries(batch, timeframe=timeframe, geo=geo, cat=cat, gprop=gprop)
+        try:
+            topics = fetcher.cached_related("related_topics", batch, timeframe, geo) if spliced else None
+            if topics is None:
+                topics = fetcher.related_topics(batch, timeframe=timeframe, geo=geo, cat=cat, gprop=gprop)
+        except RateLimitError:
+            raise
+        except Exception as e:
+            # Topics only refine metrics; a keyword without them still gets a row
+            logger.warning(f"Related topics unavailable for {batch}: {e}")
+            topics = {}
+        return interest_df, related, topics
+
+    keywords = get_index().dedupe(keywords)
     all_metrics = {}
     all_interest = pd.DataFrame()
     all_regions = pd.DataFrame()
     all_related = {}
+    all_topics = {}
 
     # Process keywords in batches (pytrends max 5 per request)
-    for i in range(0, len(keywords), batch_size):
-        batch = keywords[i : i + batch_size]
-        logger.info(f"Processing batch {i // batch_size + 1}: {batch}")
+    scope = (timeframe, geo, scope_suffix(cat, gprop))  # data_status is per keyword; failures are per scope
+    batches = [keywords[i : i + batch_size] for i in range(0, len(keywords), batch_size)]
+    keys = journal.plan(batches, *scope) if journal else [None] * len(batches)
+    for number, (batch, key) in enumerate(zip(batches, keys), 1):
+        replay = journal is not None and journal.is_done(key)
+        logger.info(f"Processing batch {number}: {batch}{' (done in an earlier run; from cache)' if replay else ''}")
 
         try:
             # Fetch data for this batch
-            interest_df = fetcher.interest_over_time(batch, timeframe=timeframe, geo=geo)
-            related = fetcher.related_queries(batch, timeframe=timeframe, geo=geo)
-
-            # Concatenate with overall dataframes
-            for col in interest_df.columns:
-                if col not in ["isPartial"]:
-                    all_interest[col] = interest_df[col]
-
-            for kw in batch:
-                if kw in related:
-                    all_related[kw] = related[kw]
-
-            # Try regional data (only for single keyword)
-            if len(batch) == 1:
+            if replay:
                 try:
-                    regions_df = fetcher.interest_by_region(
-                        batch, timeframe=timeframe, geo=geo
-                    )
-                    for col in regions_df.columns:
-                        if col != "isPartial":
-                            all_regions[col] = regions_df[col]
-                except Exception as e:
-                    logger.warning(f"Failed to fetch regional data: {e}")
+                    with fetcher.cache_only():
+                        interest_df, related, topics = fetch_batch(batch)
+                except CacheMissError as e:
+                    logger.warning(f"Batch {batch} is no longer cached ({e}); fetching it again")
+                    replay = False
+                    interest_df, related, topics = fetch_batch(batch)
+            else:
+                interest_df, related, topics = fetch_batch(batch)
 
         except RateLimitError as e:
-            logger.error(f"Rate limited: {e}")
-            logger.error("Try again in a few minutes or use cached data.")
-            raise
+            if journal:
+                journal.mark_failed(key, e)
+            if not best_effort:
+                logger.error(f"Rate limited: {e}")
+                logger.error("Try again in a few minutes or use cached data.")
+                raise
+
+            logger.warning(f"Rate limited: {e}. Serving the rest of the run from cache.")
+            fetcher.offline = True
+            try:
+                interest_df, related, topics = fetch_batch(batch)
+            except FetcherError as e:
+                logger.warning(f"Skipping batch {batch}: {e}")
+                fetcher.mark_status(batch, "missing", scope)
+                continue
+
         except Exception as e:
-            logger.error(f"Error fetching data for {batch}: {e}")
-            raise
+            if journal:
+                journal.mark_failed(key, e)
+            if not best_effort:
+                logger.error(f"Error fetching data for {batch}: {e}")
+                raise
+
+            logger.warning(f"Skipping batch {batch}: {e}")
+            fetcher.mark_status(batch, "missing", scope)
+            continue
+
+        # Concatenate with overall dataframes
+        for col in interest_df.columns:
+            if col not in ["isPartial"]:
+                all_interest[col] = interest_df[col]
+
+        for kw in batch:
+            if kw in related:
+                all_related[kw] = related[kw]
+            if kw in topics:
+                all_topics[kw] = topics[kw]
+        entity_index.ingest({kw: all_topics[kw] for kw in batch if kw in all_topics})
+
+        if calibrator:
+            present = [kw for kw in batch if kw in interest_df.columns]
+            try:
+                with fetcher.cache_only(replay):
+                    global_interest.update(
+                        calibrator.calibrate(
+                            interest_df, present, timeframe, geo, estimate=history_estimate(present, timeframe, geo)
+                        )
+                    )
+            except Exception as e:
+                # Uncalibrated keywords keep their batch-relative scores
+                logger.warning(f"Could not calibrate {present}: {e}")
+
+        # Try regional data (only for single keyword)
+        if len(batch) == 1:
+            try:
+                with fetcher.cache_only(replay):
+                    regions_df = fetcher.interest_by_region(
+                        batch, timeframe=timeframe, geo=geo, cat=cat, gprop=gprop
+                    )
+                for col in regions_df.columns:
+                    if col != "isPartial":
+                        all_regions[col] = regions_df[col]
+            except Exception as e:
+                logger.warning(f"Failed to fetch regional data: {e}")
+
+        # Batches served from cache after a rate limit (or --offline) are left for a resume to fetch
+        if journal and not replay and not fetcher.offline:
+            journal.mark_done(key)
+
+    # Forecast every fetched series in one batch
+    forecasts = {}
+    try:
+        engine = ForecastEngine()
+        with tracer.span("forecast"):
+            forecasts = engine.forecast_frame(all_interest, timeframe, geo, scope_suffix(cat, gprop))
+        engine.save()
+    except Exception as e:
+        # Metrics without a forecast score it as flat
+        logger.warning(f"Forecasting failed: {e}")
 
     # Extract metrics for each keyword
     for keyword in keywords:
+        if fetcher.status(*scope).get(keyword) == "missing":
+            continue
         try:
-            metrics = KeywordAnalyzer().extract_metrics(keyword, all_interest, all_related)
+            entity = entity_index.get(keyword)
+            metrics = KeywordAnalyzer().extract_metrics(
+                keyword, all_interest, all_related, all_topics, entity_mid=entity.mid if entity else ""
+            )
+            metrics.global_interest = global_interest.get(keyword, 0.0)
+            if keyword in forecasts:
+                apply_forecast(metrics, forecasts[keyword])
             all_metrics[keyword] = metrics
         except Exception as e:
             logger.error(f"Failed to extract metrics for {keyword}: {e}")
 
+    # Keywords fetched before they were known to share an entity count its topics once
+    for entity in entity_metrics(all_metrics, all_topics, entity_index).values():
+        if len(entity.keywords) > 1:
+            logger.info(
+                f"Entity {entity.title}: {', '.join(entity.keywords)} "
+                f"({entity.topic_breadth} related entities, {entity.topic_breakout_count} breakouts)"
+            )
+            for keyword in entity.keywords:
+                all_metrics[keyword].topic_breadth = entity.topic_breadth
+                all_metrics[keyword].topic_breakout_count = entity.topic_breakout_count
+
     return all_metrics, all_interest, all_regions
 
 
+def fetch_data_for_timeframes(
+    fetcher: CachedFetcher,
+    keywords: list[str],
+    timeframes: list[str],
+    geo: str,
+    batch_size: int = config.MAX_KEYWORDS_PER_REQUEST,
+    best_effort: bool = False,
+    journal=None,
+):
+    """Fetch every timeframe for keywords in one schedule.
+
+    Batches are interleaved (each keyword batch across all timeframes before
+    the next batch), all under the fetcher's one rate budget, so a run cut
+    short still has complete cross-timeframe data for the keywords it reached.
+    Returns {timeframe: (metrics, interest_df, regions_df)}.
+    """
+    import pandas as pd
+
+    keywords = get_index().dedupe(keywords)
+    results = {tf: ({}, pd.DataFrame(), pd.DataFrame()) for tf in timeframes}
+
+    batches = [keywords[i : i + batch_size] for i in range(0, len(keywords), batch_size)]
+    if journal:
+        for timeframe in timeframes:
+            journal.plan(batches, timeframe, geo)
+    for batch in batches:
+        for timeframe in timeframes:
+            logger.info(f"Timeframe {timeframe}: {batch}")
+            metrics, interest_df, regions_df = fetch_data_for_keywords(
+                fetcher, batch, timeframe, geo, batch_size=batch_size, best_effort=best_effort, journal=journal
+            )
+            all_metrics, all_interest, all_regions = results[timeframe]
+            all_metrics.update(metrics)
+            results[timeframe] = (
+                all_metrics,
+                pd.concat([all_interest, interest_df], axis=1),
+                pd.concat([all_regions, regions_df], axis=1),
+            )
+
+    return results
+
+
+def fetch_data_for_matrix(
+    fetcher: CachedFetcher,
+    keywords: list[str],
+    cells: list,
+    timeframe: str,
+    geo: str,
+    batch_size: int = config.MAX_KEYWORDS_PER_REQUEST,
+    best_effort: bool = False,
+    journal=None,
+):
+    """Fetch keywords for every (gprop, category) cell as one job.
+
+    Batches are the same in every cell and interleaved like
+    fetch_data_for_timeframes; the web/all-categories cell shares cache
+    entries with ordinary research runs. Returns {cell: (metrics, interest_df)}.
+    """
+    import pandas as pd
+
+    from fetcher import scope_suffix
+
+    keywords = get_index().dedupe(keywords)
+    results = {cell: ({}, pd.DataFrame()) for cell in cells}
+
+    batches = [keywords[i : i + batch_size] for i in range(0, len(keywords), batch_size)]
+    if journal:
+        for cell in cells:
+            journal.plan(batches, timeframe, geo, scope_suffix(cell.cat, cell.gprop))
+    for batch in batches:
+        for cell in cells:
+            logger.info(f"Cell {cell.label}: {batch}")
+            metrics, interest_df, _ = fetch_data_for_keywords(
+                fetcher, batch, timeframe, geo,
+                batch_size=batch_size, best_effort=best_effort, cat=cell.cat, gprop=cell.gprop, journal=journal,
+            )
+            all_metrics, all_interest = results[cell]
+            all_metrics.update(metrics)
+            results[cell] = (all_metrics, pd.concat([all_interest, interest_df], axis=1))
+
+    return results
+
+
+def history_estimate(keywords: list[str], timeframe: str, geo: str) -> float | None:
+    """Largest previously recorded global interest among keywords, to pick a calibration anchor."""
+    from store import MetricsStore
+
+    store = MetricsStore()
+    estimates = []
+    for keyword in keywords:
+        row = store.at(keyword, geo=geo, timeframe=timeframe)
+        if row is not None and row["global_interest"] > 0:
+            estimates.append(float(row["global_interest"]))
+    return max(estimates, default=None)
+
+
+def record_history(fetcher: CachedFetcher, metrics: dict, timeframe: str, geo: str, scores: dict | None = None) -> None:
+    """Append freshly fetched metrics (and scores) to the history store.
+
+    Keywords served from stale cache are skipped: they are not new observations. The
+    store also skips snapshots identical to a keyword's previous one.
+    """
+    from store import MetricsStore
+
+    status = fetcher.status(timeframe, geo)  # History is web search, all categories
+    fresh = {kw: m for kw, m in metrics.items() if status.get(kw, "fresh") == "fresh"}
+    try:
+        MetricsStore().append(fresh, timeframe, geo, scores=scores, data_status=status)
+    except Exception as e:
+        logger.warning(f"Failed to record metric history: {e}")
+
+
+def log_data_status(fetcher: CachedFetcher, keywords: list[str]) -> None:
+    """Summarize keywords served from stale cache or missing entirely."""
+    for status in ("stale", "missing"):
+        affected = [kw for kw in keywords if fetcher.data_status.get(kw) == status]
+        if affected:
+            logger.warning(f"{len(affected)} keyword(s) {status}: {affected}")
+
+
+def log_explanation(explained, score_column: str, components: list[str], ranks: list[int] | None = None) -> None:
+    """Log each keyword's score as the sum of its component contributions, with its rank range."""
+    logger.info(f"\n=== SCORE BREAKDOWN (weights perturbed ±{config.SENSITIVITY_SPREAD:.0%}) ===\n")
+    for i, row in enumerate(explained.to_dict("records")):
+        parts = " + ".join(f"{name} {row[name]:.1f}" for name in components)
+        penalty = f" (demand penalty -{row['demand_penalty']:.1f})" if row.get("demand_penalty", 0) > 0.05 else ""
+        sensitive = f", most sensitive to {row['sensitive_to']}" if row["sensitive_to"] else ""
+        rank = ranks[i] if ranks else row["rank"]
+        logger.info(
+            f"{row['keyword']}: {row[score_column]:.1f} = {parts}{penalty}; "
+            f"rank {rank} (range {row['rank_best']}-{row['rank_worst']}{sensitive})"
+        )
+
+
+def open_job(args):
+    """The run's job journal: the one --resume names, a new one recording args with --journal, else None."""
+    from journal import JobJournal
+
+    if args.resume:
+        journal = JobJournal.open(args.resume)
+        journal.resume()
+    elif args.journal:
+        journal = JobJournal.create(vars(args))
+        logger.info(f"Job {journal.job_id}; if interrupted, continue it with --resume {journal.job_id}")
+    else:
+        journal = None
+    return journal
+
+
 def cmd_research(args):
     """Research mode: Compare specific keywords."""
+    from analyzer import KeywordAnalyzer
+    from detector import SpikeMonitor
+    from explain import explain_scores
+    from ranking import get_similarity_weights
+    from fetcher import CachedFetcher, RateLimitError
 
     logger.info(f"Research mode: {args.keywords}")
     keywords = parse_keywords(args.keywords)
@@ -110,30 +427,40 @@ def cmd_research(args):
         )
         keywords = keywords[:config.MAX_KEYWORDS_PER_REQUEST]
 
-    fetcher = CachedFetcher()
+    fetcher = CachedFetcher(offline=args.offline)
+    spike_monitor = SpikeMonitor()
+    fetcher.add_listener(spike_monitor.observe)
 
     # Include reference keywords in the fetch so comparison works
     ref_keywords = parse_keywords(args.reference) if args.reference else []
-    all_keywords_to_fetch = list(dict.fromkeys(keywords + ref_keywords))  # dedup, preserve order
+    all_keywords_to_fetch = get_index().dedupe(keywords + ref_keywords)  # dedup, preserve order
     if len(all_keywords_to_fetch) > config.MAX_KEYWORDS_PER_REQUEST:
         logger.warning(
             f"Total keywords ({len(all_keywords_to_fetch)}) exceeds max per request ({config.MAX_KEYWORDS_PER_REQUEST}). "
             f"Reference keywords will be fetched in a separate batch."
         )
 
+    journal = open_job(args)
     try:
         # Fetch data for all keywords including references
         logger.info("Fetching data from Google Trends...")
         metrics, interest_df, regions_df = fetch_data_for_keywords(
-            fetcher, all_keywords_to_fetch, args.timeframe, args.geo
+            fetcher, all_keywords_to_fetch, args.timeframe, args.geo,
+            best_effort=args.best_effort or args.offline,
+            cat=args.category, gprop=config.GPROPS[args.gprop], incremental=args.incremental,
+            calibrate=args.calibrate, journal=journal,
         )
+        if journal:
+            journal.finish()
+        spike_monitor.save()
+        log_data_status(fetcher, all_keywords_to_fetch)
 
         if not metrics:
             logger.error("No data retrieved")
             sys.exit(1)
 
         # Analyze: set reference benchmarks and compare
-        analyzer = KeywordAnalyzer()
+        analyzer = KeywordAnalyzer(similarity_weights=get_similarity_weights(args.profile))
 
         # If reference keywords specified, use them as benchmarks
         if args.reference:
@@ -154,18 +481,28 @@ def cmd_research(args):
                             f"(interest_gap={score.avg_interest_gap:.1f}, "
                             f"momentum_gap={score.momentum_gap:.2f})"
                         )
+
+                explained = explain_scores(scores, analyzer.similarity_weights) if scores else None
+                if args.explain and explained is not None:
+                    log_explanation(explained, "similarity_score", list(analyzer.similarity_weights))
             else:
                 logger.warning("Reference keywords not found in results")
                 scores = None
         else:
             scores = None
 
+        # History keys are (keyword, geo, timeframe): only web/all-categories runs share them
+        if args.gprop == "web" and args.category == config.DEFAULT_CATEGORY:
+            record_history(fetcher, metrics, args.timeframe, args.geo, scores)
+
         # Generate reports
         if args.report:
+            from reporter import HTMLReporter
+
             logger.info("Generating HTML report...")
             reporter = HTMLReporter(config.REPORTS_DIR)
             report_path = reporter.generate_research_report(
-                keywords, interest_df, regions_df, metrics, scores
+                keywords, interest_df, regions_df, metrics, scores, data_status=fetcher.data_status
             )
 
             logger.info(f"Report saved to {report_path}")
@@ -177,18 +514,182 @@ def cmd_research(args):
 
         # Export data
         if args.csv or args.json:
+            from reporter import HTMLReporter
+
             reporter = HTMLReporter()
             for keyword in keywords:
                 if keyword in metrics:
                     if args.csv:
                         reporter.export_csv(keyword, interest_df, regions_df)
                     if args.json:
-                        reporter.export_json(keyword, metrics[keyword])
+                        reporter.export_json(keyword, metrics[keyword], data_status=fetcher.data_status.get(keyword))
+
+        logger.info("Done!")
+
+    except RateLimitError:
+        logger.error("Google Trends rate limited. Rerun with --best-effort or --offline to use cached data.")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Error: {e}", exc_info=True)
+        sys.exit(1)
+
+
+def cmd_timeframes(args):
+    """Multi-timeframe mode: Compare keywords across several timeframes side by side."""
+    from fetcher import CachedFetcher, RateLimitError
+
+    keywords = parse_keywords(args.keywords)
+    timeframes = list(dict.fromkeys(tf.strip() for tf in args.timeframes.split(",") if tf.strip()))
+    if not keywords or not timeframes:
+        logger.error("Both --keywords and --timeframes are required")
+        sys.exit(1)
+
+    logger.info(f"Multi-timeframe mode: {keywords} over {timeframes}")
+    fetcher = CachedFetcher(offline=args.offline)
+
+    journal = open_job(args)
+    try:
+        results = fetch_data_for_timeframes(
+            fetcher, keywords, timeframes, args.geo, best_effort=args.best_effort or args.offline, journal=journal
+        )
+        if journal:
+            journal.finish()
+        log_data_status(fetcher, keywords)
+
+        if not any(metrics for metrics, _, _ in results.values()):
+            logger.error("No data retrieved")
+            sys.exit(1)
+
+        for timeframe, (metrics, _, _) in results.items():
+            record_history(fetcher, metrics, timeframe, args.geo)
+
+        # Console summary: one line per keyword, timeframes left to right
+        for keyword in keywords:
+            cells = []
+            for timeframe, (metrics, _, _) in results.items():
+                m = metrics.get(keyword)
+                cells.append(
+                    f"{timeframe}: avg={m.avg_interest:.1f} mom={m.momentum:+.2f}{' PEAK' if m.recent_peak else ''}"
+                    if m else f"{timeframe}: —"
+                )
+            logger.info(f"{keyword} | " + " | ".join(cells))
+
+        if args.report:
+            from reporter import HTMLReporter
+
+            reporter = HTMLReporter(config.REPORTS_DIR)
+            report_path = reporter.generate_timeframe_report(
+                keywords,
+                {tf: (metrics, interest_df) for tf, (metrics, interest_df, _) in results.items()},
+                data_status=fetcher.data_status,
+            )
+            logger.info(f"Report saved to {report_path}")
+
+            if args.open:
+                webbrowser.open(f"file://{report_path.absolute()}")
+
+        if args.json:
+            from reporter import HTMLReporter
+
+            reporter = HTMLReporter()
+            for keyword in keywords:
+                for timeframe, (metrics, _, _) in results.items():
+                    if keyword in metrics:
+                        reporter.export_json(
+                            f"{keyword}_{timeframe}",
+                            metrics[keyword],
+                            data_status=fetcher.status(timeframe, args.geo).get(keyword),
+                        )
+
+        logger.info("Done!")
+
+    except RateLimitError:
+        logger.error("Google Trends rate limited. Rerun with --best-effort or --offline to use cached data.")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Error: {e}", exc_info=True)
+        sys.exit(1)
+
+
+def cmd_matrix(args):
+    """Matrix mode: Compare keywords across Google properties and categories."""
+    from fetcher import CachedFetcher, RateLimitError, scope_suffix
+    from matrix import build_cells, parse_categories, parse_gprops, score_matrix
+
+    keywords = parse_keywords(args.keywords)
+    ref_keywords = parse_keywords(args.reference) if args.reference else []
+    try:
+        gprops = parse_gprops(args.gprops) if args.gprops else [config.GPROPS[args.gprop]]
+        categories = parse_categories(args.categories) if args.categories else [args.category]
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    cells = build_cells(gprops, categories)
+
+    logger.info(f"Matrix mode: {keywords} over {[cell.label for cell in cells]}")
+    fetcher = CachedFetcher(offline=args.offline)
+
+    journal = open_job(args)
+    try:
+        all_keywords = get_index().dedupe(keywords + ref_keywords)
+        results = fetch_data_for_matrix(
+            fetcher, all_keywords, cells, args.timeframe, args.geo,
+            best_effort=args.best_effort or args.offline, journal=journal,
+        )
+        if journal:
+            journal.finish()
+        log_data_status(fetcher, all_keywords)
+
+        if not any(metrics for metrics, _ in results.values()):
+            logger.error("No data retrieved")
+            sys.exit(1)
+
+        scores = score_matrix({cell: metrics for cell, (metrics, _) in results.items()}, keywords, ref_keywords)
+
+        for keyword in keywords:
+            cells_summary = []
+            for cell, (metrics, _) in results.items():
+                m = metrics.get(keyword)
+                score = scores.get(cell, {}).get(keyword)
+                cells_summary.append(
+                    f"{cell.label}: avg={m.avg_interest:.1f} mom={m.momentum:+.2f}"
+                    + (f" sim={score.similarity_score:.0f}" if score else "")
+                    if m else f"{cell.label}: —"
+                )
+            logger.info(f"{keyword} | " + " | ".join(cells_summary))
+
+        if args.report:
+            from reporter import HTMLReporter
+
+            reporter = HTMLReporter(config.REPORTS_DIR)
+            report_path = reporter.generate_matrix_report(
+                keywords,
+                {cell.label: result for cell, result in results.items()},
+                scores={cell.label: cell_scores for cell, cell_scores in scores.items()},
+                data_status=fetcher.data_status,
+            )
+            logger.info(f"Report saved to {report_path}")
+
+            if args.open:
+                webbrowser.open(f"file://{report_path.absolute()}")
+
+        if args.json:
+            from reporter import HTMLReporter
+
+            reporter = HTMLReporter()
+            for keyword in keywords:
+                for cell, (metrics, _) in results.items():
+                    if keyword in metrics:
+                        reporter.export_json(
+                            f"{keyword}_{cell.gprop or 'web'}_{cell.cat}",
+                            metrics[keyword],
+                            data_status=fetcher.status(args.timeframe, args.geo, scope_suffix(cell.cat, cell.gprop)).get(keyword),
+                        )
 
         logger.info("Done!")
 
     except RateLimitError:
-        logger.error("Google Trends rate limited. Use cached data or try again later.")
+        logger.error("Google Trends rate limited. Rerun with --best-effort or --offline to use cached data.")
         sys.exit(1)
     except Exception as e:
         logger.error(f"Error: {e}", exc_info=True)
@@ -197,9 +698,14 @@ def cmd_research(args):
 
 def cmd_discover(args):
     """Discovery mode: Find trending opportunities."""
+    from detector import SpikeMonitor
+    from fetcher import CachedFetcher
+    from ranking import metrics_table, rank
 
     logger.info(f"Discovery mode: {args.geo}")
-    fetcher = CachedFetcher()
+    fetcher = CachedFetcher(offline=args.offline)
+    spike_monitor = SpikeMonitor()
+    fetcher.add_listener(spike_monitor.observe)
 
     try:
         logger.info("Fetching trending searches...")
@@ -213,6 +719,7 @@ def cmd_discover(args):
 
         # Get top N trending terms
         trending_keywords = trending_df.iloc[:20, 0].tolist() if len(trending_df.columns) > 0 else []
+        trending_keywords = get_index().dedupe(trending_keywords)
 
         if not trending_keywords:
             logger.error("Could not extract keywords from trending data")
@@ -222,40 +729,40 @@ def cmd_discover(args):
 
         # Fetch detailed data for trending keywords
         metrics, interest_df, regions_df = fetch_data_for_keywords(
-            fetcher, trending_keywords[:10], "now 7-d", args.geo
+            fetcher, trending_keywords[:10], "now 7-d", args.geo,
+            best_effort=args.best_effort or args.offline,
         )
+        spike_monitor.save()
+        log_data_status(fetcher, trending_keywords[:10])
+        record_history(fetcher, metrics, "now 7-d", args.geo)
 
-        # Score each keyword
-        analyzer = KeywordAnalyzer()
-        opportunities = []
-
-        for keyword in trending_keywords[:10]:
-            if keyword in metrics:
-                score = analyzer.get_opportunity_score(metrics[keyword])
-                if score >= config.MIN_DISCOVERY_SCORE:
-                    opportunities.append((keyword, score, metrics[keyword]))
-
-        opportunities.sort(key=lambda x: x[1], reverse=True)
+        # Score every keyword in one pass
+        table = metrics_table({kw: metrics[kw] for kw in trending_keywords[:10] if kw in metrics})
+        ranked = rank(table, args.profile, k=10, min_score=config.MIN_DISCOVERY_SCORE)
+        opportunities = [(row.keyword, row.opportunity_score, metrics[row.keyword]) for row in ranked.itertuples()]
 
         # Display results
         logger.info("\n=== TOP DISCOVERY OPPORTUNITIES ===\n")
-        for rank, (keyword, score, m) in enumerate(opportunities[:10], 1):
+        for position, (keyword, score, m) in enumerate(opportunities[:10], 1):
             logger.info(
-                f"{rank}. {keyword} (Score: {score:.1f}) - "
+                f"{position}. {keyword} (Score: {score:.1f}) - "
                 f"Interest: {m.avg_interest:.1f}, "
                 f"Queries: {m.related_queries_count}, "
-                f"Rising: {m.rising_queries_count}"
+                f"Rising: {m.rising_queries_count}, "
+                f"Breakout topics: {m.topic_breakout_count}"
             )
 
         # Generate report
         if args.report:
+            from reporter import HTMLReporter
+
             logger.info("Generating discovery report...")
             reporter = HTMLReporter(config.REPORTS_DIR)
             # For discovery, show top opportunities
             discovery_keywords = [kw for kw, _, _ in opportunities[:5]]
             if discovery_keywords:
                 report_path = reporter.generate_research_report(
-                    discovery_keywords, interest_df, regions_df, metrics
+                    discovery_keywords, interest_df, regions_df, metrics, data_status=fetcher.data_status
                 )
                 logger.info(f"Report saved to {report_path}")
 
@@ -269,6 +776,384 @@ def cmd_discover(args):
         sys.exit(1)
 
 
+def cmd_stitch(args):
+    """Stitch mode: Daily-resolution series over long ranges."""
+    import pandas as pd
+
+    from analyzer import KeywordAnalyzer
+    from fetcher import CachedFetcher, RateLimitError
+    from reporter import HTMLReporter
+    from stitcher import DailyStitcher, StitchError
+
+    keywords = parse_keywords(args.keywords)
+    if not keywords:
+        logger.error("No keywords provided")
+        sys.exit(1)
+
+    try:
+        start = date.fromisoformat(args.stitch_from)
+        end = date.fromisoformat(args.stitch_to) if args.stitch_to else None
+    except ValueError as e:
+        logger.error(f"Invalid stitch date: {e}")
+        sys.exit(1)
+
+    logger.info(f"Stitch mode: {keywords} from {start} to {end or 'today'}")
+    stitcher = DailyStitcher(CachedFetcher())
+
+    try:
+        # Each batch shares one scale; separate batches are stitched independently
+        interest_df = pd.DataFrame()
+        batch_size = config.MAX_KEYWORDS_PER_REQUEST
+        for i in range(0, len(keywords), batch_size):
+            batch = keywords[i : i + batch_size]
+            try:
+                stitched = stitcher.stitch(batch, start, end, geo=args.geo)
+            except StitchError as e:
+                # A window that cannot be calibrated would put the rest of the series on a wrong scale
+                logger.error(f"Could not stitch {batch}: {e}")
+                continue
+            for col in stitched.columns:
+                interest_df[col] = stitched[col]
+
+        analyzer = KeywordAnalyzer()
+        metrics = {
+            keyword: analyzer.extract_metrics(keyword, interest_df, {})
+            for keyword in keywords
+            if keyword in interest_df.columns
+        }
+
+        reporter = HTMLReporter(config.REPORTS_DIR)
+        for keyword in metrics:
+            reporter.export_csv(keyword, interest_df[[keyword]], pd.DataFrame(), output_dir=config.STITCH_DIR)
+
+        if args.report and metrics:
+            report_path = reporter.generate_research_report(
+                list(metrics), interest_df, pd.DataFrame(), metrics
+            )
+            logger.info(f"Report saved to {report_path}")
+
+            if args.open:
+                webbrowser.open(f"file://{report_path.absolute()}")
+
+        logger.info("Done!")
+
+    except RateLimitError:
+        logger.error("Google Trends rate limited. Settled windows are kept; rerun to resume.")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Error: {e}", exc_info=True)
+        sys.exit(1)
+
+
+def cmd_realtime(args):
+    """Realtime mode: Poll a watch list on a short interval and flag spikes."""
+    from fetcher import CachedFetcher
+    from realtime import RealtimeIngestor, load_calendar_watch_list
+
+    watch_list = parse_keywords(args.keywords) if args.keywords else []
+    if args.watch_calendar:
+        watch_list += load_calendar_watch_list(Path(args.watch_calendar), days_ahead=args.days_ahead)
+    watch_list = get_index().dedupe(watch_list)
+
+    if not watch_list:
+        logger.error("No keywords to watch")
+        sys.exit(1)
+
+    if args.metrics_port is not None:
+        serve_metrics(args.metrics_port)
+
+    logger.info(f"Realtime mode: watching {len(watch_list)} keywords every {args.interval}s")
+    ingestor = RealtimeIngestor(CachedFetcher(), watch_list, geo=args.geo)
+
+    try:
+        ingestor.run(interval=args.interval, iterations=args.iterations)
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+        ingestor.store.save()
+
+
+def cmd_crawl(args):
+    """Crawl mode: Expand seed keywords into a related-query graph."""
+    from crawler import RelatedQueryCrawler, default_graph_path
+    from fetcher import CachedFetcher, RateLimitError
+
+    seeds = parse_keywords(args.crawl)
+    if not seeds:
+        logger.error("No seed keywords provided")
+        sys.exit(1)
+
+    logger.info(f"Crawl mode: {seeds} (budget {args.budget} requests, depth {args.max_depth})")
+    crawler = RelatedQueryCrawler(
+        CachedFetcher(),
+        timeframe=args.timeframe,
+        geo=args.geo,
+        request_budget=args.budget,
+        max_depth=args.max_depth,
+    )
+
+    try:
+        graph = crawler.crawl(seeds)
+    except RateLimitError:
+        logger.error("Google Trends rate limited. Saving the partial graph.")
+        graph = crawler.graph
+
+    graph.save(default_graph_path(seeds))
+
+    logger.info("\n=== TOP EPISODE ANGLES ===\n")
+    for rank, node in enumerate(graph.ranked(25), 1):
+        logger.info(f"{rank}. {node.keyword} (Score: {node.score:.1f}, depth {node.depth}, via {node.parent or 'seed'})")
+
+
+def cmd_plan_refresh(args):
+    """Planner mode: Refresh keywords in order of their episodes' air dates."""
+    from entities import get_entity_index
+    from fetcher import CachedFetcher, RateLimitError
+    from clustering import load_representatives
+    from planner import RefreshPlanner, load_calendar, load_episode_sheet, merge_episodes
+
+    try:
+        calendar = load_calendar(Path(args.plan_refresh))
+        sheet = load_episode_sheet(Path(args.episode_sheet)) if args.episode_sheet else []
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Could not read episode calendar/sheet: {e}")
+        sys.exit(1)
+
+    get_entity_index()  # Same-entity keywords share one refresh
+    representatives = load_representatives()
+    if representatives:
+        logger.info(f"Applying keyword clusters from {config.CLUSTERS_FILE} ({len(representatives)} clustered keywords)")
+    planner = RefreshPlanner(merge_episodes(calendar, sheet), representatives=representatives)
+    plan = planner.plan(days_ahead=args.days_ahead)
+    batches = planner.batches(plan)
+
+    logger.info("\n=== REFRESH PLAN ===\n")
+    for p in plan:
+        airs = p.air_time.strftime("%Y-%m-%d %H:%M UTC") if p.air_time else "unscheduled"
+        age = f"{p.age.total_seconds() / 3600:.1f}h old" if p.age is not None else "never fetched"
+        logger.info(
+            f"{'DUE ' if p.due else 'ok  '} {p.keyword} (airs {airs}, {age}, "
+            f"max {p.max_age.total_seconds() / 3600:.0f}h, episodes {[e.episode_num for e in p.episodes]})"
+            + (f" via '{p.representative}'" if p.representative else "")
+        )
+    logger.info(f"{sum(len(b) for b in batches)} of {len(plan)} keywords due in {len(batches)} batches")
+
+    if args.dry_run or not batches:
+        return
+
+    fetcher = CachedFetcher(offline=args.offline)
+    refreshed = 0
+    for batch in batches:
+        if fetcher.request_count >= args.budget:
+            logger.warning(f"Request budget ({args.budget}) spent; {len(batches) - batches.index(batch)} batches left")
+            break
+
+        # The strictest keyword in the batch decides how old a cache entry may be
+        fetcher.max_cache_age = int(min(p.max_age for p in batch).total_seconds())
+        try:
+            metrics, _, _ = fetch_data_for_keywords(
+                fetcher, [p.keyword for p in batch], args.timeframe, args.geo,
+                best_effort=args.best_effort or args.offline, incremental=args.incremental,
+                calibrate=args.calibrate,
+            )
+        except RateLimitError:
+            logger.error("Google Trends rate limited. Rerun later; snapshots so far are saved.")
+            sys.exit(1)
+
+        status = fetcher.status(args.timeframe, args.geo)
+        for p in batch:
+            if p.keyword in metrics:
+                if planner.record(p, metrics[p.keyword], status.get(p.keyword)):
+                    refreshed += 1
+                else:
+                    logger.warning(f"{p.keyword}: only {status.get(p.keyword)} data; still due")
+        record_history(fetcher, metrics, args.timeframe, args.geo)
+
+    logger.info(f"Refreshed {refreshed} keywords ({fetcher.request_count} requests); snapshots in {config.EPISODE_SNAPSHOT_DIR}")
+
+
+def cmd_cluster(args):
+    """Cluster mode: Group co-moving keywords from cached data so the planner refreshes one per group."""
+    from clustering import cluster_keywords, load_cached_related, load_cached_series, save_clusters
+    from parallel import AnalyticsExecutor
+    from planner import load_calendar, load_episode_sheet, merge_episodes
+
+    series = load_cached_series(args.timeframe, args.geo)
+    related = load_cached_related(args.timeframe, args.geo)
+    if args.cluster:
+        keywords = parse_keywords(args.cluster)
+    else:
+        # Default: the planner's episode keywords
+        try:
+            calendar = load_calendar(config.LIVE_FEED_CALENDAR)
+            sheet = load_episode_sheet(Path(args.episode_sheet)) if args.episode_sheet else []
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not read episode calendar/sheet: {e}")
+            sys.exit(1)
+        keywords = [e.primary_keyword for e in merge_episodes(calendar, sheet)]
+
+    with AnalyticsExecutor(workers=args.workers) as executor:
+        clusters = cluster_keywords(keywords, series, related, executor=executor)
+    grouped = [c for c in clusters if len(c.members) > 1]
+    logger.info(f"\n=== KEYWORD CLUSTERS ({args.geo}, {args.timeframe}) ===\n")
+    for c in grouped:
+        others = [kw for kw in c.members if kw != c.representative]
+        logger.info(f"{c.representative} ({len(c.members)}): {', '.join(others)}")
+
+    # Steady state: representatives keep their schedule, members refresh CLUSTER_MEMBER_AGE_FACTOR x less often
+    members = sum(len(c.members) - 1 for c in grouped)
+    load = (len(clusters) + members / config.CLUSTER_MEMBER_AGE_FACTOR) / max(len(keywords), 1)
+    logger.info(
+        f"{len(keywords)} keywords ({len(series)} cached curves) in {len(grouped)} clusters + "
+        f"{len(clusters) - len(grouped)} singletons; refresh load ~{load:.0%} of unclustered"
+    )
+    path = save_clusters(clusters, args.timeframe, args.geo)
+    logger.info(f"Clusters saved to {path}; --plan-refresh applies them")
+
+
+def cmd_history(args):
+    """History mode: Show how keywords' metrics and scores moved over past runs."""
+    from datetime import datetime, timedelta, timezone
+
+    import pandas as pd
+
+    from store import MetricsStore
+
+    keywords = parse_keywords(args.history)
+    store = MetricsStore()
+
+    if args.as_of:
+        when = datetime.combine(date.fromisoformat(args.as_of), datetime.max.time()).astimezone()
+        for keyword in keywords:
+            row = store.at(keyword, when, geo=args.geo, timeframe=args.timeframe)
+            if row is None:
+                logger.info(f"{keyword}: no snapshot on or before {args.as_of}")
+            else:
+                logger.info(
+                    f"{keyword} @ {row['run_ts']:%Y-%m-%d %H:%M}: avg={row['avg_interest']:.1f} "
+                    f"mom={row['momentum']:+.2f}"
+                    + (f" similarity={row['similarity_score']:.1f}" if not pd.isna(row["similarity_score"]) else "")
+                )
+        return
+
+    start = datetime.now(timezone.utc) - timedelta(days=args.days)
+    df = store.range(keywords, start=start, geo=args.geo, timeframe=args.timeframe)
+    if df.empty:
+        logger.info(f"No history for {keywords} ({args.geo}, {args.timeframe}) in the last {args.days} days")
+        return
+
+    logger.info(f"\n=== HISTORY ({args.geo}, {args.timeframe}, last {args.days} days) ===\n")
+    for keyword, rows in df.groupby("keyword", sort=False):
+        first, last = rows.iloc[0], rows.iloc[-1]
+        logger.info(
+            f"{keyword}: {len(rows)} snapshots, momentum {first['momentum']:+.2f} -> {last['momentum']:+.2f}, "
+            f"avg interest {first['avg_interest']:.1f} -> {last['avg_interest']:.1f}"
+            + (f", similarity {last['similarity_score']:.1f}" if not pd.isna(last["similarity_score"]) else "")
+        )
+
+    if args.csv:
+        path = config.HISTORY_DIR / f"history_{datetime.now():%Y-%m-%d_%H-%M-%S}.csv"
+        df.drop(columns=["key"]).to_csv(path, index=False)
+        logger.info(f"History exported: {path}")
+
+
+def cmd_rank(args):
+    """Rank mode: Re-rank every keyword in the history store under a weight profile (no fetches)."""
+    from datetime import datetime
+
+    import pandas as pd
+
+    from explain import explain_opportunities
+    from ranking import get_profile, rank
+    from store import MetricsStore
+
+    when = datetime.combine(date.fromisoformat(args.as_of), datetime.max.time()).astimezone() if args.as_of else None
+    table = MetricsStore().latest(geo=args.geo, timeframe=args.timeframe, when=when)
+    if table.empty:
+        logger.info(f"No history for {args.geo}/{args.timeframe}; research or discovery runs record it")
+        return
+
+    ranked = rank(table, args.profile, k=args.top)
+    mixed = ranked["calibrated"].any() and not ranked["calibrated"].all()
+    logger.info(f"\n=== TOP {len(ranked)} OF {len(table)} ({args.profile}, {args.geo}, {args.timeframe}) ===\n")
+    if mixed:
+        logger.warning("Calibrated and uncalibrated keywords score interest on different scales; compare within each")
+    for row in ranked.itertuples():
+        logger.info(
+            f"{row.rank}. {row.keyword}{'' if row.calibrated or not mixed else ' [uncalibrated]'} "
+            f"(Score: {row.opportunity_score:.1f}) - "
+            f"Interest: {row.avg_interest:.1f}, "
+            f"Momentum: {row.momentum:+.2f}, "
+            f"Queries: {row.related_queries_count:.0f}, "
+            f"Breakouts: {max(row.breakout_queries_count, row.topic_breakout_count):.0f} "
+            f"(as of {row.run_ts:%Y-%m-%d})"
+        )
+
+    if args.explain:
+        # Ranks stay against the whole table; only the top rows are explained
+        components = list(get_profile(args.profile))
+        rows = pd.Index(table["keyword"]).get_indexer(ranked["keyword"])
+        explained = explain_opportunities(table, args.profile, rows=rows)
+        log_explanation(explained, "opportunity_score", components, ranks=ranked["rank"].tolist())
+        ranked = ranked.join(explained[components].add_suffix("_points")).join(
+            explained[["rank_best", "rank_worst", "sensitive_to"]]
+        )
+
+    if args.csv:
+        config.DATA_DIR.mkdir(parents=True, exist_ok=True)
+        path = config.DATA_DIR / f"rank_{args.profile}_{datetime.now():%Y-%m-%d_%H-%M-%S}.csv"
+        ranked.drop(columns=["key"]).to_csv(path, index=False)
+        logger.info(f"Ranking exported: {path}")
+
+
+def cmd_tune(args):
+    """Tune mode: Fit score weights to past episode outcomes and save them as a profile (no fetches)."""
+    from tuning import TuningError, join_history, load_outcomes, save_profile, tune
+
+    episode_sheet = Path(args.episode_sheet) if args.episode_sheet else config.EPISODE_SHEET
+    try:
+        outcomes = load_outcomes(Path(args.tune), args.outcome, episode_sheet)
+        table = join_history(outcomes, geo=args.geo, timeframe=args.timeframe)
+        results = tune(table, profile=args.profile)
+        path = save_profile(
+            args.profile_name,
+            results,
+            source={"outcomes": args.tune, "outcome": args.outcome, "geo": args.geo, "timeframe": args.timeframe},
+        )
+    except TuningError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    logger.info(f"\n=== TUNED WEIGHTS ({len(table)} outcomes, '{args.outcome}', baseline '{args.profile}') ===\n")
+    for result in results:
+        logger.info(
+            f"{result.kind}: "
+            + ", ".join(f"{name}={w:.2f} (was {result.baseline_weights[name]:.2f})" for name, w in result.weights.items())
+        )
+        logger.info(
+            f"  rank correlation: {result.objective:+.2f} fitted vs {result.baseline_objective:+.2f} baseline; "
+            f"out of sample {result.cv_objective:+.2f} vs {result.cv_baseline_objective:+.2f}"
+        )
+        if result.cv_objective <= result.cv_baseline_objective:
+            logger.warning(f"  {result.kind} weights do not beat the baseline out of sample; more outcomes may help")
+    logger.info(f"Profile saved to {path}; use it with --profile {args.profile_name}")
+
+
+def cmd_serve(args):
+    """Service mode: Serve the fetcher and analyzer over HTTP for the whole team."""
+    from service import make_server
+
+    httpd = make_server(args.host, args.port)
+    host, port = httpd.server_address[:2]
+    logger.info(f"Serving on http://{host}:{port} (endpoints under /api/, OpenMetrics at /metrics)")
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+    finally:
+        httpd.server_close()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Google Trends Scraper - Find keywords comparable to Epstein Files scale.",
@@ -283,6 +1168,50 @@ Examples:
 
   # Export data without report
   python scraper.py --keywords "test" --csv --json --no-report
+
+  # Is it spiking now, and was it big historically?
+  python scraper.py --keywords "world war 3,draft" --timeframes "now 7-d,today 3-m,today 12-m,today 5-y"
+
+  # Where is the demand: web, news or YouTube, overall and within News?
+  python scraper.py --keywords "world war 3,draft" --gprops "web,news,youtube" --categories "0,16"
+
+  # Daily data over five years (later runs only fetch the newest window)
+  python scraper.py --keywords "world war 3" --stitch-from 2021-01-01
+
+  # Expand one seed into a graph of related-query episode angles
+  python scraper.py --crawl "world war 3" --budget 20
+
+  # How has momentum moved over the last 30 days of runs?
+  python scraper.py --history "world war 3,draft" --days 30
+
+  # Re-rank everything recorded so far for a war/geopolitics episode (no fetches)
+  python scraper.py --rank --profile geopolitics --top 25
+
+  # Fit weights to how past episodes did, then rank with them
+  python scraper.py --tune episode_views.csv --outcome views --profile-name fitted
+  python scraper.py --rank --profile fitted
+
+  # Group co-moving episode keywords so the planner refreshes one per group
+  python scraper.py --cluster
+
+  # Refresh the keywords of episodes airing soonest (preview with --dry-run)
+  python scraper.py --plan-refresh --days-ahead 7
+
+  # Watch the live-feed calendar keywords for breaking spikes
+  python scraper.py --realtime --watch-calendar --days-ahead 2
+
+  # Scheduled sweep that degrades to cached data instead of failing on a 429
+  python scraper.py --keywords "topic1,topic2" --best-effort --json
+
+  # Journal a long sweep, then pick it up where it stopped (the job id is logged at the start)
+  python scraper.py --keywords "$(cat sweep_keywords.txt)" --timeframes "today 12-m" --journal
+  python scraper.py --resume 20261019-103452-3f9a2c
+
+  # Serve the team from one process (one cache, one rate budget)
+  python scraper.py --serve --host 0.0.0.0 --port 8765
+
+  # Record where a run's time goes (sleeping vs working, per stage)
+  python scraper.py --keywords "world war 3" --trace
         """,
     )
 
@@ -306,6 +1235,39 @@ Examples:
         "Examples: 'now 1-d', 'today 1-m', 'today 12-m', 'today 5-y'",
     )
 
+    parser.add_argument(
+        "--gprop",
+        choices=list(config.GPROPS),
+        default="web",
+        help="Google property to search (default: web)",
+    )
+
+    parser.add_argument(
+        "--category",
+        type=int,
+        default=config.DEFAULT_CATEGORY,
+        help="Trends category id (default: 0, all categories; e.g. 16 = News)",
+    )
+
+    parser.add_argument(
+        "--gprops",
+        type=str,
+        help=f"Matrix mode: comma-separated properties ({', '.join(config.GPROPS)})",
+    )
+
+    parser.add_argument(
+        "--categories",
+        type=str,
+        help="Matrix mode: comma-separated Trends category ids (e.g., '0,16')",
+    )
+
+    parser.add_argument(
+        "--timeframes",
+        type=str,
+        help="Comma-separated timeframes compared side by side in one run "
+        "(e.g., 'now 7-d,today 3-m,today 12-m,today 5-y')",
+    )
+
     parser.add_argument(
         "--geo",
         type=str,
@@ -313,6 +1275,181 @@ Examples:
         help=f"Geographic region (default: {config.DEFAULT_GEO}). Examples: US, GB, CA",
     )
 
+    parser.add_argument(
+        "--stitch-from",
+        type=str,
+        metavar="YYYY-MM-DD",
+        help="Stitch daily-resolution data for --keywords from this date (incremental across runs)",
+    )
+
+    parser.add_argument(
+        "--stitch-to",
+        type=str,
+        metavar="YYYY-MM-DD",
+        help="End date for --stitch-from (default: today)",
+    )
+
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="Realtime mode: poll 'now 1-d'/'now 7-d' interest and trending searches for a watch list",
+    )
+
+    parser.add_argument(
+        "--watch-calendar",
+        type=str,
+        nargs="?",
+        const=str(config.LIVE_FEED_CALENDAR),
+        help="Add primary keywords from a live-feed calendar to the realtime watch list",
+    )
+
+    parser.add_argument(
+        "--days-ahead",
+        type=int,
+        help="Only watch (or plan) calendar episodes airing within N days",
+    )
+
+    parser.add_argument(
+        "--history",
+        type=str,
+        help="History mode: show recorded metrics for comma-separated keywords over past runs",
+    )
+
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=config.HISTORY_DAYS,
+        help=f"History mode: lookback in days (default: {config.HISTORY_DAYS})",
+    )
+
+    parser.add_argument(
+        "--as-of",
+        type=str,
+        help="History/rank mode: use each keyword's latest snapshot on or before YYYY-MM-DD",
+    )
+
+    parser.add_argument(
+        "--rank",
+        action="store_true",
+        help="Rank mode: rank every keyword in the metric history by opportunity score (no fetches)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default="default",
+        help=(
+            f"Research/rank/discovery: weight profile, built-in ({', '.join(config.WEIGHT_PROFILES)}) "
+            "or fitted by --tune (default: default)"
+        ),
+    )
+
+    parser.add_argument(
+        "--tune",
+        type=str,
+        metavar="OUTCOMES_CSV",
+        help="Tune mode: fit weights to past episode outcomes from the metric history (no fetches)",
+    )
+
+    parser.add_argument(
+        "--outcome",
+        type=str,
+        default=config.TUNING_OUTCOME_COLUMN,
+        help=f"Tune mode: outcome column to predict (default: {config.TUNING_OUTCOME_COLUMN})",
+    )
+
+    parser.add_argument(
+        "--profile-name",
+        type=str,
+        default="tuned",
+        help="Tune mode: name of the profile to write (default: tuned)",
+    )
+
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Research/rank: log each score's component contributions and its rank range under perturbed weights",
+    )
+
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=config.RANK_TOP_K,
+        help=f"Rank mode: how many keywords to show (default: {config.RANK_TOP_K})",
+    )
+
+    parser.add_argument(
+        "--plan-refresh",
+        type=str,
+        nargs="?",
+        const=str(config.LIVE_FEED_CALENDAR),
+        help="Planner mode: refresh episode keywords soonest-airing first (default: live-feed calendar)",
+    )
+
+    parser.add_argument(
+        "--episode-sheet",
+        type=str,
+        default=str(config.EPISODE_SHEET),
+        help="Planner mode: episode sheet CSV for episodes not on the calendar yet ('' to skip); "
+        "tune mode: maps episode numbers to keywords",
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Planner mode: log the refresh plan without fetching",
+    )
+
+    parser.add_argument(
+        "--cluster",
+        type=str,
+        nargs="?",
+        const="",
+        metavar="KEYWORDS",
+        help="Cluster mode: group co-moving keywords from cached data (default: the episode keywords)",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.PARALLEL_WORKERS,
+        help="Cluster mode: worker processes for clustering large keyword sets (default: one per CPU core)",
+    )
+
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=config.REALTIME_POLL_SECONDS,
+        help=f"Seconds between realtime polling cycles (default: {config.REALTIME_POLL_SECONDS})",
+    )
+
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        help="Stop realtime polling after N cycles (default: run until interrupted)",
+    )
+
+    parser.add_argument(
+        "--crawl",
+        type=str,
+        metavar="SEEDS",
+        help="Crawl mode: expand comma-separated seed keywords into a related-query graph",
+    )
+
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=config.CRAWL_REQUEST_BUDGET,
+        help=f"Total rate-limited requests a crawl or refresh plan may spend (default: {config.CRAWL_REQUEST_BUDGET})",
+    )
+
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=config.CRAWL_MAX_DEPTH,
+        help=f"Maximum hops from the seed to expand (default: {config.CRAWL_MAX_DEPTH})",
+    )
+
     parser.add_argument(
         "--discover",
         action="store_true",
@@ -351,17 +1488,137 @@ Examples:
         help="Export data as JSON",
     )
 
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the HTTP query service (one shared cache and rate budget for the team)",
+    )
+
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=config.SERVICE_HOST,
+        help=f"Service mode: interface to bind (default: {config.SERVICE_HOST})",
+    )
+
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=config.SERVICE_PORT,
+        help=f"Service mode: port (default: {config.SERVICE_PORT})",
+    )
+
+    parser.add_argument(
+        "--offline",
+        "--cache-only",
+        action="store_true",
+        dest="offline",
+        help="Research/discovery: never touch the network; use cached data even if stale",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Refresh stale 'today 12-m'/'today 5-y' data by splicing a short recent window onto "
+            "the cached series (full refetch if calibration fails)"
+        ),
+    )
+
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Put keywords on one global scale via the anchor ladder (comparable across runs)",
+    )
+
+    parser.add_argument(
+        "--best-effort",
+        action="store_true",
+        help="Research/discovery: skip failed batches (falling back to cache after a 429) "
+        "and report which keywords are stale or missing",
+    )
+
+    parser.add_argument(
+        "--journal",
+        action="store_true",
+        help=f"Research/timeframes/matrix: keep a job journal in {config.JOBS_DIR} so an interrupted "
+        "run can be continued with --resume (removed once every batch is done)",
+    )
+
+    parser.add_argument(
+        "--resume",
+        type=str,
+        metavar="JOB_ID",
+        help="Continue an interrupted --journal run with its original arguments: batches it finished "
+        "are rebuilt from cache, the rest fetched",
+    )
+
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        const="",
+        metavar="PATH",
+        help=f"Write a per-stage timing trace (default: {config.TRACE_DIR}/trace_<timestamp>.json)",
+    )
+
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Realtime mode: serve OpenMetrics counters on http://127.0.0.1:PORT/metrics",
+    )
+
     args = parser.parse_args()
+    if args.resume:
+        from journal import JobJournal, JournalError
 
-    # Route to appropriate command
-    if args.discover:
-        cmd_discover(args)
-    elif args.keywords:
-        cmd_research(args)
-    else:
-        parser.print_help()
-        logger.error("Either --keywords or --discover must be specified")
-        sys.exit(1)
+        try:
+            params = JobJournal.open(args.resume).params
+        except JournalError as e:
+            parser.error(str(e))
+        args = argparse.Namespace(**{**vars(args), **params})
+    if args.profile not in config.WEIGHT_PROFILES:
+        from ranking import get_profile
+
+        try:
+            get_profile(args.profile)
+        except ValueError as e:
+            parser.error(str(e))
+
+    try:
+        # Route to appropriate command
+        if args.serve:
+            cmd_serve(args)
+        elif args.history:
+            cmd_history(args)
+        elif args.tune:
+            cmd_tune(args)
+        elif args.cluster is not None:
+            cmd_cluster(args)
+        elif args.rank:
+            cmd_rank(args)
+        elif args.plan_refresh:
+            cmd_plan_refresh(args)
+        elif args.realtime:
+            cmd_realtime(args)
+        elif args.crawl:
+            cmd_crawl(args)
+        elif args.discover:
+            cmd_discover(args)
+        elif args.keywords and (args.gprops or args.categories):
+            cmd_matrix(args)
+        elif args.keywords and args.timeframes:
+            cmd_timeframes(args)
+        elif args.keywords and args.stitch_from:
+            cmd_stitch(args)
+        elif args.keywords:
+            cmd_research(args)
+        else:
+            parser.print_help()
+            logger.error("Either --keywords, --discover or --realtime must be specified")
+            sys.exit(1)
+    finally:
+        if args.trace is not None:
+            tracer.write_trace(Path(args.trace) if args.trace else None)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,247 @@
+"""
+Service module: Local HTTP/JSON query service over one shared fetcher.
+
+One long-running process serves the team, so there is one warm cache and one
+rate-limited egress instead of one per laptop. Endpoints (GET, comma-separated
+`keywords`, optional `timeframe` and `geo`):
+
+    /api/interest   interest over time, per batch
+    /api/related    related queries, per batch
+    /api/metrics    KeywordMetrics, per keyword
+    /api/compare    similarity to `reference` keywords, per keyword
+    /api/discover   trending searches scored for opportunity
+    /metrics        OpenMetrics counters (same as --metrics-port)
+
+Responses are NDJSON streamed with chunked encoding: one line per batch or
+keyword as soon as it is ready, then a final {"done": true} line. Identical
+batches requested concurrently (by any endpoint) are fetched once.
+"""
+
+import json
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import config
+from analyzer import KeywordAnalyzer
+from fetcher import CachedFetcher, FetcherError
+from instrument import tracer
+from normalize import get_index
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls: the first runs, the rest wait for its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[tuple, Future] = {}
+
+    def do(self, key: tuple, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            tracer.count("service_coalesced")
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class TrendsService:
+    """Endpoint logic; each endpoint yields JSON-serializable records."""
+
+    def __init__(self, fetcher: CachedFetcher | None = None, batch_size: int = config.MAX_KEYWORDS_PER_REQUEST):
+        self.fetcher = fetcher or CachedFetcher()
+        self.batch_size = batch_size
+        self.flight = SingleFlight()
+
+    def _batches(self, keywords: list[str]) -> list[list[str]]:
+        keywords = get_index().dedupe(keywords)
+        return [keywords[i : i + self.batch_size] for i in range(0, len(keywords), self.batch_size)]
+
+    def _fetch_batch(self, batch: list[str], timeframe: str, geo: str):
+        """(interest_df, related) for one batch, shared by concurrent identical requests."""
+        key = ("batch", get_index().batch_key(batch), timeframe, geo)
+
+        def fetch():
+            interest_df = self.fetcher.interest_over_time(batch, timeframe=timeframe, geo=geo)
+            related = self.fetcher.related_queries(batch, timeframe=timeframe, geo=geo)
+            return interest_df, related
+
+        return self.flight.do(key, fetch)
+
+    def _batch_metrics(self, batch: list[str], timeframe: str, geo: str) -> dict:
+        interest_df, related = self._fetch_batch(batch, timeframe, geo)
+        analyzer = KeywordAnalyzer()
+        return {
+            kw: analyzer.extract_metrics(kw, interest_df, related)
+            for kw in batch
+            if kw in interest_df.columns
+        }
+
+    def _each_batch(self, keywords: list[str], timeframe: str, geo: str, handle):
+        """Run handle(batch) per batch, turning fetch failures into error records."""
+        for batch in self._batches(keywords):
+            try:
+                yield from handle(batch)
+            except FetcherError as e:
+                logger.warning(f"Service batch {batch} failed: {e}")
+                yield {"keywords": batch, "error": str(e)}
+
+    def interest(self, keywords: list[str], timeframe: str, geo: str):
+        def handle(batch):
+            interest_df, _ = self._fetch_batch(batch, timeframe, geo)
+            interest_df = interest_df.drop(columns=["isPartial"], errors="ignore")
+            yield {
+                "keywords": batch,
+                "dates": [ts.isoformat() for ts in interest_df.index],
+                "series": {kw: interest_df[kw].tolist() for kw in interest_df.columns},
+            }
+
+        yield from self._each_batch(keywords, timeframe, geo, handle)
+
+    def related(self, keywords: list[str], timeframe: str, geo: str):
+        def handle(batch):
+            _, related = self._fetch_batch(batch, timeframe, geo)
+            yield {"keywords": batch, "related": {kw: related.get(kw, {}) for kw in batch}}
+
+        yield from self._each_batch(keywords, timeframe, geo, handle)
+
+    def metrics(self, keywords: list[str], timeframe: str, geo: str):
+        def handle(batch):
+            for metrics in self._batch_metrics(batch, timeframe, geo).values():
+                yield {"keyword": metrics.keyword, "metrics": asdict(metrics)}
+
+        yield from self._each_batch(keywords, timeframe, geo, handle)
+
+    def compare(self, keywords: list[str], reference: list[str], timeframe: str, geo: str):
+        reference_metrics = {}
+        for batch in self._batches(reference):
+            try:
+                reference_metrics.update(self._batch_metrics(batch, timeframe, geo))
+            except FetcherError as e:
+                yield {"keywords": batch, "error": str(e)}
+        if not reference_metrics:
+            yield {"error": "No data for reference keywords"}
+            return
+
+        analyzer = KeywordAnalyzer()
+        analyzer.set_reference_keywords(list(reference_metrics), reference_metrics)
+
+        def handle(batch):
+            for kw, metrics in self._batch_metrics(batch, timeframe, geo).items():
+                score = analyzer.compare_to_reference(kw, metrics)
+                yield {"keyword": kw, "score": asdict(score)}
+
+        yield from self._each_batch(keywords, timeframe, geo, handle)
+
+    def discover(self, geo: str, limit: int = config.SERVICE_DISCOVER_LIMIT):
+        trending_df = self.flight.do(("trending", geo), lambda: self.fetcher.trending_searches(geo=geo))
+        keywords = get_index().dedupe(trending_df.iloc[:, 0].tolist())[:limit] if not trending_df.empty else []
+        yield {"trending": keywords}
+
+        analyzer = KeywordAnalyzer()
+
+        def handle(batch):
+            for kw, metrics in self._batch_metrics(batch, "now 7-d", geo).items():
+                yield {"keyword": kw, "opportunity_score": analyzer.get_opportunity_score(metrics)}
+
+        yield from self._each_batch(keywords, "now 7-d", geo, handle)
+
+
+def _make_handler(service: TrendsService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Needed for chunked streaming
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            keywords = [kw.strip() for kw in params.get("keywords", "").split(",") if kw.strip()]
+            reference = [kw.strip() for kw in params.get("reference", "").split(",") if kw.strip()]
+            timeframe = params.get("timeframe", config.DEFAULT_TIMEFRAME)
+            geo = params.get("geo", config.DEFAULT_GEO)
+
+            if url.path == "/metrics":
+                self._send_body(tracer.openmetrics(), "application/openmetrics-text; version=1.0.0; charset=utf-8")
+            elif url.path == "/health":
+                self._send_body(json.dumps({"status": "ok", "requests": service.fetcher.request_count}))
+            elif url.path == "/api/discover":
+                self._stream(service.discover(geo))
+            elif url.path in ("/api/interest", "/api/related", "/api/metrics", "/api/compare"):
+                if not keywords:
+                    self._send_body(json.dumps({"error": "keywords is required"}), status=400)
+                elif url.path == "/api/compare" and not reference:
+                    self._send_body(json.dumps({"error": "reference is required"}), status=400)
+                elif url.path == "/api/compare":
+                    self._stream(service.compare(keywords, reference, timeframe, geo))
+                else:
+                    endpoint = getattr(service, url.path.rsplit("/", 1)[1])
+                    self._stream(endpoint(keywords, timeframe, geo))
+            else:
+                self._send_body(json.dumps({"error": f"Unknown endpoint: {url.path}"}), status=404)
+
+        def _send_body(self, body: str, content_type: str = "application/json", status: int = 200):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, records):
+            """Write records as NDJSON chunks as they are produced."""
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for record in records:
+                    self._write_chunk(record)
+                self._write_chunk({"done": True})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                logger.info("Service client disconnected mid-stream")
+            except Exception as e:
+                logger.error(f"Service error: {e}", exc_info=True)
+                self._write_chunk({"error": str(e)})
+                self.wfile.write(b"0\r\n\r\n")
+
+        def _write_chunk(self, record: dict) -> None:
+            line = (json.dumps(record, default=str) + "\n").encode()
+            self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return Handler
+
+
+def make_server(
+    host: str = config.SERVICE_HOST,
+    port: int = config.SERVICE_PORT,
+    service: TrendsService | None = None,
+) -> ThreadingHTTPServer:
+    """Build the service's HTTP server (call serve_forever() to run it)."""
+    service = service or TrendsService()
+    httpd = ThreadingHTTPServer((host, port), _make_handler(service))
+    httpd.daemon_threads = True
+    return httpd
@@ -0,0 +1,380 @@
+"""
+Stitcher module: Long-horizon daily series chained from overlapping windows.
+
+Google Trends only returns daily rows for windows shorter than ~9 months, and
+every window is rescaled so its own peak is 100. Long ranges are therefore
+fetched as overlapping daily windows and chained onto the scale of the first
+window using the days they share.
+
+The same calibration refreshes cached weekly windows incrementally
+(TailRefresher): a short daily tail window is resampled to weeks, scaled onto
+the cached series through the weeks they share, and spliced on.
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+from fetcher import CachedFetcher
+from instrument import tracer
+from normalize import get_index
+
+logger = logging.getLogger(__name__)
+
+
+class StitchError(Exception):
+    """Raised when windows cannot be chained onto one scale."""
+    pass
+
+
+@dataclass
+class StitchWindow:
+    """A single daily-resolution fetch window (inclusive dates)."""
+    start: date
+    end: date
+
+    @property
+    def timeframe(self) -> str:
+        """Pytrends timeframe string for this window."""
+        return f"{self.start:%Y-%m-%d} {self.end:%Y-%m-%d}"
+
+
+def plan_windows(
+    start: date,
+    end: date,
+    window_days: int = config.STITCH_WINDOW_DAYS,
+    overlap_days: int = config.STITCH_OVERLAP_DAYS,
+) -> list[StitchWindow]:
+    """Split [start, end] into windows that each overlap the previous one."""
+    if overlap_days >= window_days:
+        raise ValueError("overlap_days must be smaller than window_days")
+    if end < start:
+        raise ValueError(f"End date {end} is before start date {start}")
+
+    step = timedelta(days=window_days - overlap_days)
+    length = timedelta(days=window_days - 1)
+
+    windows = []
+    window_start = start
+    while True:
+        window_end = min(window_start + length, end)
+        windows.append(StitchWindow(window_start, window_end))
+        if window_end >= end:
+            break
+        window_start += step
+
+    return windows
+
+
+def estimate_scale(base: pd.DataFrame, new: pd.DataFrame) -> tuple[float, float]:
+    """Estimate the factor mapping `new` onto the scale of `base`.
+
+    All columns of one window share a single scale, so one ratio is fitted over
+    every keyword in the overlapping dates. Returns (ratio, relative error),
+    where the error is the RMSE of the rescaled overlap divided by its mean.
+    """
+    overlap = base.index.intersection(new.index)
+    if len(overlap) == 0:
+        raise StitchError("Windows do not overlap")
+
+    base_values = base.loc[overlap].to_numpy(dtype=float)
+    new_values = new.loc[overlap, base.columns].to_numpy(dtype=float)
+
+    base_total = base_values.sum()
+    new_total = new_values.sum()
+    if new_total <= 0 or base_total <= 0:
+        # Nothing to calibrate against (all-zero overlap); keep the raw scale.
+        return 1.0, float("inf")
+
+    ratio = base_total / new_total
+    residual = base_values - new_values * ratio
+    error = float(np.sqrt(np.mean(residual**2)) / max(base_values.mean(), 1e-9))
+    return float(ratio), error
+
+
+def chain_frames(
+    base: pd.DataFrame, frames: list[pd.DataFrame], max_error: float = config.STITCH_MAX_ERROR
+) -> pd.DataFrame:
+    """Chain window frames onto the scale of `base`, appending only new dates.
+
+    Raises StitchError when an overlap cannot calibrate the next window (no
+    nonzero values, or an error above max_error), rather than chaining it on
+    a guessed scale.
+    """
+    stitched = base.astype(float)
+    for frame in frames:
+        frame = frame[stitched.columns].astype(float)
+        ratio, error = estimate_scale(stitched, frame)
+        if not np.isfinite(error):
+            raise StitchError(f"Window ending {frame.index.max():%Y-%m-%d} has no nonzero overlap to chain on")
+        if error > max_error:
+            raise StitchError(
+                f"Window ending {frame.index.max():%Y-%m-%d} chains with error {error:.2f} > {max_error:.2f}"
+            )
+        logger.debug(f"Chained window ending {frame.index.max():%Y-%m-%d}: ratio={ratio:.3f}, error={error:.3f}")
+
+        tail = frame[frame.index > stitched.index.max()] * ratio
+        stitched = pd.concat([stitched, tail])
+
+    return stitched
+
+
+def normalize_peak(df: pd.DataFrame) -> pd.DataFrame:
+    """Rescale a chained frame so the overall peak is 100, like Trends does."""
+    peak = df.to_numpy(dtype=float).max() if not df.empty else 0.0
+    if peak <= 0:
+        return df
+    return df * (100.0 / peak)
+
+
+class DailyStitcher:
+    """Fetches long ranges as overlapping daily windows and chains them.
+
+    Chained series are persisted per (keywords, geo), so a later run only
+    refetches windows that were still settling and any newer ones.
+    """
+
+    def __init__(
+        self,
+        fetcher: CachedFetcher,
+        state_dir: Path = config.STITCH_DIR,
+        window_days: int = config.STITCH_WINDOW_DAYS,
+        overlap_days: int = config.STITCH_OVERLAP_DAYS,
+        settle_days: int = config.STITCH_SETTLE_DAYS,
+    ):
+        self.fetcher = fetcher
+        self.state_dir = Path(state_dir)
+        self.window_days = window_days
+        self.overlap_days = overlap_days
+        self.settle_days = settle_days
+
+    def _state_path(self, keywords: list[str], geo: str) -> Path:
+        """State file path for a keyword group."""
+        return self.state_dir / f"{get_index().batch_key(keywords)}_{geo}.json"
+
+    def _load_state(self, keywords: list[str], geo: str, start: date) -> tuple[pd.DataFrame | None, date | None]:
+        """Load the chained raw series and the last settled date, if reusable."""
+        path = self._state_path(keywords, geo)
+        if not path.exists():
+            return None, None
+
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load stitch state {path.name}: {e}")
+            return None, None
+
+        if (
+            state.get("start") != start.isoformat()
+            or state.get("window_days") != self.window_days
+            or state.get("overlap_days") != self.overlap_days
+        ):
+            logger.info(f"Stitch settings changed for {keywords}; rebuilding from scratch")
+            return None, None
+
+        df = pd.DataFrame(state["series"])
+        df["date"] = pd.to_datetime(df["date"])
+        df = df.set_index("date")
+        return df, date.fromisoformat(state["settled_through"])
+
+    def _save_state(
+        self, keywords: list[str], geo: str, start: date, settled_through: date, series: pd.DataFrame
+    ) -> None:
+        """Persist the chained raw series up to the last settled date."""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        path = self._state_path(keywords, geo)
+
+        settled = series[series.index <= pd.Timestamp(settled_through)]
+        state = {
+            "keywords": keywords,
+            "geo": geo,
+            "start": start.isoformat(),
+            "window_days": self.window_days,
+            "overlap_days": self.overlap_days,
+            "settled_through": settled_through.isoformat(),
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "series": settled.rename_axis("date").reset_index().to_dict(orient="list"),
+        }
+
+        with open(path, "w") as f:
+            json.dump(state, f, default=str)
+        logger.debug(f"Saved stitch state: {path.name}")
+
+    def _fetch_window(self, keywords: list[str], window: StitchWindow, geo: str) -> pd.DataFrame:
+        """Fetch one window through the cached fetcher."""
+        df = self.fetcher.interest_over_time(keywords, timeframe=window.timeframe, geo=geo)
+        df = df.drop(columns=["isPartial"], errors="ignore")
+
+        missing = [kw for kw in keywords if kw not in df.columns]
+        if missing:
+            raise StitchError(f"No data for {missing} in window {window.timeframe}")
+        return df[keywords]
+
+    def stitch(
+        self,
+        keywords: list[str],
+        start: date,
+        end: date | None = None,
+        geo: str = config.DEFAULT_GEO,
+    ) -> pd.DataFrame:
+        """Return a daily series for [start, end] on one scale (peak = 100).
+
+        All keywords share each request, so they stay comparable with each other;
+        groups larger than one pytrends request must be stitched separately.
+        """
+        if len(keywords) > config.MAX_KEYWORDS_PER_REQUEST:
+            raise ValueError(
+                f"Can stitch at most {config.MAX_KEYWORDS_PER_REQUEST} keywords on one scale"
+            )
+
+        end = end or date.today()
+        windows = plan_windows(start, end, self.window_days, self.overlap_days)
+        settle_cutoff = date.today() - timedelta(days=self.settle_days)
+
+        stitched, settled_through = self._load_state(keywords, geo, start)
+        if stitched is not None:
+            # Keep settled data and resume with the first window that extends past it.
+            stitched = stitched[stitched.index <= pd.Timestamp(settled_through)]
+            pending = [w for w in windows if w.end > settled_through]
+            logger.info(
+                f"Resuming stitch for {keywords}: settled through {settled_through}, "
+                f"{len(pending)}/{len(windows)} windows to fetch"
+            )
+        else:
+            pending = windows
+            logger.info(f"Stitching {keywords}: {len(windows)} windows from {start} to {end}")
+
+        if not pending:
+            return normalize_peak(stitched[stitched.index <= pd.Timestamp(end)])
+
+        frames = [self._fetch_window(keywords, w, geo) for w in pending]
+        if stitched is None:
+            stitched, frames = frames[0].astype(float), frames[1:]
+        stitched = chain_frames(stitched, frames)
+
+        settled_windows = [w for w in windows if w.end <= settle_cutoff]
+        if settled_windows:
+            self._save_state(keywords, geo, start, settled_windows[-1].end, stitched)
+
+        return normalize_peak(stitched)
+
+
+def resample_to(base: pd.DataFrame, tail: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """Average a finer-grained tail into the row spacing of `base`.
+
+    Bins start at base's own dates (Google dates weekly rows by week start), so
+    binned rows line up with base's index. Returns (binned frame, whether each
+    bin is complete).
+    """
+    step = base.index[1] - base.index[0]
+    anchor = base.index[0]
+    bins = anchor + ((tail.index - anchor) // step) * step
+    binned = tail.groupby(bins).mean()
+    tail_step = tail.index[1] - tail.index[0] if len(tail) > 1 else step
+    counts = tail.groupby(bins).size()
+    complete = counts >= (step // tail_step)
+    binned.index.name = base.index.name
+    return binned, complete
+
+
+class TailRefresher:
+    """Refreshes a cached weekly window by fetching only a recent daily tail.
+
+    A stale `today 12-m` entry is 51 weeks of still-valid history on an old
+    scale. The tail (INCREMENTAL_TAIL_TIMEFRAME) is resampled to weeks, scaled
+    onto the cached series by estimate_scale over the complete weeks both
+    cover, and spliced on; the result is trimmed to the window's length and
+    rescaled to peak 100. When the overlap is too short or the calibration
+    error exceeds INCREMENTAL_MAX_ERROR, the window is refetched in full.
+
+    This keeps cached weeks from being resampled on every refresh, and a
+    spliced batch costs two requests (the tail's payload and interest) instead
+    of four: its caller keeps the window's cached related queries and topics,
+    which a full refetch renews. Each splice chains one more scale estimate
+    onto the entry, so after INCREMENTAL_MAX_SPLICES in a row (counted in the
+    cache entry) the window is refetched in full.
+    """
+
+    def __init__(
+        self,
+        fetcher: CachedFetcher,
+        tail_timeframe: str = config.INCREMENTAL_TAIL_TIMEFRAME,
+        max_error: float = config.INCREMENTAL_MAX_ERROR,
+        min_overlap: int = config.INCREMENTAL_MIN_OVERLAP_POINTS,
+        max_splices: int = config.INCREMENTAL_MAX_SPLICES,
+    ):
+        self.fetcher = fetcher
+        self.tail_timeframe = tail_timeframe
+        self.max_error = max_error
+        self.min_overlap = min_overlap
+        self.max_splices = max_splices
+
+    def refresh(
+        self, keywords: list[str], timeframe: str = config.DEFAULT_TIMEFRAME, geo: str = config.DEFAULT_GEO
+    ) -> tuple[pd.DataFrame, bool]:
+        """Interest over time for keywords, spliced from a tail when the cache allows it.
+
+        Returns the frame and whether it was spliced (False when it was fetched
+        or served from cache as usual).
+        """
+        base, age, meta = self.fetcher.cached_interest(keywords, timeframe, geo)
+        splices = meta.get("splices", 0)
+        if (
+            timeframe not in config.INCREMENTAL_TIMEFRAMES
+            or self.fetcher.offline
+            or base is None
+            or len(base) < 2
+            or age < self.fetcher._ttl_for_timeframe(timeframe)
+        ):
+            return self.fetcher.interest_over_time(keywords, timeframe=timeframe, geo=geo), False
+        if splices >= self.max_splices:
+            logger.info(f"{keywords} spliced {splices} times in a row; refetching in full")
+            tracer.count("incremental_expired")
+            return self.fetcher.interest_over_time(keywords, timeframe=timeframe, geo=geo), False
+
+        try:
+            spliced = self._splice(keywords, base, geo)
+        except StitchError as e:
+            logger.info(f"Incremental refresh of {keywords} fell back to a full fetch: {e}")
+            tracer.count("incremental_fallback")
+            return self.fetcher.interest_over_time(keywords, timeframe=timeframe, geo=geo), False
+
+        self.fetcher.store_interest(keywords, timeframe, geo, spliced, splices=splices + 1)
+        tracer.count("incremental_spliced")
+        return spliced, True
+
+    def _splice(self, keywords: list[str], base: pd.DataFrame, geo: str) -> pd.DataFrame:
+        tail = self.fetcher.interest_over_time(keywords, timeframe=self.tail_timeframe, geo=geo)
+        tail = tail.drop(columns=["isPartial"], errors="ignore")
+        missing = [kw for kw in keywords if kw not in tail.columns]
+        if missing or len(tail) < 2:
+            raise StitchError(f"No tail data for {missing or keywords}")
+
+        values = base.drop(columns=["isPartial"], errors="ignore")[keywords].astype(float)
+        binned, complete = resample_to(values, tail[keywords].astype(float))
+
+        # Calibrate on complete weeks both cover; the cached last week was partial when fetched
+        overlap = values.index[:-1].intersection(binned.index[complete.to_numpy()])
+        if len(overlap) < self.min_overlap:
+            raise StitchError(f"Only {len(overlap)} overlapping weeks (need {self.min_overlap})")
+        ratio, error = estimate_scale(values.loc[overlap], binned.loc[overlap])
+        if error > self.max_error:
+            raise StitchError(f"Calibration error {error:.2f} > {self.max_error:.2f}")
+        logger.info(
+            f"Spliced {keywords}: {int((binned.index > values.index[-2]).sum())} new weeks, "
+            f"ratio={ratio:.3f}, error={error:.3f}"
+        )
+
+        new = binned[binned.index > overlap[-1]] * ratio
+        spliced = pd.concat([values[values.index <= overlap[-1]], new]).iloc[-len(values) :]
+        spliced = normalize_peak(spliced).round()
+        spliced["isPartial"] = [False] * (len(spliced) - 1) + [not bool(complete.iloc[-1])]
+        spliced.index.name = "date"
+        return spliced
@@ -0,0 +1,347 @@
+"""
+Store module: Append-only history of keyword metrics and similarity scores.
+
+Each run appends one segment to `output/data/history/`: a compressed `.npz`
+of column arrays (one row per keyword, sorted by keyword key then run time).
+`index.json` maps every segment to its time range and, per
+(keyword, geo, timeframe) key, the row span holding that key, so a query
+only opens the segments that cover it and slices the rows it needs.
+
+    store = MetricsStore()
+    store.range(["world war 3"], start=now - timedelta(days=30))   # DataFrame over time
+    store.at("world war 3", when=some_datetime)                     # latest row at or before
+
+A snapshot identical to the key's previous one (a rerun served from the
+same cached data) is not appended again: the index keeps a hash of every
+key's latest row. It also points at the segment and row holding that
+snapshot, so latest() reads only those rows.
+
+Segments are never rewritten, except by compact(): once there are more than
+HISTORY_MAX_SEGMENTS segments under HISTORY_SEGMENT_ROWS rows, those are
+merged into segments of HISTORY_SEGMENT_ROWS rows. Full segments are never
+touched again, so compaction cost stays bounded as history grows.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import uuid
+from dataclasses import fields
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+from analyzer import ComparisonScore, KeywordMetrics
+from locking import FileLock, atomic_write, atomic_write_json
+from normalize import get_index
+
+logger = logging.getLogger(__name__)
+
+STRING_COLUMNS = ["key", "keyword", "geo", "timeframe", "data_status", "entity_mid"]
+METRIC_COLUMNS = [f.name for f in fields(KeywordMetrics) if f.type in (float, int, bool)]
+SCORE_COLUMNS = [f.name for f in fields(ComparisonScore) if f.type in (float, int, bool)]
+
+
+def history_key(keyword: str, geo: str, timeframe: str) -> str:
+    """Index key for a keyword series (normalized, so spellings share history)."""
+    return f"{get_index().key(keyword)}|{geo}|{timeframe}"
+
+
+def _timestamp(when: datetime | None) -> int | None:
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.astimezone()  # Naive datetimes are local time
+    return int(when.timestamp())
+
+
+class MetricsStore:
+    """Columnar, append-only metric snapshots with a per-key row index."""
+
+    def __init__(self, directory: Path | None = None):
+        self.directory = Path(directory or config.HISTORY_DIR)
+        self.index_path = self.directory / "index.json"
+        self.lock_path = self.directory / "index.lock"
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"segments": {}, "latest": {}, "rows": {}}
+
+    def _write_segment(self, columns: dict[str, np.ndarray]) -> str:
+        """Write a segment file atomically; returns its name."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"seg_{int(columns['run_ts'].min())}_{uuid.uuid4().hex[:8]}.npz"
+        with atomic_write(self.directory / name, "wb") as f:
+            np.savez_compressed(f, **columns)
+        return name
+
+    @staticmethod
+    def _segment_entry(columns: dict[str, np.ndarray]) -> dict:
+        """Index entry for a segment whose rows are sorted by (key, run_ts)."""
+        keys = columns["key"]
+        spans = {}
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        stops = np.r_[starts[1:], len(keys)]
+        for start, stop in zip(starts, stops):
+            spans[str(keys[start])] = [int(start), int(stop)]
+        return {
+            "rows": len(keys),
+            "min_ts": int(columns["run_ts"].min()),
+            "max_ts": int(columns["run_ts"].max()),
+            "keys": spans,
+        }
+
+    @staticmethod
+    def _point_latest(rows: dict, name: str, columns: dict[str, np.ndarray], spans: dict) -> None:
+        """Point rows[key] at a segment's last row of each key when it is at least as new."""
+        run_ts = columns["run_ts"]
+        for key, (_, stop) in spans.items():
+            ts = int(run_ts[stop - 1])
+            if key not in rows or ts >= rows[key][2]:
+                rows[key] = [name, stop - 1, ts]
+
+    def _latest_rows(self, index: dict) -> dict:
+        """Pointers to every key's newest row (key -> [segment, row, run_ts]), rebuilt for indexes without them."""
+        if "rows" in index:
+            return index["rows"]
+        rows = {}
+        for name, segment in index["segments"].items():
+            with np.load(self.directory / name, allow_pickle=False) as data:
+                columns = {"run_ts": data["run_ts"]}
+            self._point_latest(rows, name, columns, segment["keys"])
+        index["rows"] = rows
+        return rows
+
+    @staticmethod
+    def _row_hashes(columns: dict[str, np.ndarray]) -> list[str]:
+        """Digest of each row's data (everything but when it was recorded)."""
+        values = np.column_stack([columns[name] for name in METRIC_COLUMNS + SCORE_COLUMNS])
+        labels = zip(columns["data_status"], columns["entity_mid"])
+        return [
+            hashlib.blake2b(row.tobytes() + f"{status}|{mid}".encode(), digest_size=12).hexdigest()
+            for row, (status, mid) in zip(values, labels)
+        ]
+
+    @staticmethod
+    def _sorted(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        order = np.lexsort((columns["run_ts"], columns["key"]))
+        return {name: values[order] for name, values in columns.items()}
+
+    def append(
+        self,
+        metrics: dict[str, KeywordMetrics],
+        timeframe: str,
+        geo: str,
+        scores: dict[str, ComparisonScore] | None = None,
+        data_status: dict[str, str] | None = None,
+        run_ts: datetime | None = None,
+    ) -> str | None:
+        """Append one run's metrics (and scores, if any) as a new segment.
+
+        Keywords whose snapshot is unchanged since their last one are skipped;
+        returns None when nothing changed.
+        """
+        if not metrics:
+            return None
+
+        scores = scores or {}
+        data_status = data_status or {}
+        run_ts = _timestamp(run_ts or datetime.now(timezone.utc))
+        keywords = list(metrics)
+
+        columns = {
+            "key": np.array([history_key(kw, geo, timeframe) for kw in keywords]),
+            "keyword": np.array(keywords),
+            "geo": np.array([geo] * len(keywords)),
+            "timeframe": np.array([timeframe] * len(keywords)),
+            "data_status": np.array([data_status.get(kw, "fresh") for kw in keywords]),
+            "entity_mid": np.array([metrics[kw].entity_mid for kw in keywords]),
+            "run_ts": np.full(len(keywords), run_ts, dtype=np.int64),
+        }
+        for name in METRIC_COLUMNS:
+            columns[name] = np.array([getattr(metrics[kw], name) for kw in keywords], dtype=np.float64)
+        for name in SCORE_COLUMNS:
+            columns[name] = np.array(
+                [getattr(scores[kw], name) if kw in scores else np.nan for kw in keywords], dtype=np.float64
+            )
+
+        hashes = np.array(self._row_hashes(columns))
+        with FileLock(self.lock_path):
+            index = self._load_index()
+            latest = index.setdefault("latest", {})
+            changed = np.array([latest.get(key) != digest for key, digest in zip(columns["key"], hashes)])
+            if not changed.any():
+                logger.debug(f"History unchanged for {len(keywords)} keywords; nothing appended")
+                return None
+
+            latest.update(zip(columns["key"][changed].tolist(), hashes[changed].tolist()))
+            rows = self._latest_rows(index)
+            columns = self._sorted({column: values[changed] for column, values in columns.items()})
+            name = self._write_segment(columns)
+            index["segments"][name] = self._segment_entry(columns)
+            self._point_latest(rows, name, columns, index["segments"][name]["keys"])
+            atomic_write_json(self.index_path, index)
+            small = sum(segment["rows"] < config.HISTORY_SEGMENT_ROWS for segment in index["segments"].values())
+
+        if small > config.HISTORY_MAX_SEGMENTS:
+            self.compact()
+        return name
+
+    def _read(self, keys: list[str] | None, start: int | None, end: int | None) -> pd.DataFrame:
+        """Rows for keys (all keys if None) with start <= run_ts <= end."""
+        for attempt in range(2):
+            index = self._load_index()
+            try:
+                return self._read_segments(index, keys, start, end)
+            except FileNotFoundError:
+                if attempt:
+                    raise
+                logger.debug("History segment compacted mid-read; reloading index")
+
+    def _read_segments(self, index: dict, keys: list[str] | None, start: int | None, end: int | None) -> pd.DataFrame:
+        frames = []
+        for name, segment in index["segments"].items():
+            if (start is not None and segment["max_ts"] < start) or (end is not None and segment["min_ts"] > end):
+                continue
+            if keys is None:
+                spans = [(0, segment["rows"])]
+            else:
+                spans = [segment["keys"][key] for key in keys if key in segment["keys"]]
+            if not spans:
+                continue
+
+            frames.append(self._load_rows(name, np.concatenate([np.arange(a, b) for a, b in spans])))
+        return self._frame(frames, start, end)
+
+    def _read_latest(self, index: dict, geo: str, timeframe: str) -> pd.DataFrame:
+        """The rows index["rows"] points at for one geo and timeframe."""
+        wanted = {}
+        for key, (name, row, _) in index["rows"].items():
+            if key.rsplit("|", 2)[1:] == [geo, timeframe]:
+                wanted.setdefault(name, []).append(row)
+        return self._frame([self._load_rows(name, np.array(rows)) for name, rows in wanted.items()], None, None)
+
+    def _load_rows(self, name: str, rows: np.ndarray) -> pd.DataFrame:
+        with np.load(self.directory / name, allow_pickle=False) as data:
+            # Each access decompresses the whole column
+            return pd.DataFrame({column: data[column][rows] for column in data.files})
+
+    @staticmethod
+    def _frame(frames: list[pd.DataFrame], start: int | None, end: int | None) -> pd.DataFrame:
+        columns = STRING_COLUMNS + ["run_ts"] + METRIC_COLUMNS + SCORE_COLUMNS
+        if not frames:
+            return pd.DataFrame(columns=columns)
+
+        # Segments written before a column existed get NaN for it
+        df = pd.concat(frames, ignore_index=True).reindex(columns=columns)
+        if start is not None:
+            df = df[df["run_ts"] >= start]
+        if end is not None:
+            df = df[df["run_ts"] <= end]
+        df = df.sort_values(["key", "run_ts"], kind="stable").reset_index(drop=True)
+        df["run_ts"] = pd.to_datetime(df["run_ts"], unit="s", utc=True)
+        return df
+
+    def range(
+        self,
+        keywords: list[str] | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        geo: str = config.DEFAULT_GEO,
+        timeframe: str = config.DEFAULT_TIMEFRAME,
+    ) -> pd.DataFrame:
+        """Every snapshot of keywords (or all keywords) between start and end, oldest first."""
+        keys = list(dict.fromkeys(history_key(kw, geo, timeframe) for kw in keywords)) if keywords is not None else None
+        df = self._read(keys, _timestamp(start), _timestamp(end))
+        if keys is None:
+            df = df[(df["geo"] == geo) & (df["timeframe"] == timeframe)].reset_index(drop=True)
+        return df
+
+    def at(
+        self,
+        keyword: str,
+        when: datetime | None = None,
+        geo: str = config.DEFAULT_GEO,
+        timeframe: str = config.DEFAULT_TIMEFRAME,
+    ) -> pd.Series | None:
+        """The latest snapshot of a keyword at or before `when` (default: now)."""
+        df = self._read([history_key(keyword, geo, timeframe)], None, _timestamp(when))
+        return df.iloc[-1] if len(df) else None
+
+    def latest(
+        self,
+        geo: str = config.DEFAULT_GEO,
+        timeframe: str = config.DEFAULT_TIMEFRAME,
+        when: datetime | None = None,
+    ) -> pd.DataFrame:
+        """The newest snapshot of every keyword at or before `when` (default: now), one row each.
+
+        Without `when`, only the rows the index points at are read.
+        """
+        if when is None:
+            for attempt in range(2):
+                index = self._load_index()
+                if "rows" not in index:
+                    break  # Written before the index kept row pointers
+                try:
+                    return self._read_latest(index, geo, timeframe)
+                except FileNotFoundError:
+                    if attempt:
+                        raise
+                    logger.debug("History segment compacted mid-read; reloading index")
+        df = self._read(None, None, _timestamp(when))
+        df = df[(df["geo"] == geo) & (df["timeframe"] == timeframe)]
+        return df.drop_duplicates("key", keep="last").reset_index(drop=True)
+
+    def compact(self) -> None:
+        """Merge the small segments into full ones (readers mid-query retry against the new index)."""
+        with FileLock(self.lock_path):
+            index = self._load_index()
+            old = [name for name, segment in index["segments"].items() if segment["rows"] < config.HISTORY_SEGMENT_ROWS]
+            if len(old) < 2:
+                return
+            frames = []
+            for name in old:
+                with np.load(self.directory / name, allow_pickle=False) as data:
+                    frames.append({column: data[column] for column in data.files})
+
+            names = set().union(*(frame.keys() for frame in frames))
+            columns = {}
+            for column in names:
+                parts = []
+                for frame in frames:
+                    rows = len(frame["key"])
+                    if column in frame:
+                        parts.append(frame[column])
+                    elif column in STRING_COLUMNS:
+                        parts.append(np.full(rows, ""))
+                    else:
+                        parts.append(np.full(rows, np.nan))
+                columns[column] = np.concatenate(parts)
+
+            columns = self._sorted(columns)
+            rows = self._latest_rows(index)
+            segments = {name: segment for name, segment in index["segments"].items() if name not in old}
+            moved = {}
+            for start in range(0, len(columns["key"]), config.HISTORY_SEGMENT_ROWS):
+                chunk = {column: values[start:start + config.HISTORY_SEGMENT_ROWS] for column, values in columns.items()}
+                name = self._write_segment(chunk)
+                segments[name] = self._segment_entry(chunk)
+                self._point_latest(moved, name, chunk, segments[name]["keys"])
+            rows.update({key: moved[key] for key, (name, _, _) in rows.items() if name in old})
+            written = len(segments) - (len(index["segments"]) - len(old))
+            atomic_write_json(self.index_path, {**index, "segments": segments, "rows": rows})
+
+        for name in old:
+            try:
+                os.unlink(self.directory / name)
+            except OSError as e:
+                logger.warning(f"Failed to remove compacted segment {name}: {e}")
+        logger.info(f"Compacted {len(old)} history segments into {written}")
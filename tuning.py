@@ -0,0 +1,266 @@
+"""
+Tuning module: Fit score weights to how past episodes performed.
+
+An outcomes CSV gives one row per episode (or keyword) and an outcome column,
+e.g. views. Rows name their keyword directly (`keyword`/`Primary_Keyword`) or
+by episode number, looked up in the episode sheet; an `air_date` column, if
+present, joins each row to the metric history as of that date rather than the
+latest snapshot, so later data does not leak into the fit.
+
+Weights are fitted to rank the outcome best (Spearman correlation of score and
+outcome): a least-squares fit on the ranks as a starting point, then
+TUNING_SAMPLES random weight vectors in two rounds, broad and then around the
+best so far, each round scored in one matrix product. Opportunity weights are
+always fitted; similarity weights when the history holds component scores
+(runs with --reference). TUNING_FOLDS-fold cross-validation reports how well
+the fit holds up on episodes it did not see.
+
+The result is written as a named profile to `output/profiles/`, which
+--profile loads like the built-in ones. Everything runs on the local store.
+"""
+
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+from analyzer import opportunity_components
+from explain import SIMILARITY_COMPONENTS
+from locking import atomic_write_json
+from planner import load_episode_sheet
+from ranking import get_profile, get_similarity_weights
+from store import MetricsStore
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_COLUMNS = ("keyword", "Primary_Keyword", "primary_keyword")
+EPISODE_COLUMNS = ("Episode", "episode_num", "episode")
+DATE_COLUMNS = ("air_date", "published_at", "date")
+
+
+class TuningError(Exception):
+    """Raised when outcomes cannot be joined to enough recorded metrics."""
+    pass
+
+
+@dataclass
+class TuningResult:
+    """Fitted weights for one score, and how well they rank the outcome."""
+    kind: str  # "opportunity" or "similarity"
+    weights: dict[str, float]
+    baseline_weights: dict[str, float]
+    objective: float  # Spearman correlation of score and outcome with the fitted weights
+    baseline_objective: float
+    cv_objective: float  # Out of sample: weights fitted without the fold they are scored on
+    cv_baseline_objective: float
+    rows: int
+
+
+def _first_column(df: pd.DataFrame, candidates: tuple[str, ...]) -> str | None:
+    return next((column for column in candidates if column in df.columns), None)
+
+
+def load_outcomes(
+    path: Path,
+    outcome: str = config.TUNING_OUTCOME_COLUMN,
+    episode_sheet: Path = config.EPISODE_SHEET,
+) -> pd.DataFrame:
+    """keyword, outcome and when (NaT if undated) for every usable row of an outcomes CSV."""
+    df = pd.read_csv(path)
+    if outcome not in df.columns:
+        raise TuningError(f"Outcome column '{outcome}' not in {path} (columns: {', '.join(df.columns)})")
+
+    keyword_column = _first_column(df, KEYWORD_COLUMNS)
+    episode_column = _first_column(df, EPISODE_COLUMNS)
+    if keyword_column:
+        keywords = df[keyword_column]
+    elif episode_column:
+        sheet = {episode.episode_num: episode.primary_keyword for episode in load_episode_sheet(episode_sheet)}
+        keywords = pd.to_numeric(df[episode_column], errors="coerce").map(sheet)
+    else:
+        raise TuningError(f"{path} needs a keyword column ({'/'.join(KEYWORD_COLUMNS)}) or an episode number column")
+
+    date_column = _first_column(df, DATE_COLUMNS)
+    outcomes = pd.DataFrame(
+        {
+            "keyword": keywords,
+            "outcome": pd.to_numeric(df[outcome], errors="coerce"),
+            "when": pd.to_datetime(df[date_column], utc=True, errors="coerce") if date_column else pd.NaT,
+        }
+    )
+    return outcomes.dropna(subset=["keyword", "outcome"]).reset_index(drop=True)
+
+
+def join_history(
+    outcomes: pd.DataFrame,
+    store: MetricsStore | None = None,
+    geo: str = config.DEFAULT_GEO,
+    timeframe: str = config.DEFAULT_TIMEFRAME,
+) -> pd.DataFrame:
+    """Each outcome row with its keyword's metrics snapshot as of its date (latest if undated)."""
+    store = store or MetricsStore()
+    rows, missing = [], []
+    for row in outcomes.itertuples():
+        when = None if pd.isna(row.when) else row.when.to_pydatetime()
+        snapshot = store.at(row.keyword, when, geo=geo, timeframe=timeframe)
+        if snapshot is None:
+            missing.append(row.keyword)
+            continue
+        rows.append({**snapshot.to_dict(), "keyword": row.keyword, "outcome": row.outcome})
+
+    if missing:
+        logger.warning(f"No recorded metrics for {len(missing)} outcome row(s): {missing[:10]}")
+    return pd.DataFrame(rows)
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    """Ranks down each column; ties share their mean rank."""
+    return pd.DataFrame(values).rank(axis=0).to_numpy()
+
+
+def spearman(scores: np.ndarray, outcome: np.ndarray) -> np.ndarray:
+    """Spearman correlation of the outcome with each column of scores."""
+    x = _ranks(scores.reshape(len(outcome), -1))
+    y = _ranks(outcome[:, None])
+    x = x - x.mean(axis=0)
+    y = y - y.mean(axis=0)
+    denominator = np.sqrt((x**2).sum(axis=0) * (y**2).sum())
+    return np.divide((x * y).sum(axis=0), denominator, out=np.zeros(x.shape[1]), where=denominator > 0)
+
+
+def _scores(components: np.ndarray, weights: np.ndarray, multiplier: np.ndarray | None) -> np.ndarray:
+    """Scores of every row (rows) under every weight vector (columns)."""
+    scores = components @ np.atleast_2d(weights).T
+    return scores * multiplier[:, None] if multiplier is not None else scores
+
+
+def fit_weights(
+    components: np.ndarray,
+    outcome: np.ndarray,
+    multiplier: np.ndarray | None = None,
+    samples: int = config.TUNING_SAMPLES,
+    seed: int = 0,
+) -> tuple[np.ndarray, float]:
+    """Weights (summing to 1) whose scores best rank the outcome, and their Spearman correlation."""
+    rng = np.random.default_rng(seed)
+    count = components.shape[1]
+
+    # Least squares on the outcome's ranks as a starting point (negative weights dropped)
+    design = components * multiplier[:, None] if multiplier is not None else components
+    coef, *_ = np.linalg.lstsq(np.column_stack([design, np.ones(len(design))]), _ranks(outcome[:, None])[:, 0], rcond=None)
+    start = np.clip(coef[:count], 0, None)
+    start = start if start.sum() > 0 else np.ones(count)
+
+    # Broad search over the simplex, then a concentrated one around the best so far
+    broad = np.vstack([start, rng.dirichlet(np.ones(count), samples // 2)])
+    best, best_objective = start, -np.inf
+    for candidates in (broad, None):
+        if candidates is None:
+            candidates = np.vstack([best, rng.dirichlet(best / best.sum() * 100 + 0.01, samples - samples // 2)])
+        candidates = candidates / candidates.sum(axis=1, keepdims=True)
+        objective = spearman(_scores(components, candidates, multiplier), outcome)
+        if objective.max() > best_objective:
+            best, best_objective = candidates[objective.argmax()], float(objective.max())
+    return best, best_objective
+
+
+def cross_validate(
+    components: np.ndarray,
+    outcome: np.ndarray,
+    baseline: np.ndarray,
+    multiplier: np.ndarray | None = None,
+    folds: int = config.TUNING_FOLDS,
+    samples: int = config.TUNING_SAMPLES,
+    seed: int = 0,
+) -> tuple[float, float]:
+    """Mean out-of-fold Spearman correlation of fitted and of baseline weights."""
+    parts = np.array_split(np.random.default_rng(seed).permutation(len(outcome)), folds)
+    fitted, base = [], []
+    for test in parts:
+        train = np.setdiff1d(np.arange(len(outcome)), test)
+        train_multiplier = multiplier[train] if multiplier is not None else None
+        test_multiplier = multiplier[test] if multiplier is not None else None
+        weights, _ = fit_weights(components[train], outcome[train], train_multiplier, samples, seed)
+        fitted.append(spearman(_scores(components[test], weights, test_multiplier), outcome[test])[0])
+        base.append(spearman(_scores(components[test], baseline, test_multiplier), outcome[test])[0])
+    return float(np.mean(fitted)), float(np.mean(base))
+
+
+def _fit(
+    kind: str,
+    components: np.ndarray,
+    outcome: np.ndarray,
+    baseline: dict[str, float],
+    multiplier: np.ndarray | None,
+    samples: int,
+    seed: int,
+) -> TuningResult:
+    baseline_vector = np.array(list(baseline.values()), dtype=float)
+    weights, objective = fit_weights(components, outcome, multiplier, samples, seed)
+    cv_objective, cv_baseline = cross_validate(components, outcome, baseline_vector, multiplier, samples=samples, seed=seed)
+    return TuningResult(
+        kind=kind,
+        weights={name: round(float(w), 4) for name, w in zip(baseline, weights)},
+        baseline_weights=dict(baseline),
+        objective=objective,
+        baseline_objective=float(spearman(_scores(components, baseline_vector, multiplier), outcome)[0]),
+        cv_objective=cv_objective,
+        cv_baseline_objective=cv_baseline,
+        rows=len(outcome),
+    )
+
+
+def tune(
+    table: pd.DataFrame,
+    profile: str = "default",
+    samples: int = config.TUNING_SAMPLES,
+    seed: int = 0,
+) -> list[TuningResult]:
+    """Fit opportunity (and, if recorded, similarity) weights to a joined outcomes table.
+
+    profile supplies the baseline weights the fit is compared against.
+    """
+    if len(table) < config.TUNING_MIN_ROWS:
+        raise TuningError(f"{len(table)} outcome rows with recorded metrics; need {config.TUNING_MIN_ROWS}")
+
+    outcome = table["outcome"].to_numpy(dtype=float)
+    baseline = get_profile(profile)
+    components = opportunity_components(table)
+    matrix = np.column_stack([np.broadcast_to(components[name], (len(table),)) for name in baseline])
+    results = [_fit("opportunity", matrix, outcome, baseline, None, samples, seed)]
+
+    # Similarity components exist only for snapshots scored against references
+    columns = list(SIMILARITY_COMPONENTS.values()) + ["demand_ratio"]
+    if all(column in table.columns for column in columns):
+        scored = table.dropna(subset=columns)
+        if len(scored) >= config.TUNING_MIN_ROWS:
+            baseline = get_similarity_weights(profile)
+            matrix = scored[[SIMILARITY_COMPONENTS[name] for name in baseline]].to_numpy(dtype=float)
+            multiplier = scored["demand_ratio"].to_numpy(dtype=float)
+            results.append(
+                _fit("similarity", matrix, scored["outcome"].to_numpy(dtype=float), baseline, multiplier, samples, seed)
+            )
+        else:
+            logger.info(f"Only {len(scored)} outcome rows have similarity components; similarity weights not fitted")
+    return results
+
+
+def save_profile(name: str, results: list[TuningResult], source: dict) -> Path:
+    """Write fitted weights as a profile --profile can load."""
+    if name in config.WEIGHT_PROFILES:
+        raise TuningError(f"'{name}' is a built-in profile; choose another name")
+
+    path = config.PROFILES_DIR / f"{name}.json"
+    profile = {
+        "name": name,
+        "fitted_at": datetime.now().isoformat(timespec="seconds"),
+        "source": source,
+        **{result.kind: result.weights for result in results},
+        "fit": {result.kind: asdict(result) for result in results},
+    }
+    atomic_write_json(path, profile, indent=2)
+    return path